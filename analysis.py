@@ -1,7 +1,18 @@
+import argparse
 import csv
-from datetime import datetime
+import hashlib
+import io
+import json
+import math
+import os
+import sys
+import time
+import zipfile
+from datetime import datetime, timedelta
 from collections import deque
 
+import numpy as np
+
 # Thresholds
 MOVING_AVG_WINDOW = 5
 AWAKE_HR_THRESHOLD = 80
@@ -9,8 +20,11 @@ SLEEP_HR_THRESHOLD = 70
 BR_LOW_THRESHOLD = 4
 BR_HIGH_THRESHOLD = 20
 TEMP_SLEEP_RANGE = (18.0, 27.0)
+SLEEP_INTERVAL_GAP = 60  # seconds of non-asleep windows that still count as one sleep interval
 
 INPUT_FILE = "/home/raspberry/Desktop/VSD_GUI/data_live.csv"
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+VALUE_COLUMNS = ("hr", "br", "temp", "humidity", "pressure")
 
 def detect_sleep_state(hr_window):
     avg_hr = sum(hr_window) / len(hr_window)
@@ -37,7 +51,229 @@ def classify_temp(temp):
     else:
         return "Too Hot"
 
-def process_log_file(file_path):
+def iter_log_rows(file_path):
+    """(timestamp, hr, br, temp, humidity, pressure) for each valid row of a .csv or .vsdb session"""
+    if file_path.endswith(".vsdb"):
+        from session_binary import BinarySession
+        for chunk in BinarySession(file_path).iter_chunks():
+            columns = [chunk[name].tolist() for name in ("hr", "br", "temp", "humidity", "pressure")]
+            for ts, *values in zip(chunk["timestamp"].tolist(), *columns):
+                yield (datetime.fromtimestamp(ts), *values)
+        return
+
+    with open(file_path, 'r') as f:
+        # An unterminated last line was cut off mid-write (a power cut, or the logger is mid-batch)
+        reader = csv.reader(line for line in f if line.endswith("\n"))
+        for row in reader:
+            if len(row) < 6 or row[0].lower() == "timestamp":
+                continue
+            try:
+                timestamp = datetime.strptime(row[0], TIMESTAMP_FORMAT)
+                hr = float(row[1])
+                br = float(row[2])
+                temp = float(row[3])
+                humidity = float(row[4])
+                pressure = float(row[5])
+            except Exception:
+                continue
+            yield timestamp, hr, br, temp, humidity, pressure
+
+# ==== Columnar loading ====
+# A session is read into NumPy columns in one go; process_log_file() then
+# computes the same stats as the row-at-a-time process_log_rows(), in bulk.
+# CSV lines in the logger's own format (six unquoted fields, a fixed-format
+# stamp, plain decimals) are parsed from the file's bytes without a Python
+# step per row; any other line goes through csv/strptime/float() as before,
+# so the rows accepted and the values read are exactly the same.
+
+_STAMP_DIGITS = [0, 1, 2, 3, 5, 6, 8, 9, 11, 12, 14, 15, 17, 18]
+_STAMP_SEPARATORS = {4: "-", 7: "-", 10: " ", 13: ":", 16: ":"}
+_DECIMAL_WIDTH = 17     # longest field taken by the bulk decimal parser
+_DECIMAL_DIGITS = 15    # exact in float64, so digits / 10**k rounds like float()
+
+def _stamps_from_codes(codes):
+    """(datetime64[us], ok) from an (n, 19) array of TIMESTAMP_FORMAT character codes"""
+    codes = codes.astype(np.int64)
+    ok = np.ones(len(codes), dtype=bool)
+    for pos, sep in _STAMP_SEPARATORS.items():
+        ok &= codes[:, pos] == ord(sep)
+    d = codes[:, _STAMP_DIGITS] - ord("0")
+    ok &= ((d >= 0) & (d <= 9)).all(axis=1)
+    year = d[:, 0] * 1000 + d[:, 1] * 100 + d[:, 2] * 10 + d[:, 3]
+    month, day = d[:, 4] * 10 + d[:, 5], d[:, 6] * 10 + d[:, 7]
+    hour, minute, second = d[:, 8] * 10 + d[:, 9], d[:, 10] * 10 + d[:, 11], d[:, 12] * 10 + d[:, 13]
+    ok &= (year >= 1) & (month >= 1) & (month <= 12)
+    month_start = np.where(ok, (year - 1970) * 12 + month - 1, 0).astype("datetime64[M]")
+    days_in_month = ((month_start + 1).astype("datetime64[D]") - month_start.astype("datetime64[D]")).astype(np.int64)
+    ok &= (day >= 1) & (day <= days_in_month) & (hour <= 23) & (minute <= 59) & (second <= 59)
+    seconds = np.where(ok, (day - 1) * 86400 + hour * 3600 + minute * 60 + second, 0)
+    stamps = month_start.astype("datetime64[s]") + seconds.astype("timedelta64[s]")
+    return stamps.astype("datetime64[us]"), ok
+
+def _decimals_from_codes(chars, widths):
+    """(float64, ok) for fields like "-63.25": `chars` holds the first bytes of each field, `widths` their lengths"""
+    col = np.arange(chars.shape[1])
+    inside = col < widths[:, None]
+    digit = inside & (chars >= ord("0")) & (chars <= ord("9"))
+    dot = inside & (chars == ord("."))
+    sign = inside & (col == 0) & ((chars == ord("-")) | (chars == ord("+")))
+    digits = digit.sum(axis=1)
+    ok = ((digit | dot | sign) == inside).all(axis=1) & (dot.sum(axis=1) <= 1)
+    ok &= (digits >= 1) & (digits <= _DECIMAL_DIGITS) & (widths <= _DECIMAL_WIDTH)
+    mantissa = np.zeros(len(chars), dtype=np.int64)
+    for k in col:
+        mantissa = np.where(digit[:, k], mantissa * 10 + (chars[:, k].astype(np.int64) - ord("0")), mantissa)
+    # Every character after the dot is a digit in an ok field
+    scale = np.where(dot.any(axis=1), widths - 1 - dot.argmax(axis=1), 0)
+    values = mantissa / 10.0 ** scale
+    return np.where(chars[:, 0] == ord("-"), -values, values), ok
+
+def _gather(buf, starts, width):
+    return buf[np.minimum(starts[:, None] + np.arange(width), len(buf) - 1)]
+
+def _parse_row(row):
+    """iter_log_rows()'s conversion of one csv row: (datetime, hr, br, temp, humidity, pressure) or None"""
+    if len(row) < 6 or row[0].lower() == "timestamp":
+        return None
+    try:
+        return (datetime.strptime(row[0], TIMESTAMP_FORMAT),) + tuple(float(v) for v in row[1:6])
+    except Exception:
+        return None
+
+def _columns_from_rows(rows):
+    rows = [r for r in map(_parse_row, rows) if r is not None]
+    fields = list(zip(*rows)) if rows else [()] * 6
+    columns = {name: np.array(values, dtype=np.float64) for name, values in zip(VALUE_COLUMNS, fields[1:])}
+    columns["timestamp"] = np.array(fields[0], dtype="datetime64[us]")
+    return columns
+
+def load_csv_text(text):
+    """load_columns() of CSV text already in memory (a whole file, or a range of complete lines)"""
+    if '"' in text or "\0" in text:
+        # Quoted fields can span lines; leave those files to the csv module
+        return _columns_from_rows(csv.reader(io.StringIO(text)))
+    data = text.encode("utf-8", "surrogateescape")
+    buf = np.frombuffer(data, dtype=np.uint8)
+    newlines = np.flatnonzero(buf == ord("\n"))
+    starts = np.r_[0, newlines + 1]
+    ends = np.r_[newlines, len(buf)]
+    keep = ends > starts
+    starts, ends = starts[keep], ends[keep]
+    n = len(starts)
+    if n == 0:
+        return _columns_from_rows([])
+
+    commas = np.flatnonzero(buf == ord(","))
+    per_line = np.bincount(np.searchsorted(starts, commas, side="right") - 1, minlength=n)[:n]
+    first = np.searchsorted(commas, starts)
+    bulk = per_line == 5
+    bounds = np.zeros((n, 7), dtype=np.int64)
+    bounds[:, 0], bounds[:, 6] = starts - 1, ends
+    bounds[bulk, 1:6] = commas[first[bulk, None] + np.arange(5)]
+
+    stamps, ok = _stamps_from_codes(_gather(buf, starts, 19))
+    bulk &= ok & (bounds[:, 1] - starts == 19)
+    values = np.empty((n, len(VALUE_COLUMNS)))
+    for i in range(len(VALUE_COLUMNS)):
+        field_start = bounds[:, i + 1] + 1
+        widths = bounds[:, i + 2] - field_start
+        gather_width = int(min(max(widths.max(), 1), _DECIMAL_WIDTH))  # "63.25" needs 5 columns, not 17
+        values[:, i], ok = _decimals_from_codes(_gather(buf, field_start, gather_width), widths)
+        bulk &= ok
+
+    valid = bulk.copy()
+    for i in np.flatnonzero(~bulk):
+        row = _parse_row(next(csv.reader([data[starts[i]:ends[i]].decode("utf-8", "surrogateescape")]), []))
+        if row is not None:
+            stamps[i] = np.datetime64(row[0], "us")
+            values[i] = row[1:]
+            valid[i] = True
+    columns = {name: values[valid, i].copy() for i, name in enumerate(VALUE_COLUMNS)}
+    columns["timestamp"] = stamps[valid]
+    return columns
+
+def local_datetimes(epochs):
+    """datetime64[us] local wall-clock times, equal to datetime.fromtimestamp() of each epoch"""
+    epochs = np.asarray(epochs, dtype=np.float64)
+    whole = np.trunc(epochs)
+    micros = np.rint((epochs - whole) * 1e6).astype(np.int64)  # fromtimestamp rounds half to even too
+    # One UTC offset per quarter hour: DST changes fall on quarter-hour boundaries
+    quarters, which = np.unique(whole // 900, return_inverse=True)
+    offsets = np.array([time.localtime(int(q) * 900).tm_gmtoff for q in quarters.tolist()], dtype=np.int64)
+    local = (whole.astype(np.int64) + offsets[which]) * 1_000_000 + micros
+    return local.astype("datetime64[us]")
+
+def load_columns(file_path):
+    """{"timestamp": datetime64[us], "hr", "br", "temp", "humidity", "pressure": float64} for the
+    same rows iter_log_rows() yields"""
+    if file_path.endswith(".vsdb"):
+        from session_binary import BinarySession
+        session = BinarySession(file_path)
+        columns = {name: np.asarray(session.column(name), dtype=np.float64) for name in VALUE_COLUMNS}
+        columns["timestamp"] = local_datetimes(session.column("timestamp"))
+        return columns
+    with open(file_path, 'r') as f:
+        text = f.read()
+    return load_csv_text(text[:text.rfind("\n") + 1])  # without an unterminated last line, like iter_log_rows()
+
+def window_states(hr):
+    """(asleep, awake) masks of detect_sleep_state() for every full window; entry i is the window ending at row i + 4"""
+    hr = np.asarray(hr, dtype=np.float64)
+    windows = max(0, len(hr) - MOVING_AVG_WINDOW + 1)
+    # Summed left to right like sum(hr_window), so every average is bit-identical
+    window_sum = hr[:windows]
+    for k in range(1, MOVING_AVG_WINDOW):
+        window_sum = window_sum + hr[k:k + windows]
+    avg_hr = window_sum / MOVING_AVG_WINDOW
+    return avg_hr < SLEEP_HR_THRESHOLD, avg_hr > AWAKE_HR_THRESHOLD
+
+def column_counts(columns):
+    """The counters of analyse_columns() and the mask of its asleep windows"""
+    hr, br, temp = columns["hr"], columns["br"], columns["temp"]
+    total = len(hr)
+    asleep_mask, awake_mask = window_states(hr)
+    windows = len(asleep_mask)
+    asleep, awake = int(asleep_mask.sum()), int(awake_mask.sum())
+    br_low = br < BR_LOW_THRESHOLD
+    temp_good = (temp >= TEMP_SLEEP_RANGE[0]) & (temp <= TEMP_SLEEP_RANGE[1])
+    temp_cold = ~temp_good & (temp < TEMP_SLEEP_RANGE[0])
+    counts = {
+        "total": total,
+        "asleep": asleep,
+        "awake": awake,
+        "uncertain": windows - asleep - awake,
+        "br_low": int(br_low.sum()),
+        "br_high": int((~br_low & (br > BR_HIGH_THRESHOLD)).sum()),
+        "temp_good": int(temp_good.sum()),
+        "temp_cold": int(temp_cold.sum()),
+        "temp_hot": int(total - temp_good.sum() - temp_cold.sum()),
+    }
+    return counts, asleep_mask
+
+def _stats_from_counts(columns, counts, asleep_mask):
+    stats = dict(counts)
+    for name in VALUE_COLUMNS:
+        stats[f"{name}_values"] = columns[name].tolist()
+    stats["asleep_timestamps"] = columns["timestamp"][MOVING_AVG_WINDOW - 1:][asleep_mask].tolist()
+    return stats
+
+def analyse_columns(columns):
+    """The process_log_rows() stats for a load_columns() result, computed column-wise"""
+    return _stats_from_counts(columns, *column_counts(columns))
+
+def process_log_file(file_path, cache=None):
+    """analyse_columns() of a session file; `cache`: a SessionCache to read and fill"""
+    try:
+        if cache is not None:
+            return cache.stats(file_path)
+        columns = load_columns(file_path)
+    except FileNotFoundError:
+        print("❌ File not found:", file_path)
+        return None
+    return analyse_columns(columns)
+
+def process_log_rows(rows):
+    """Row-at-a-time reference for process_log_file(); `rows` as iter_log_rows() yields them"""
     hr_window = deque(maxlen=MOVING_AVG_WINDOW)
     stats = {
         "total": 0,
@@ -57,108 +293,608 @@ def process_log_file(file_path):
         "asleep_timestamps": []
     }
 
-    try:
-        with open(file_path, 'r') as f:
-            reader = csv.reader(f)
-            for row in reader:
-                if len(row) < 6 or row[0].lower() == "timestamp":
-                    continue
+    for timestamp, hr, br, temp, humidity, pressure in rows:
+        stats["total"] += 1
+        stats["hr_values"].append(hr)
+        stats["br_values"].append(br)
+        stats["temp_values"].append(temp)
+        stats["humidity_values"].append(humidity)
+        stats["pressure_values"].append(pressure)
+
+        hr_window.append(hr)
+        if len(hr_window) == MOVING_AVG_WINDOW:
+            state = detect_sleep_state(hr_window)
+            stats[state.lower()] += 1
+            if state.lower() == "asleep":
+                stats["asleep_timestamps"].append(timestamp)
+
+        if classify_br(br) == "Abnormally Low":
+            stats["br_low"] += 1
+        elif classify_br(br) == "Abnormally High":
+            stats["br_high"] += 1
+
+        temp_state = classify_temp(temp)
+        if temp_state == "Comfortable":
+            stats["temp_good"] += 1
+        elif temp_state == "Too Cold":
+            stats["temp_cold"] += 1
+        else:
+            stats["temp_hot"] += 1
+
+    return stats
+
+# ==== Sleep staging ====
+# detect_sleep_state() labels 5-sample windows and the sleep duration runs
+# from the first asleep window to the last, awakenings included. Staging
+# cuts the night into 30 s epochs instead and scores each one from its HR
+# level (relative to the night's own sleeping baseline), beat-to-beat HR
+# variability and movement artefacts, smoothed over a few epochs:
+#   wake   HR well above baseline, or moving with HR raised
+#   deep   HR near baseline and the steadiest variability of the night
+#   rem    HR raised and variable, without movement
+#   light  everything else
+# Features are bincount()s over epoch indices and the smoothing is a
+# convolution, so a night takes milliseconds at any sample rate.
+
+EPOCH_SECONDS = 30
+WAKE, LIGHT, DEEP, REM = 0, 1, 2, 3
+NO_DATA = -1
+STAGE_NAMES = ("wake", "light", "deep", "rem")
+MOVEMENT_HR_JUMP = 20       # bpm between consecutive samples: the radar reports garbage while the subject moves
+MOVEMENT_FRACTION = 0.04    # share of an epoch's samples that makes it a movement epoch
+STAGE_SMOOTHING_EPOCHS = 5
+BASELINE_PERCENTILE = 10    # of smoothed epoch HR: the night's sleeping HR
+WAKE_HR_RISE = 12.5         # bpm above baseline
+AROUSAL_HR_RISE = 7         # bpm above baseline that, with movement, means awake
+DEEP_HR_RISE = 3.5
+DEEP_VARIABILITY_PERCENTILE = 40
+REM_VARIABILITY_RATIO = 1.25  # times the night's median variability
+SLEEP_ONSET_EPOCHS = 3      # consecutive sleep epochs that mark sleep onset
+
+def _rolling_mean(values, width):
+    """Centred moving average, edges padded with the edge value"""
+    pad = width // 2
+    padded = np.pad(values, (pad, width - 1 - pad), mode="edge")
+    return np.convolve(padded, np.ones(width) / width, "valid")
+
+def _fill_gaps(values):
+    """NaNs replaced by linear interpolation between the epochs on either side"""
+    known = np.isfinite(values)
+    if known.all() or not known.any():
+        return values
+    return np.interp(np.arange(len(values)), np.flatnonzero(known), values[known])
+
+def epoch_features(columns, epoch_seconds=EPOCH_SECONDS):
+    """Per-epoch arrays: count, hr and br means, hr_var (mean |beat-to-beat change|) and movement (share
+    of artefact samples). Means and hr_var use clean samples only and are NaN where an epoch has none."""
+    hr, br = columns["hr"], columns["br"]
+    micros = columns["timestamp"].astype("datetime64[us]").astype(np.int64)
+    if not len(hr):
+        return {name: np.zeros(0) for name in ("count", "hr", "br", "hr_var", "movement")}
+    epoch = np.maximum((micros - micros[0]) // (epoch_seconds * 1_000_000), 0)
+    epochs = int(epoch.max()) + 1
+    jump = np.abs(np.diff(hr)) > MOVEMENT_HR_JUMP
+    artefact = hr <= 0
+    artefact[1:] |= jump
+    artefact[:-1] |= jump
+    clean = ~artefact
+    count = np.bincount(epoch, minlength=epochs)
+    clean_count = np.bincount(epoch, weights=clean, minlength=epochs)
+    pairs = clean[1:] & clean[:-1] & (epoch[1:] == epoch[:-1])
+    pair_count = np.bincount(epoch[1:], weights=pairs, minlength=epochs)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return {
+            "count": count,
+            "hr": np.bincount(epoch, weights=hr * clean, minlength=epochs) / clean_count,
+            "br": np.bincount(epoch, weights=br * clean, minlength=epochs) / clean_count,
+            "hr_var": np.bincount(epoch[1:], weights=np.abs(np.diff(hr)) * pairs, minlength=epochs) / pair_count,
+            "movement": np.where(count > 0, (count - clean_count) / np.maximum(count, 1), 0.0),
+        }
+
+def score_epochs(features):
+    """Stage per epoch (WAKE/LIGHT/DEEP/REM, NO_DATA where there are no samples)"""
+    has_data = features["count"] > 0
+    stages = np.full(len(has_data), NO_DATA, dtype=np.int8)
+    scored = has_data & np.isfinite(features["hr"]) & np.isfinite(features["hr_var"])
+    if not scored.any():
+        stages[has_data] = WAKE  # nothing but artefacts: someone moving about
+        return stages
+    hr = _rolling_mean(_fill_gaps(np.where(scored, features["hr"], np.nan)), STAGE_SMOOTHING_EPOCHS)
+    hr_var = _rolling_mean(_fill_gaps(np.where(scored, features["hr_var"], np.nan)), STAGE_SMOOTHING_EPOCHS)
+    movement = _rolling_mean(features["movement"], 3)
+    rise = hr - np.percentile(hr[scored], BASELINE_PERCENTILE)
+    deep = (rise < DEEP_HR_RISE) & (hr_var < np.percentile(hr_var[scored], DEEP_VARIABILITY_PERCENTILE))
+    rem = (rise > DEEP_HR_RISE) & (hr_var > REM_VARIABILITY_RATIO * np.median(hr_var[scored]))
+    wake = (rise > WAKE_HR_RISE) | ((movement > MOVEMENT_FRACTION) & (rise > AROUSAL_HR_RISE)) | ~scored
+    stages[has_data] = LIGHT
+    stages[has_data & rem] = REM
+    stages[has_data & deep] = DEEP
+    stages[has_data & wake] = WAKE
+    return stages
+
+def sleep_metrics(stages, epoch_seconds=EPOCH_SECONDS):
+    """Time in bed, total sleep time, latency and wake after sleep onset (minutes), and efficiency,
+    from a hypnogram. Time in bed counts the epochs with data."""
+    minutes = epoch_seconds / 60
+    recorded = stages != NO_DATA
+    asleep = recorded & (stages != WAKE)
+    in_bed = int(recorded.sum()) * minutes
+    metrics = {
+        "time_in_bed_minutes": in_bed,
+        "total_sleep_minutes": int(asleep.sum()) * minutes,
+        "sleep_latency_minutes": None,
+        "waso_minutes": 0.0,
+        "efficiency": float(asleep.sum() / recorded.sum()) if recorded.any() else None,
+        "stage_minutes": {name: int((stages == code).sum()) * minutes for code, name in enumerate(STAGE_NAMES)},
+    }
+    run = len(asleep) - SLEEP_ONSET_EPOCHS + 1
+    if run <= 0:
+        return metrics
+    settled = asleep[:run].copy()
+    for k in range(1, SLEEP_ONSET_EPOCHS):
+        settled &= asleep[k:k + run]
+    if not settled.any():
+        return metrics
+    onset = int(np.argmax(settled))
+    last = len(asleep) - 1 - int(np.argmax(asleep[::-1]))
+    metrics["sleep_latency_minutes"] = int(recorded[:onset].sum()) * minutes
+    metrics["waso_minutes"] = int((stages[onset:last + 1] == WAKE).sum()) * minutes
+    return metrics
+
+def sleep_staging(columns, epoch_seconds=EPOCH_SECONDS):
+    """{"start": first timestamp, "epoch_seconds", "hypnogram": int8 stages} plus sleep_metrics()"""
+    stages = score_epochs(epoch_features(columns, epoch_seconds))
+    staging = {"start": columns["timestamp"][0].item() if len(columns["timestamp"]) else None,
+               "epoch_seconds": epoch_seconds, "hypnogram": stages}
+    staging.update(sleep_metrics(stages, epoch_seconds))
+    return staging
+
+def write_hypnogram(staging, file_path):
+    """One CSV row per epoch: start time and stage"""
+    with open(file_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["timestamp", "stage"])
+        for i, stage in enumerate(staging["hypnogram"].tolist()):
+            when = staging["start"] + timedelta(seconds=i * staging["epoch_seconds"])
+            writer.writerow([when.strftime(TIMESTAMP_FORMAT), STAGE_NAMES[stage] if stage != NO_DATA else ""])
+
+# ==== Parsed-session cache ====
+# A finished session never changes, yet every report parsed it again.
+# SessionCache keeps one .npz per session file in a cache directory: the
+# parsed columns plus the counts and asleep mask of analyse_columns(). An
+# entry is used only while the file's path, size and mtime match; if the
+# thresholds changed since, the columns are still reused and only the stats
+# are recomputed. Hits refresh the entry's mtime and the least recently used
+# entries are deleted once the directory exceeds its size budget. Files
+# written to in the last CACHE_MIN_AGE seconds (a live session) are not stored.
+
+CACHE_DIR = os.environ.get("VSD_ANALYSIS_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "vsd-analysis"))
+CACHE_BUDGET_MB = float(os.environ.get("VSD_ANALYSIS_CACHE_MB", "512"))
+CACHE_MIN_AGE = 60
+COUNT_KEYS = ("total", "asleep", "awake", "uncertain", "br_low", "br_high", "temp_good", "temp_cold", "temp_hot")
+
+def analysis_params():
+    """Digest of the thresholds analyse_columns() depends on"""
+    params = (MOVING_AVG_WINDOW, AWAKE_HR_THRESHOLD, SLEEP_HR_THRESHOLD, BR_LOW_THRESHOLD, BR_HIGH_THRESHOLD,
+              TEMP_SLEEP_RANGE)
+    return hashlib.sha1(repr(params).encode()).hexdigest()[:16]
+
+class SessionCache:
+    def __init__(self, cache_dir=CACHE_DIR, budget_mb=CACHE_BUDGET_MB):
+        self.cache_dir = cache_dir
+        self.budget = int(budget_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+
+    def _entry_path(self, file_path):
+        name = hashlib.sha1(os.path.abspath(file_path).encode()).hexdigest()[:24]
+        return os.path.join(self.cache_dir, name + ".npz")
+
+    def _key(self, file_path, st):
+        return json.dumps([os.path.abspath(file_path), st.st_size, st.st_mtime_ns])
+
+    def _open(self, file_path, st):
+        """The entry's arrays if it is still valid for the file, else None"""
+        try:
+            with np.load(self._entry_path(file_path)) as entry:
+                if str(entry["key"]) != self._key(file_path, st):
+                    return None
+                return {name: entry[name] for name in entry.files}
+        except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+            return None  # missing, or cut short by a process killed mid-save: a miss, rewritten below
+
+    def contains(self, file_path):
+        """Whether there is a valid entry for the file (reads only its key)"""
+        try:
+            key = self._key(file_path, os.stat(file_path))
+            with np.load(self._entry_path(file_path)) as entry:
+                return str(entry["key"]) == key
+        except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+            return False
+
+    def columns(self, file_path):
+        """load_columns(), from the cache when possible"""
+        return self.load(file_path, stats=False)[0]
+
+    def stats(self, file_path):
+        """analyse_columns(load_columns()), from the cache when possible"""
+        return self.load(file_path)[1]
+
+    def load(self, file_path, stats=True):
+        """(columns, stats or None); raises FileNotFoundError like load_columns()"""
+        st = os.stat(file_path)
+        entry = self._open(file_path, st)
+        params = analysis_params()
+        if entry is not None:
+            self.hits += 1
+            columns = {name: entry[name] for name in ("timestamp",) + VALUE_COLUMNS}
+            if str(entry["params"]) == params or not stats:
+                counts, asleep_mask = dict(zip(COUNT_KEYS, entry["counts"].tolist())), entry["asleep"]
+                self._touch(file_path)
+            else:
+                counts, asleep_mask = column_counts(columns)
+                self._store(file_path, st, columns, counts, asleep_mask)
+        else:
+            self.misses += 1
+            columns = load_columns(file_path)
+            counts, asleep_mask = column_counts(columns)
+            self._store(file_path, st, columns, counts, asleep_mask)
+        return columns, (_stats_from_counts(columns, counts, asleep_mask) if stats else None)
+
+    def _touch(self, file_path):
+        try:
+            os.utime(self._entry_path(file_path))
+        except OSError:
+            pass
+
+    def _store(self, file_path, st, columns, counts, asleep_mask):
+        if time.time() - st.st_mtime < CACHE_MIN_AGE:
+            return
+        entry_path = self._entry_path(file_path)
+        # Written under a temporary name and renamed into place: readers never see half an entry
+        tmp = f"{entry_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp, "wb") as f:
+                np.savez(f, key=self._key(file_path, st), params=analysis_params(),
+                         counts=np.array([counts[key] for key in COUNT_KEYS], dtype=np.int64),
+                         asleep=asleep_mask, **columns)
+            os.replace(tmp, entry_path)
+        except OSError as e:
+            print(f"Analysis cache: can't store {file_path}: {e}")
+            return
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        self.evict()
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits its budget, and stale temporary files"""
+        entries = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
                 try:
-                    timestamp = datetime.strptime(row[0], "%Y-%m-%d %H:%M:%S")
-                    hr = float(row[1])
-                    br = float(row[2])
-                    temp = float(row[3])
-                    humidity = float(row[4])
-                    pressure = float(row[5])
-
-                    stats["total"] += 1
-                    stats["hr_values"].append(hr)
-                    stats["br_values"].append(br)
-                    stats["temp_values"].append(temp)
-                    stats["humidity_values"].append(humidity)
-                    stats["pressure_values"].append(pressure)
-
-                    hr_window.append(hr)
-                    if len(hr_window) == MOVING_AVG_WINDOW:
-                        state = detect_sleep_state(hr_window)
-                        stats[state.lower()] += 1
-                        if state.lower() == "asleep":
-                            stats["asleep_timestamps"].append(timestamp)
-
-                    if classify_br(br) == "Abnormally Low":
-                        stats["br_low"] += 1
-                    elif classify_br(br) == "Abnormally High":
-                        stats["br_high"] += 1
-
-                    temp_state = classify_temp(temp)
-                    if temp_state == "Comfortable":
-                        stats["temp_good"] += 1
-                    elif temp_state == "Too Cold":
-                        stats["temp_cold"] += 1
-                    else:
-                        stats["temp_hot"] += 1
-
-                except Exception:
+                    st = entry.stat()
+                except FileNotFoundError:
                     continue
-    except FileNotFoundError:
-        print("❌ File not found:", file_path)
-        return None
+                if entry.name.endswith(".npz"):
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+                elif entry.name.endswith(".tmp") and time.time() - st.st_mtime > 3600:
+                    try:
+                        os.remove(entry.path)  # left by a process killed mid-save
+                    except FileNotFoundError:
+                        pass
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.budget:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
 
-    return stats
+# ==== Streaming ====
+# process_log_rows() keeps every value so print_summary() can take min/max/
+# mean at the end. StreamingAnalysis keeps only counters, running statistics
+# and sleep-interval totals, so it works on month-long files and on live
+# sessions, and can report at any point.
+
+class RunningStats:
+    """Count, min, max, mean and variance in O(1) memory (Welford's method)"""
+
+    __slots__ = ("count", "mean", "m2", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    @classmethod
+    def of(cls, values):
+        """The stats of a whole array at once"""
+        values = np.asarray(values, dtype=np.float64)
+        stats = cls()
+        if len(values):
+            stats.count = len(values)
+            stats.mean = float(values.mean())
+            stats.m2 = float(np.square(values - stats.mean).sum())
+            stats.min = float(values.min())
+            stats.max = float(values.max())
+        return stats
+
+    def add(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+
+    def merge(self, other):
+        """Fold in the stats of another part of the data (Chan et al.'s pairwise update)"""
+        if not other.count:
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self):
+        """Population variance"""
+        return self.m2 / self.count if self.count else math.nan
+
+    def as_dict(self):
+        return {"count": self.count, "min": self.min, "max": self.max, "mean": self.mean,
+                "variance": self.variance, "std": math.sqrt(self.variance) if self.count else math.nan}
 
-def print_summary(stats):
+def _seconds_between(earlier, later):
+    gap = later - earlier
+    return gap.total_seconds() if hasattr(gap, "total_seconds") else float(gap)
+
+class StreamingAnalysis:
+    """process_log_rows() in constant memory; feed it rows from any iterator and call summary() at any time"""
+
+    def __init__(self):
+        self.counts = dict.fromkeys(COUNT_KEYS, 0)
+        self.metrics = {name: RunningStats() for name in VALUE_COLUMNS}
+        self.first_asleep = None
+        self.last_asleep = None
+        self.asleep_seconds = 0.0   # summed sleep intervals
+        self.sleep_intervals = 0    # asleep windows with gaps of at most SLEEP_INTERVAL_GAP between them
+        self.longest_sleep = 0.0
+        self._hr_window = deque(maxlen=MOVING_AVG_WINDOW)
+        self._run = 0.0
+
+    def add(self, timestamp, hr, br, temp, humidity, pressure):
+        counts = self.counts
+        counts["total"] += 1
+        for name, value in zip(VALUE_COLUMNS, (hr, br, temp, humidity, pressure)):
+            self.metrics[name].add(value)
+
+        self._hr_window.append(hr)
+        asleep = False
+        if len(self._hr_window) == MOVING_AVG_WINDOW:
+            state = detect_sleep_state(self._hr_window).lower()
+            counts[state] += 1
+            asleep = state == "asleep"
+        if asleep:
+            gap = _seconds_between(self.last_asleep, timestamp) if self.last_asleep is not None else None
+            if gap is not None and 0 <= gap <= SLEEP_INTERVAL_GAP:
+                self.asleep_seconds += gap
+                self._run += gap
+            else:
+                self.sleep_intervals += 1
+                self._run = 0.0
+            self.longest_sleep = max(self.longest_sleep, self._run)
+            if self.first_asleep is None:
+                self.first_asleep = timestamp
+            self.last_asleep = timestamp
+
+        br_state = classify_br(br)
+        if br_state == "Abnormally Low":
+            counts["br_low"] += 1
+        elif br_state == "Abnormally High":
+            counts["br_high"] += 1
+        temp_state = classify_temp(temp)
+        if temp_state == "Comfortable":
+            counts["temp_good"] += 1
+        elif temp_state == "Too Cold":
+            counts["temp_cold"] += 1
+        else:
+            counts["temp_hot"] += 1
+
+    def feed(self, rows):
+        for row in rows:
+            self.add(*row)
+        return self
+
+    def summary(self):
+        """The summary so far, in the shape print_report() takes"""
+        summary = dict(self.counts)
+        summary.update({name: stats.as_dict() for name, stats in self.metrics.items()})
+        summary["sleep_minutes"] = (_seconds_between(self.first_asleep, self.last_asleep) / 60
+                                    if self.first_asleep is not None else None)
+        summary["asleep_minutes"] = self.asleep_seconds / 60
+        summary["sleep_intervals"] = self.sleep_intervals
+        summary["longest_sleep_minutes"] = self.longest_sleep / 60
+        return summary
+
+LOG_RESET = object()  # follow_log_rows(): the file was truncated, the rows that follow are a new session
+
+def follow_log_rows(file_path, poll=1.0):
+    """iter_log_rows() for a CSV that is still being written: waits for new lines, like tail -f.
+
+    Yields LOG_RESET when the file is truncated and read again from the start.
+    """
+    with open(file_path, 'r') as f:
+        partial = ""
+        while True:
+            line = f.readline()
+            if not line:
+                if os.fstat(f.fileno()).st_size < f.tell():
+                    f.seek(0)  # truncated: the logger started a new session
+                    partial = ""
+                    yield LOG_RESET
+                time.sleep(poll)
+                continue
+            if not line.endswith("\n"):
+                partial += line
+                continue
+            line, partial = partial + line, ""
+            row = _parse_row(next(csv.reader([line]), []))
+            if row is not None:
+                yield row
+
+# ==== Report ====
+
+def summarise_stats(stats):
+    """The summary of a process_log_file() stats dict, in the shape print_report() takes"""
+    summary = {key: stats[key] for key in ("total", "asleep", "awake", "uncertain", "br_low", "br_high",
+                                           "temp_good", "temp_cold", "temp_hot")}
+    for name in VALUE_COLUMNS:
+        values = stats[f"{name}_values"]
+        summary[name] = {"count": len(values), "min": min(values), "max": max(values),
+                         "mean": sum(values) / len(values)} if values else {"count": 0}
+    timestamps = stats["asleep_timestamps"]
+    summary["sleep_minutes"] = (timestamps[-1] - timestamps[0]).total_seconds() / 60 if timestamps else None
+    return summary
+
+def print_summary(stats, staging=None):
     if not stats or stats["total"] == 0:
         print("No valid data to analyze.")
         return
+    summary = summarise_stats(stats)
+    if staging is not None:
+        summary["staging"] = staging
+    print_report(summary)
+
+def print_report(summary):
+    if not summary or summary["total"] == 0:
+        print("No valid data to analyze.")
+        return
 
     print("\n Sleep Doc Analysis Report")
-    print(f"Total Readings: {stats['total']}")
+    print(f"Total Readings: {summary['total']}")
 
     # Heart Rate
-    hr = stats["hr_values"]
+    hr = summary["hr"]
     print(f"\n❤️ Heart Rate:")
-    print(f" ▸ Highest: {max(hr):.2f} BPM")
-    print(f" ▸ Lowest:  {min(hr):.2f} BPM")
-    print(f" ▸ Asleep (<{SLEEP_HR_THRESHOLD}): {stats['asleep']}")
-    print(f" ▸ Awake  (>{AWAKE_HR_THRESHOLD}): {stats['awake']}")
-    print(f" ▸ Uncertain: {stats['uncertain']}")
+    print(f" ▸ Highest: {hr['max']:.2f} BPM")
+    print(f" ▸ Lowest:  {hr['min']:.2f} BPM")
+    print(f" ▸ Asleep (<{SLEEP_HR_THRESHOLD}): {summary['asleep']}")
+    print(f" ▸ Awake  (>{AWAKE_HR_THRESHOLD}): {summary['awake']}")
+    print(f" ▸ Uncertain: {summary['uncertain']}")
 
     # Breathing Rate
-    br = stats["br_values"]
+    br = summary["br"]
     print(f"\n Breathing Rate:")
-    print(f" ▸ Highest: {max(br):.2f} BPM")
-    print(f" ▸ Lowest:  {min(br):.2f} BPM")
-    print(f" ▸ Abnormally Low (<{BR_LOW_THRESHOLD}): {stats['br_low']}")
-    print(f" ▸ Abnormally High (>{BR_HIGH_THRESHOLD}): {stats['br_high']}")
-    print(f" ▸ Normal: {stats['total'] - stats['br_low'] - stats['br_high']}")
+    print(f" ▸ Highest: {br['max']:.2f} BPM")
+    print(f" ▸ Lowest:  {br['min']:.2f} BPM")
+    print(f" ▸ Abnormally Low (<{BR_LOW_THRESHOLD}): {summary['br_low']}")
+    print(f" ▸ Abnormally High (>{BR_HIGH_THRESHOLD}): {summary['br_high']}")
+    print(f" ▸ Normal: {summary['total'] - summary['br_low'] - summary['br_high']}")
 
     # Temperature
-    temp = stats["temp_values"]
+    temp = summary["temp"]
     print(f"\n🌡️ Temperature:")
-    print(f" ▸ Max: {max(temp):.2f} °C")
-    print(f" ▸ Min: {min(temp):.2f} °C")
-    print(f" ▸ Avg: {sum(temp)/len(temp):.2f} °C")
-    print(f" ▸ Comfortable: {stats['temp_good']}")
-    print(f" ▸ Too Cold:    {stats['temp_cold']}")
-    print(f" ▸ Too Hot:     {stats['temp_hot']}")
+    print(f" ▸ Max: {temp['max']:.2f} °C")
+    print(f" ▸ Min: {temp['min']:.2f} °C")
+    print(f" ▸ Avg: {temp['mean']:.2f} °C")
+    print(f" ▸ Comfortable: {summary['temp_good']}")
+    print(f" ▸ Too Cold:    {summary['temp_cold']}")
+    print(f" ▸ Too Hot:     {summary['temp_hot']}")
 
     # Humidity
-    humidity = stats["humidity_values"]
-    print(f"\n Humidity Avg: {sum(humidity)/len(humidity):.2f} %")
+    print(f"\n Humidity Avg: {summary['humidity']['mean']:.2f} %")
 
     # Pressure
-    pressure = stats["pressure_values"]
-    print(f" Pressure Avg: {sum(pressure)/len(pressure):.2f} hPa")
+    print(f" Pressure Avg: {summary['pressure']['mean']:.2f} hPa")
 
     # Sleep Duration
-    timestamps = stats["asleep_timestamps"]
-    if timestamps:
-        duration = (timestamps[-1] - timestamps[0]).total_seconds() / 60  # minutes
-        print(f"\n Estimated Sleep Duration: {duration:.1f} minutes")
+    if summary["sleep_minutes"] is not None:
+        print(f"\n Estimated Sleep Duration: {summary['sleep_minutes']:.1f} minutes")
     else:
         print("\n Estimated Sleep Duration: Not enough data")
+    if "sleep_intervals" in summary:
+        print(f" ▸ Asleep: {summary['asleep_minutes']:.1f} minutes in {summary['sleep_intervals']} intervals "
+              f"(longest {summary['longest_sleep_minutes']:.1f})")
+    staging = summary.get("staging")
+    if staging is not None:
+        print(f"\n Sleep Stages ({staging['epoch_seconds']} s epochs):")
+        print(f" ▸ Total Sleep Time: {staging['total_sleep_minutes']:.1f} minutes "
+              f"of {staging['time_in_bed_minutes']:.1f} in bed")
+        if staging["sleep_latency_minutes"] is not None:
+            print(f" ▸ Sleep Latency: {staging['sleep_latency_minutes']:.1f} minutes")
+            print(f" ▸ Awake After Sleep Onset: {staging['waso_minutes']:.1f} minutes")
+        if staging["efficiency"] is not None:
+            print(f" ▸ Sleep Efficiency: {staging['efficiency'] * 100:.0f} %")
+        print(" ▸ " + ", ".join(f"{name.upper() if name == 'rem' else name.capitalize()} {m:.0f}" for name, m in staging["stage_minutes"].items())
+              + " minutes")
 
     print("\n✅ End of Report\n")
 
-# ==== Run ===stats = process_log_file(INPUT_FILE)
-print_summary(stats)
+# ==== Run ====
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Sleep Doc session analysis")
+    parser.add_argument("file", nargs="?", default=INPUT_FILE, help=".csv or .vsdb session (default: data_live.csv)")
+    parser.add_argument("--stream", action="store_true", help="constant-memory streaming analysis")
+    parser.add_argument("--follow", action="store_true", help="keep reading as the session grows (implies --stream)")
+    parser.add_argument("--every", type=float, default=60.0, help="with --follow, seconds between partial reports")
+    parser.add_argument("--no-cache", action="store_true", help=f"don't read or fill the parsed-session cache ({CACHE_DIR})")
+    parser.add_argument("--hypnogram", metavar="CSV", help="write the sleep stage of every epoch to this file")
+    args = parser.parse_args(argv)
+
+    if not (args.stream or args.follow):
+        try:
+            if args.no_cache:
+                columns = load_columns(args.file)
+                stats = analyse_columns(columns)
+            else:
+                columns, stats = SessionCache().load(args.file)
+        except FileNotFoundError:
+            print("❌ File not found:", args.file)
+            return 1
+        staging = sleep_staging(columns) if stats["total"] else None
+        print_summary(stats, staging)
+        if args.hypnogram and staging is not None:
+            write_hypnogram(staging, args.hypnogram)
+            print(f"Hypnogram written to {args.hypnogram}")
+        return 0
+    analysis = StreamingAnalysis()
+    try:
+        if not args.follow:
+            analysis.feed(iter_log_rows(args.file))
+        else:
+            next_report = time.monotonic() + args.every
+            for row in follow_log_rows(args.file):
+                if row is LOG_RESET:
+                    print("Log truncated, starting a new session")
+                    print_report(analysis.summary())
+                    analysis = StreamingAnalysis()
+                    next_report = time.monotonic() + args.every
+                    continue
+                analysis.add(*row)
+                if time.monotonic() >= next_report:
+                    print_report(analysis.summary())
+                    next_report = time.monotonic() + args.every
+    except FileNotFoundError:
+        print("❌ File not found:", args.file)
+        return 1
+    except KeyboardInterrupt:
+        pass
+    print_report(analysis.summary())
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,345 @@
+"""
+Batch analysis of many sessions at once.
+
+analysis.py looks at one file. This runs the same analysis over a whole
+Data_collected directory (or any list/glob of session files) on a process
+pool and writes one JSON report:
+
+    sessions   one summary per file (analysis.py's counts, per-metric
+               min/max/mean/std, sleep intervals)
+    nights     sessions merged per night; a night runs from noon to noon,
+               so a session started after midnight joins the evening before
+    overall    every night merged, plus the spread of the nightly values
+
+Each file is one task; a CSV larger than --chunk-mb is split at line
+boundaries into several. Tasks return a `Part`, a few hundred bytes of
+mergeable state, rather than any samples: counters add up, running
+statistics merge pairwise (RunningStats.merge), and the moving-average
+windows that straddle a chunk boundary are scored at merge time from the
+last and first rows each part keeps. A chunked file gives the same counts
+and sleep intervals as reading it in one go; means and variances are
+merged in a different order, so they can differ in the last bits.
+
+When a session exists as both .csv and .vsdb, only the .vsdb is read.
+Whole-file tasks go through analysis.py's parsed-session cache (unless
+--no-cache), and a file with a valid cache entry is never chunked, so a
+repeat run over past nights mostly reads .npz entries. Chunked tasks parse
+their byte range directly and do not fill the cache.
+
+    python3 analysis_batch.py Data_collected --out report.json
+    python3 analysis_batch.py "Data_collected/vitals_2025-0*.csv" --workers 4
+"""
+
+import argparse
+import glob
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from functools import partial
+
+import numpy as np
+
+from analysis import (CACHE_DIR, COUNT_KEYS, MOVING_AVG_WINDOW, SLEEP_INTERVAL_GAP, VALUE_COLUMNS, RunningStats, SessionCache,
+                      column_counts, detect_sleep_state, load_columns, load_csv_text)
+
+CHUNK_MB = 32
+NIGHT_STARTS_AT = 12  # hour of day at which one night ends and the next begins
+CONTEXT = MOVING_AVG_WINDOW - 1  # rows a window needs from before a chunk boundary
+
+
+def _iso(seconds):
+    """Local wall-clock seconds (as load_columns() timestamps) -> ISO string"""
+    if seconds is None:
+        return None
+    return (datetime(1970, 1, 1) + timedelta(seconds=seconds)).isoformat(timespec="seconds")
+
+
+def _finite(value):
+    return value if value is None or math.isfinite(value) else None
+
+
+class Part:
+    """Mergeable analysis state of a contiguous run of rows (a chunk, a session or a night)"""
+
+    def __init__(self):
+        self.counts = dict.fromkeys(COUNT_KEYS, 0)
+        self.metrics = {name: RunningStats() for name in VALUE_COLUMNS}
+        self.head = []          # (seconds, hr) of the first CONTEXT rows
+        self.tail = []          # (seconds, hr) of the last CONTEXT rows
+        self.start = None       # first / last row, local seconds
+        self.end = None
+        # Sleep intervals: asleep windows at most SLEEP_INTERVAL_GAP apart
+        self.first_asleep = None
+        self.last_asleep = None
+        self.intervals = 0
+        self.asleep_seconds = 0.0
+        self.longest = 0.0
+        self.leading = 0.0      # length of the first interval
+        self.trailing = 0.0     # length of the last interval
+
+    @classmethod
+    def from_columns(cls, columns):
+        part = cls()
+        seconds = columns["timestamp"].astype("datetime64[us]").astype(np.int64) / 1e6
+        counts, asleep = column_counts(columns)
+        part.counts.update(counts)
+        part.metrics = {name: RunningStats.of(columns[name]) for name in VALUE_COLUMNS}
+        rows = list(zip(seconds.tolist(), columns["hr"].tolist()))
+        part.head, part.tail = rows[:CONTEXT], rows[-CONTEXT:] if CONTEXT else []
+        if len(rows):
+            part.start, part.end = float(seconds[0]), float(seconds[-1])
+        part._set_sleep(seconds[MOVING_AVG_WINDOW - 1:][asleep])
+        return part
+
+    def _set_sleep(self, asleep_seconds):
+        """Sleep-interval fields from the (sorted) times of the asleep windows"""
+        if not len(asleep_seconds):
+            return
+        gaps = np.diff(asleep_seconds)
+        joined = (gaps >= 0) & (gaps <= SLEEP_INTERVAL_GAP)
+        run = np.r_[0, np.cumsum(~joined)]          # interval index of each asleep window
+        lengths = np.bincount(run[1:], weights=np.where(joined, gaps, 0.0), minlength=run[-1] + 1)
+        self.first_asleep, self.last_asleep = float(asleep_seconds[0]), float(asleep_seconds[-1])
+        self.intervals = int(run[-1]) + 1
+        self.asleep_seconds = float(lengths.sum())
+        self.longest = float(lengths.max())
+        self.leading, self.trailing = float(lengths[0]), float(lengths[-1])
+
+    def merge(self, other, contiguous=True):
+        """This part followed by `other`. `contiguous`: the same recording (windows span the boundary)."""
+        if contiguous and self.tail and other.head:
+            self._merge(self._boundary(other))
+        self._merge(other, contiguous)
+        if contiguous:
+            head = self.head + (other.head if len(self.head) < CONTEXT else [])
+            tail = (self.tail if len(other.tail) < CONTEXT else []) + other.tail
+            self.head, self.tail = head[:CONTEXT], tail[-CONTEXT:] if CONTEXT else []
+        else:
+            self.head, self.tail = [], []
+        return self
+
+    def _boundary(self, other):
+        """The windows that end in `other`'s first rows but start in this part"""
+        rows = self.tail + other.head
+        middle = Part()
+        asleep = []
+        for end in range(len(self.tail), len(rows)):
+            if end + 1 < MOVING_AVG_WINDOW:
+                continue
+            state = detect_sleep_state([hr for _, hr in rows[end + 1 - MOVING_AVG_WINDOW:end + 1]]).lower()
+            middle.counts[state] += 1
+            if state == "asleep":
+                asleep.append(rows[end][0])
+        middle._set_sleep(np.array(asleep))
+        return middle
+
+    def _merge(self, other, contiguous=True):
+        for key in COUNT_KEYS:
+            self.counts[key] += other.counts[key]
+        for name in VALUE_COLUMNS:
+            self.metrics[name].merge(other.metrics[name])
+        if other.start is not None:
+            if self.start is None:
+                self.start, self.end = other.start, other.end
+            elif contiguous:
+                self.end = other.end
+            else:
+                self.start, self.end = min(self.start, other.start), max(self.end, other.end)
+        if not other.intervals:
+            return
+        if not self.intervals:
+            for key in ("first_asleep", "last_asleep", "intervals", "asleep_seconds", "longest", "leading", "trailing"):
+                setattr(self, key, getattr(other, key))
+            return
+        gap = other.first_asleep - self.last_asleep
+        if 0 <= gap <= SLEEP_INTERVAL_GAP:
+            joined = self.trailing + gap + other.leading
+            self.leading = joined if self.intervals == 1 else self.leading
+            self.trailing = joined if other.intervals == 1 else other.trailing
+            self.longest = max(self.longest, other.longest, joined)
+            self.intervals += other.intervals - 1
+            self.asleep_seconds += gap + other.asleep_seconds
+        else:
+            self.trailing = other.trailing
+            self.longest = max(self.longest, other.longest)
+            self.intervals += other.intervals
+            self.asleep_seconds += other.asleep_seconds
+        self.last_asleep = other.last_asleep
+        if not contiguous:
+            # Sessions of one night can overlap (two devices): the span runs from the earliest to the latest
+            self.first_asleep = min(self.first_asleep, other.first_asleep)
+            self.last_asleep = max(self.last_asleep, other.last_asleep)
+
+    def summary(self):
+        """analysis.StreamingAnalysis.summary() fields, JSON-ready"""
+        summary = dict(self.counts)
+        for name, stats in self.metrics.items():
+            summary[name] = {key: _finite(value) if isinstance(value, float) else value
+                             for key, value in stats.as_dict().items()}
+        summary["start"], summary["end"] = _iso(self.start), _iso(self.end)
+        summary["sleep_minutes"] = ((self.last_asleep - self.first_asleep) / 60
+                                    if self.first_asleep is not None else None)
+        summary["asleep_minutes"] = self.asleep_seconds / 60
+        summary["sleep_intervals"] = self.intervals
+        summary["longest_sleep_minutes"] = self.longest / 60
+        return summary
+
+
+# --- Tasks (run in the pool) ---
+
+def read_csv_range(path, start, end):
+    """The text of the lines that start within [start, end) of a CSV file"""
+    with open(path, "rb") as f:
+        if start > 0:
+            f.seek(start - 1)
+            f.readline()        # finish the line that started in the previous range
+        if f.tell() >= end:
+            return ""
+        data = f.read(end - f.tell())
+        if data and not data.endswith(b"\n"):
+            data += f.readline()
+    # Text-mode semantics of analysis.load_columns(): UTF-8, universal newlines, no unterminated last line
+    text = data.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+    return text[:text.rfind("\n") + 1]
+
+
+def analyse_range(path, start=None, end=None, cache_dir=None):
+    if start is None:
+        return Part.from_columns(SessionCache(cache_dir).columns(path) if cache_dir else load_columns(path))
+    return Part.from_columns(load_csv_text(read_csv_range(path, start, end)))
+
+
+def _run_task(task, cache_dir=None):
+    path, start, end = task
+    try:
+        return task, analyse_range(path, start, end, cache_dir), None
+    except (OSError, ValueError) as e:
+        return task, None, str(e)
+
+
+# --- Planning and merging ---
+
+def find_sessions(targets):
+    """Session files from directories, globs and paths; a .csv with a .vsdb twin is dropped"""
+    paths = set()
+    for target in targets:
+        if os.path.isdir(target):
+            paths.update(glob.glob(os.path.join(target, "vitals_*.csv")))
+            paths.update(glob.glob(os.path.join(target, "vitals_*.vsdb")))
+        else:
+            paths.update(p for p in glob.glob(target) if p.endswith((".csv", ".vsdb")))
+    return sorted(p for p in paths if not (p.endswith(".csv") and p[:-4] + ".vsdb" in paths))
+
+
+def plan_tasks(paths, chunk_bytes, cache_dir=None):
+    """(path, start, end) byte ranges, biggest first so the pool stays busy to the end.
+    A file already in the cache is one task: reading its entry beats parsing chunks."""
+    cache = SessionCache(cache_dir) if cache_dir else None
+    tasks = []
+    for path in paths:
+        size = os.path.getsize(path)
+        if path.endswith(".csv") and size > chunk_bytes and not (cache and cache.contains(path)):
+            tasks += [(path, start, min(start + chunk_bytes, size)) for start in range(0, size, chunk_bytes)]
+        else:
+            tasks.append((path, None, None))
+    return sorted(tasks, key=lambda t: -(t[2] - t[1] if t[1] is not None else os.path.getsize(t[0])))
+
+
+def night_of(seconds):
+    return (datetime(1970, 1, 1) + timedelta(seconds=seconds - NIGHT_STARTS_AT * 3600)).date().isoformat()
+
+
+def run_batch(paths, workers=None, chunk_bytes=CHUNK_MB * 1024 * 1024, cache_dir=None):
+    """The report for `paths`; `cache_dir`: a SessionCache directory for the whole-file tasks"""
+    tasks = plan_tasks(paths, chunk_bytes, cache_dir)
+    run = partial(_run_task, cache_dir=cache_dir)
+    if workers == 1:
+        done = list(map(run, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            done = list(pool.map(run, tasks))
+    results, errors = {}, {}
+    for task, part, error in done:
+        if error:
+            errors[task[0]] = error
+        else:
+            results[task] = part
+
+    sessions = {}
+    for task in sorted(results, key=lambda t: (t[0], t[1] or 0)):
+        path = task[0]
+        if path in errors:
+            continue
+        sessions[path] = results[task] if path not in sessions else sessions[path].merge(results[task])
+
+    nights = {}
+    for path, part in sorted(sessions.items(), key=lambda item: (item[1].start or 0, item[0])):
+        if part.start is None:
+            continue
+        night = night_of(part.start)
+        entry = nights.setdefault(night, {"sessions": [], "part": Part()})
+        entry["sessions"].append(os.path.basename(path))
+        entry["part"].merge(part, contiguous=False)
+
+    overall = Part()
+    spread = {key: RunningStats() for key in ("sleep_minutes", "asleep_minutes", "hr_mean", "br_mean")}
+    for entry in nights.values():
+        overall.merge(entry["part"], contiguous=False)
+        summary = entry["part"].summary()
+        for key, value in (("sleep_minutes", summary["sleep_minutes"]), ("asleep_minutes", summary["asleep_minutes"]),
+                           ("hr_mean", summary["hr"]["mean"]), ("br_mean", summary["br"]["mean"])):
+            if value is not None:
+                spread[key].add(value)
+
+    overall_summary = overall.summary()
+    overall_summary["nights"] = len(nights)
+    overall_summary["per_night"] = {key: {k: _finite(v) for k, v in stats.as_dict().items()}
+                                    for key, stats in spread.items()}
+    return {
+        "generated": datetime.now().isoformat(timespec="seconds"),
+        "tasks": len(tasks),
+        "sessions": [dict(parts.summary(), file=os.path.basename(path)) for path, parts in sessions.items()],
+        "nights": [dict(entry["part"].summary(), night=night, sessions=entry["sessions"])
+                   for night, entry in sorted(nights.items())],
+        "overall": overall_summary,
+        "errors": errors,
+    }
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("targets", nargs="+", help="directories, globs or session files")
+    parser.add_argument("--out", default="analysis_report.json")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: one per core)")
+    parser.add_argument("--chunk-mb", type=float, default=CHUNK_MB, help="split CSVs larger than this")
+    parser.add_argument("--no-cache", action="store_true", help=f"don't read or fill the parsed-session cache ({CACHE_DIR})")
+    args = parser.parse_args(argv)
+
+    paths = find_sessions(args.targets)
+    if not paths:
+        print("No sessions found.")
+        return 1
+    t = time.perf_counter()
+    report = run_batch(paths, args.workers, int(args.chunk_mb * 1024 * 1024), None if args.no_cache else CACHE_DIR)
+    elapsed = time.perf_counter() - t
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=1)
+    for night in report["nights"]:
+        sleep = night["sleep_minutes"]
+        print(f"{night['night']}: {len(night['sessions'])} session(s), {night['total']} readings, "
+              f"asleep {night['asleep_minutes']:.0f} min"
+              + (f" of {sleep:.0f}" if sleep is not None else "")
+              + f", HR {night['hr']['mean']:.1f}, BR {night['br']['mean']:.1f}")
+    for path, error in report["errors"].items():
+        print(f"{path}: {error}")
+    print(f"{len(paths)} sessions, {report['tasks']} tasks, {len(report['nights'])} nights in {elapsed:.1f} s "
+          f"-> {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
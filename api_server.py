@@ -0,0 +1,92 @@
+"""
+Serving modes for the backend's Flask API.
+
+`flask_app.run(debug=True)` is the Werkzeug development server: one thread
+per connection, no limit, no keep-alive, and the debugger enabled.
+`serve_api()` runs the same WSGI app in one of these modes:
+
+    "waitress"  waitress with a fixed pool of worker threads, HTTP/1.1
+                keep-alive and a cap on open connections. Phones and the GUI
+                reuse one connection per client instead of reconnecting on
+                every poll.
+    "pool"      Werkzeug's server behind a bounded worker pool. When every
+                worker is busy, new connections wait in the listen backlog
+                instead of spawning more threads. Werkzeug closes the
+                connection after each response, so there is no keep-alive.
+    "auto"      (default) "waitress" if it is installed, otherwise "pool".
+    "dev"       the old `flask_app.run(debug=True)` behaviour, for debugging.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+API_WORKERS = 16
+API_BACKLOG = 64
+KEEPALIVE_TIMEOUT = 30  # seconds before an idle keep-alive connection is closed (waitress)
+REQUEST_TIMEOUT = 5     # seconds a slow client may take to send its request (pool)
+
+
+class PooledRequestHandler(WSGIRequestHandler):
+    protocol_version = "HTTP/1.1"  # chunked transfer for /vitals/stream
+    timeout = REQUEST_TIMEOUT
+
+    def log_request(self, code="-", size="-"):
+        # The dev server logs every poll; at several clients every 2 s that
+        # is most of the backend's stdout.
+        pass
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """Werkzeug server that hands each connection to a fixed-size pool."""
+
+    multithread = True
+
+    def __init__(self, host, port, app, workers=API_WORKERS, backlog=API_BACKLOG):
+        self.request_queue_size = backlog
+        self.workers = workers
+        self._slots = threading.BoundedSemaphore(workers)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api")
+        super().__init__(host, port, app, handler=PooledRequestHandler)
+
+    def process_request(self, request, client_address):
+        # Block the accept loop while the pool is full so excess
+        # connections queue in the kernel backlog.
+        self._slots.acquire()
+        self._pool.submit(self._handle, request, client_address)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._slots.release()
+
+    def server_close(self):
+        super().server_close()
+        self._pool.shutdown(wait=False)
+
+
+def serve_api(app, mode="auto", host="0.0.0.0", port=5000, workers=API_WORKERS):
+    """Serve `app` forever in the given mode (see module docstring)."""
+    if mode == "auto":
+        try:
+            import waitress  # noqa: F401
+            mode = "waitress"
+        except ImportError:
+            mode = "pool"
+    if mode == "waitress":
+        from waitress import serve
+        print(f"API: waitress on {host}:{port} ({workers} threads, keep-alive)")
+        serve(app, host=host, port=port, threads=workers, backlog=API_BACKLOG,
+              connection_limit=workers + API_BACKLOG, channel_timeout=KEEPALIVE_TIMEOUT)
+    elif mode == "pool":
+        print(f"API: pooled Werkzeug server on {host}:{port} ({workers} workers)")
+        PooledWSGIServer(host, port, app, workers=workers).serve_forever()
+    elif mode == "dev":
+        app.run(host=host, port=port, debug=True, use_reloader=False)
+    else:
+        raise ValueError(f"Unknown API server mode: {mode!r}")
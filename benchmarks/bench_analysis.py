@@ -0,0 +1,82 @@
+"""
+analysis.py: row-at-a-time engine vs the columnar one.
+
+Writes a seeded synthetic 8-hour night and a 30-night log (one file, one
+night after another) as CSV, and optionally as .vsdb, then times
+process_log_rows(iter_log_rows(...)) against process_log_file(), checking
+that both return the same stats.
+
+    python3 benchmarks/bench_analysis.py
+    python3 benchmarks/bench_analysis.py --rate 1 --nights 30 --binary
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analysis import iter_log_rows, process_log_file, process_log_rows  # noqa: E402
+from synthetic_vitals import SyntheticNight, write_csv, write_vsdb  # noqa: E402
+
+START = 1_700_000_000
+
+
+def write_nights(path, nights, hours, rate, seed):
+    """Concatenate `nights` synthetic nights (a day apart) into one session file."""
+    parts = []
+    for i in range(nights):
+        night = SyntheticNight(seed + i, hours, rate, start=START + i * 86400)
+        part = f"{path}.{i}"
+        (write_vsdb if path.endswith(".vsdb") else write_csv)(night, part)
+        parts.append(part)
+    if path.endswith(".vsdb"):
+        from session_binary import BinarySession, BinarySessionWriter
+        writer = BinarySessionWriter(path)
+        for part in parts:
+            for chunk in BinarySession(part).iter_chunks():
+                writer.append_rows(zip(*(chunk[name].tolist() for name in chunk)))
+        writer.close()
+    else:
+        with open(path, "w") as out:
+            for i, part in enumerate(parts):
+                with open(part) as f:
+                    lines = f.readlines()
+                out.writelines(lines if i == 0 else lines[1:])
+    for part in parts:
+        os.remove(part)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=1.0, help="samples per second")
+    parser.add_argument("--hours", type=float, default=8.0)
+    parser.add_argument("--nights", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--binary", action="store_true", help="also time .vsdb files")
+    args = parser.parse_args()
+
+    out_dir = tempfile.mkdtemp(prefix="vsd-analysis-")
+    for ext in (".csv", ".vsdb") if args.binary else (".csv",):
+        for label, nights in (("1 night", 1), (f"{args.nights} nights", args.nights)):
+            path = os.path.join(out_dir, f"{nights}n{ext}")
+            write_nights(path, nights, args.hours, args.rate, args.seed)
+            rows_stats, rows_time = timed(lambda p: process_log_rows(iter_log_rows(p)), path)
+            cols_stats, cols_time = timed(process_log_file, path)
+            print(f"{label} {ext} ({rows_stats['total']} rows, {os.path.getsize(path) / 1e6:.1f} MB): "
+                  f"rows {rows_time:.2f} s, columnar {cols_time:.2f} s, {rows_time / cols_time:.1f}x, "
+                  f"{'identical' if rows_stats == cols_stats else 'DIFFERENT'}")
+            os.remove(path)
+    os.rmdir(out_dir)
+
+
+if __name__ == "__main__":
+    main()
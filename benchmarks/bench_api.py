@@ -0,0 +1,114 @@
+"""
+Load benchmark for the backend API.
+
+Simulates several phones plus the GUI polling `/vitals` (and optionally a few
+`/control` posts) against a running backend, each client on its own
+keep-alive connection, and reports requests/s and latency percentiles.
+
+    python3 benchmarks/bench_api.py --url http://raspberrypi.local:5000 \
+        --phones 6 --gui 1 --interval 0.1 --duration 30
+
+`--interval 0` polls as fast as the server answers (throughput test); the
+apps' real cadence is 2 s.
+"""
+
+import argparse
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return float("nan")
+    k = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+class Client(threading.Thread):
+    def __init__(self, kind, host, port, interval, deadline, control_every=0):
+        super().__init__(daemon=True)
+        self.kind = kind
+        self.host = host
+        self.port = port
+        self.interval = interval
+        self.deadline = deadline
+        self.control_every = control_every
+        self.latencies = []
+        self.errors = 0
+
+    def request(self, conn, method, path, body=None):
+        headers = {"Content-Type": "application/json"} if body else {}
+        start = time.perf_counter()
+        conn.request(method, path, body=body, headers=headers)
+        resp = conn.getresponse()
+        resp.read()
+        self.latencies.append(time.perf_counter() - start)
+        if resp.status != 200:
+            self.errors += 1
+
+    def run(self):
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=10)
+        n = 0
+        while time.time() < self.deadline:
+            try:
+                if self.control_every and n % self.control_every == self.control_every - 1:
+                    body = json.dumps({"light_on": True, "light_mode": "relaxed", "brightness": 65})
+                    self.request(conn, "POST", "/control", body)
+                else:
+                    self.request(conn, "GET", "/vitals")
+            except (OSError, http.client.HTTPException):
+                self.errors += 1
+                conn.close()
+                conn = http.client.HTTPConnection(self.host, self.port, timeout=10)
+            n += 1
+            if self.interval:
+                time.sleep(self.interval)
+        conn.close()
+
+
+def report(label, clients, elapsed):
+    lat = sorted(l for c in clients for l in c.latencies)
+    errors = sum(c.errors for c in clients)
+    if not lat:
+        print(f"{label:>6}: no completed requests ({errors} errors)")
+        return
+    print(f"{label:>6}: {len(lat):7d} req  {len(lat) / elapsed:8.1f} req/s  "
+          f"p50 {percentile(lat, 50) * 1000:6.2f} ms  p99 {percentile(lat, 99) * 1000:7.2f} ms  "
+          f"max {lat[-1] * 1000:7.2f} ms  errors {errors}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--phones", type=int, default=6)
+    parser.add_argument("--gui", type=int, default=1)
+    parser.add_argument("--interval", type=float, default=0.0, help="seconds between polls per client")
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--control-every", type=int, default=0,
+                        help="phones send a /control POST every N requests (0 = never)")
+    args = parser.parse_args()
+
+    url = urlsplit(args.url)
+    host, port = url.hostname, url.port or 80
+    deadline = time.time() + args.duration
+
+    phones = [Client("phone", host, port, args.interval, deadline, args.control_every) for _ in range(args.phones)]
+    guis = [Client("gui", host, port, args.interval, deadline) for _ in range(args.gui)]
+    start = time.perf_counter()
+    for c in phones + guis:
+        c.start()
+    for c in phones + guis:
+        c.join()
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.url}  {args.phones} phones + {args.gui} GUI  interval {args.interval}s  {elapsed:.1f}s")
+    report("phones", phones, elapsed)
+    report("gui", guis, elapsed)
+    report("total", phones + guis, elapsed)
+
+
+if __name__ == "__main__":
+    main()
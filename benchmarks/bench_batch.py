@@ -0,0 +1,78 @@
+"""
+analysis_batch.py scaling with the number of worker processes.
+
+Writes a seeded synthetic Data_collected (one CSV per night, plus one long
+multi-night CSV that gets chunked) and times run_batch() for each --workers
+value, checking that every run produces the same report (counts exactly,
+means and variances to 1e-9: merge order moves their last bits).
+
+Each line reports the wall time and the speedup over the first --workers
+value; the speedup can't exceed the number of cores it prints.
+
+    python3 benchmarks/bench_batch.py
+    python3 benchmarks/bench_batch.py --nights 60 --workers 1 2 4 8
+"""
+
+import argparse
+import math
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bench_analysis  # noqa: E402
+from analysis_batch import find_sessions, run_batch  # noqa: E402
+
+
+def same(a, b):
+    """Reports equal, floats to a relative 1e-9"""
+    if isinstance(a, dict):
+        return isinstance(b, dict) and a.keys() == b.keys() and all(same(a[k], b[k]) for k in a)
+    if isinstance(a, list):
+        return isinstance(b, list) and len(a) == len(b) and all(same(x, y) for x, y in zip(a, b))
+    if isinstance(a, float) and isinstance(b, float):
+        return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-12)
+    return a == b
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nights", type=int, default=30)
+    parser.add_argument("--hours", type=float, default=8.0)
+    parser.add_argument("--rate", type=float, default=1.0, help="samples per second")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--chunk-mb", type=float, default=8)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix="vsd-batch-")
+    for i in range(args.nights):
+        bench_analysis.START = 1_700_000_000 + i * 86400
+        bench_analysis.write_nights(os.path.join(data_dir, f"vitals_night{i:03d}.csv"), 1,
+                                    args.hours, args.rate, args.seed + i)
+    bench_analysis.START = 1_700_000_000 + args.nights * 86400
+    bench_analysis.write_nights(os.path.join(data_dir, "vitals_long.csv"), 7, args.hours, args.rate, args.seed)
+    paths = find_sessions([data_dir])
+    size = sum(os.path.getsize(p) for p in paths)
+    print(f"{len(paths)} sessions, {size / 1e6:.0f} MB, {os.cpu_count()} cores")
+
+    baseline = reference = None
+    for workers in args.workers:
+        start = time.perf_counter()
+        report = run_batch(paths, workers, int(args.chunk_mb * 1024 * 1024))
+        elapsed = time.perf_counter() - start
+        report.pop("generated")
+        report.pop("tasks")
+        reference = reference or report
+        baseline = baseline or elapsed
+        print(f"  {workers} workers: {elapsed:.2f} s, {baseline / elapsed:.2f}x, "
+              f"{'same report' if same(report, reference) else 'DIFFERENT REPORT'}")
+    shutil.rmtree(data_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Downsampling cost and payload savings for chart-ready history.
+
+Runs LTTB and the min/max envelope (downsample.py) over HR and BR of a
+seeded synthetic 8-hour night and a 30-day stretch, and reports the time
+per call and the JSON payload before and after, which is what the phone
+has to download and draw.
+
+    python3 benchmarks/bench_downsample.py
+    python3 benchmarks/bench_downsample.py --rate 20 --points 750
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from downsample import METHODS, select  # noqa: E402
+from synthetic_vitals import SyntheticNight  # noqa: E402
+
+
+def payload(t, hr, br):
+    return len(json.dumps({"t": t.tolist(), "hr": np.round(hr, 2).tolist(), "br": np.round(br, 2).tolist()}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=1.0, help="samples per second")
+    parser.add_argument("--points", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    for label, hours in (("8 h", 8), ("30 d", 30 * 24)):
+        c = SyntheticNight(args.seed, hours, args.rate, start=1_700_000_000).columns()
+        t, hr, br = c["timestamp"], c["hr"], c["br"]
+        full = payload(t, hr, br)
+        print(f"{label}: {len(t)} samples, {full / 1e6:.1f} MB as JSON")
+        for method in METHODS:
+            best = float("inf")
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                keep = select(t, [hr, br], args.points, method)
+                best = min(best, time.perf_counter() - start)
+            small = payload(t[keep], hr[keep], br[keep])
+            print(f"  {method:7s} -> {len(keep)} points in {best * 1e3:7.1f} ms, "
+                  f"{small / 1e3:.1f} kB ({full / small:.0f}x smaller)")
+
+
+if __name__ == "__main__":
+    main()
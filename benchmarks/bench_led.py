@@ -0,0 +1,58 @@
+"""
+LED renderer throughput on the no-hardware backend.
+
+Measures the cost of a rendered frame during continuous fades, and how many
+`show()` calls the frame diff saves when producers keep re-sending the same
+colour (what led_control_thread does every second).
+
+    python3 benchmarks/bench_led.py --pixels 16 --frames 20000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from led_renderer import LedRenderer, NullStrip  # noqa: E402
+
+
+def bench_fade(pixels, frames):
+    strip = NullStrip(pixels)
+    renderer = LedRenderer(strip)
+    renderer.set_layer("light", (255, 105, 180), brightness=65, fade=3600)
+    start = time.perf_counter()
+    for i in range(frames):
+        # Step the clock so every frame lands on a new fade colour
+        renderer._render_locked(renderer._fade_start + 3600 * i / frames)
+    elapsed = time.perf_counter() - start
+    print(f"fade:   {frames} frames x {pixels} px  {frames / elapsed:10.0f} frames/s  "
+          f"{elapsed / frames * 1e6:7.1f} us/frame  shows {strip.shows}")
+
+
+def bench_static(pixels, updates):
+    strip = NullStrip(pixels)
+    renderer = LedRenderer(strip)
+    start = time.perf_counter()
+    for i in range(updates):
+        renderer.set_layer("status", (255, 255, 0))
+        renderer.set_layer("light", (50, 205, 50), brightness=65)
+        if renderer._dirty:
+            renderer._dirty = renderer._render_locked(time.monotonic())
+    elapsed = time.perf_counter() - start
+    print(f"static: {updates} repeated updates  {updates / elapsed:10.0f} updates/s  "
+          f"shows {strip.shows} (old set_color path: {updates * 2})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pixels", type=int, default=16)
+    parser.add_argument("--frames", type=int, default=20000)
+    args = parser.parse_args()
+    bench_fade(args.pixels, args.frames)
+    bench_static(args.pixels, args.frames)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Session logger throughput with reproducible synthetic nights.
+
+Pushes a seeded SyntheticNight through SessionWriter (CSV, optionally with the
+.vsdb sink) as fast as the writer keeps up, staying inside its MAX_PENDING
+queue so nothing is dropped, and reports the producer cost per row and the
+sustained rows/s. --burst pushes everything at once instead, to show how
+many rows an overrun drops.
+
+    python3 benchmarks/bench_logger.py --hours 8 --rate 20 --seed 7
+    python3 benchmarks/bench_logger.py --hours 1 --rate 1000 --binary --fsync never
+
+The same --seed/--hours/--rate always feed the same rows, so runs compare.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from session_binary import BinarySessionWriter  # noqa: E402
+from session_writer import SessionWriter, MAX_PENDING  # noqa: E402
+from synthetic_vitals import SyntheticNight  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hours", type=float, default=8.0)
+    parser.add_argument("--rate", type=float, default=20.0, help="samples per second (the radar's frame rate)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--binary", action="store_true", help="also write the .vsdb copy")
+    parser.add_argument("--fsync", default="interval", choices=["always", "interval", "never"])
+    parser.add_argument("--burst", action="store_true", help="don't wait for the writer")
+    parser.add_argument("--dir", default=None, help="where to write (default: a temp dir)")
+    args = parser.parse_args()
+
+    night = SyntheticNight(args.seed, args.hours, args.rate, start=1_700_000_000)
+    rows = list(night.iter_rows())
+    out_dir = args.dir or tempfile.mkdtemp(prefix="vsd-bench-")
+    csv_path = os.path.join(out_dir, "bench.csv")
+    sinks = [BinarySessionWriter(os.path.join(out_dir, "bench.vsdb"))] if args.binary else []
+
+    writer = SessionWriter([csv_path], fsync=args.fsync, extra_sinks=sinks)
+    start = time.perf_counter()
+    producing = 0.0
+    for i, row in enumerate(rows):
+        if not args.burst and i - writer.rows_written - writer.rows_dropped >= MAX_PENDING // 2:
+            while i - writer.rows_written >= MAX_PENDING // 4:
+                time.sleep(0.001)
+        t = time.perf_counter()
+        writer.write_row(row)
+        producing += time.perf_counter() - t
+    writer.close()
+    total = time.perf_counter() - start
+
+    print(f"{len(rows)} rows ({args.hours:g} h at {args.rate:g} Hz, seed {args.seed}) -> {out_dir}")
+    print(f"  write_row     {producing / len(rows) * 1e6:.2f} us/row")
+    print(f"  drained in    {total:.2f} s  ({len(rows) / total:.0f} rows/s, "
+          f"{len(rows) / total / args.rate:.0f}x real time)")
+    print(f"  written {writer.rows_written}  dropped {writer.rows_dropped}  batches {writer.batches}  "
+          f"CSV {os.path.getsize(csv_path) / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Radar ingestion benchmark: replay a raw UART recording through the real
+mmWave parser and RadarReader, and report frames/s, tlvRead latency
+percentiles and CPU time per frame.
+
+    python3 radar_replay.py record night.vsdr --seconds 300     # on the Pi
+    python3 benchmarks/bench_radar_ingest.py night.vsdr          # max speed
+    python3 benchmarks/bench_radar_ingest.py night.vsdr --speed 1
+
+At --speed 1 the latency includes waiting for the next frame, as on the
+device; at the default --speed 0 it is pure parse cost. Needs the mmWave
+package (https://github.com/bigheadG/mmWave).
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from radar_reader import RadarReader  # noqa: E402
+from radar_replay import ReplayPort  # noqa: E402
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return float("nan")
+    k = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+def run(path, speed, max_frames):
+    from mmWave import vitalsign
+    port = ReplayPort(path, speed=speed)
+    reader = RadarReader(vitalsign.VitalSign(port), port)
+    latencies = []
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    while reader.frames_read < max_frames:
+        t = time.perf_counter()
+        frame = reader.read_frame()
+        # tlvRead may swallow the EOFError itself, so also stop once the data is used up
+        if isinstance(reader.last_error, EOFError) or (frame is None and port.pos >= len(port.data)):
+            break
+        if frame is not None:
+            latencies.append(time.perf_counter() - t)
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    return reader, latencies, wall, cpu, len(port.data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording")
+    parser.add_argument("--speed", type=float, default=0.0, help="0 = as fast as possible, 1 = recorded pace")
+    parser.add_argument("--max-frames", type=int, default=10 ** 9)
+    args = parser.parse_args()
+
+    reader, lat, wall, cpu, nbytes = run(args.recording, args.speed, args.max_frames)
+    frames = reader.frames_read
+    lat.sort()
+    print(f"{args.recording}: {nbytes / 1024:.0f} KB, speed {args.speed or 'max'}")
+    print(f"  frames        {frames}  ({frames / wall:.1f} frames/s, {nbytes / wall / 1024:.0f} KB/s)")
+    if frames:
+        print(f"  tlvRead       p50 {percentile(lat, 50) * 1e3:.3f} ms  p95 {percentile(lat, 95) * 1e3:.3f} ms  "
+              f"p99 {percentile(lat, 99) * 1e3:.3f} ms  max {lat[-1] * 1e3:.3f} ms")
+        print(f"  CPU           {cpu / frames * 1e6:.0f} us/frame  ({cpu / wall * 100:.0f}% of one core)")
+        # BM502 streams 20 frames/s; headroom is how many real-time streams one core could parse
+        print(f"  headroom      {frames / cpu / 20:.1f}x real time")
+    print(f"  dropped {reader.frames_dropped}  out-of-order {reader.frames_out_of_order}  "
+          f"errors {reader.read_errors}")
+
+
+if __name__ == "__main__":
+    main()
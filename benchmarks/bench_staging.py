@@ -0,0 +1,54 @@
+"""
+Sleep staging speed and agreement with a known hypnogram.
+
+Stages seeded synthetic nights (synthetic_vitals.SyntheticNight, which
+records the hypnogram it generated) with analysis.sleep_staging() and
+reports the time per night, epoch-by-epoch agreement, and the sleep
+metrics next to the ones the true hypnogram gives.
+
+    python3 benchmarks/bench_staging.py
+    python3 benchmarks/bench_staging.py --rate 20 --nights 3
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analysis import local_datetimes, sleep_metrics, sleep_staging  # noqa: E402
+from synthetic_vitals import SyntheticNight  # noqa: E402
+
+METRICS = ("total_sleep_minutes", "sleep_latency_minutes", "waso_minutes")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=1.0, help="samples per second")
+    parser.add_argument("--hours", type=float, default=8.0)
+    parser.add_argument("--nights", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    for i in range(args.nights):
+        night = SyntheticNight(args.seed + i, args.hours, args.rate, start=1_700_000_000)
+        columns = night.columns()
+        columns["timestamp"] = local_datetimes(columns["timestamp"])
+        start = time.perf_counter()
+        staging = sleep_staging(columns)
+        elapsed = time.perf_counter() - start
+        truth = night.hypnogram
+        scored = staging["hypnogram"][:len(truth)]
+        expected = sleep_metrics(truth)
+        wake_agreement = np.mean((scored == 0) == (truth == 0))
+        print(f"seed {args.seed + i}: {len(columns['hr'])} samples in {elapsed * 1e3:.1f} ms, "
+              f"stages {np.mean(scored == truth):.1%} agree (sleep/wake {wake_agreement:.1%}); "
+              + ", ".join(f"{key.replace('_minutes', '')} {staging[key]:.1f}/{expected[key]:.1f}" for key in METRICS)
+              + " min (scored/true)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Local control socket for the resident backend.
+
+The backend used to be spawned by the GUI on every "Start Monitoring" and
+stopped by touching /tmp/stop_vitals, which two loops polled. Now it stays
+running with monitoring paused and takes commands on a Unix socket instead.
+
+One JSON object per line in each direction:
+
+    -> {"cmd": "start"}         begin a monitoring session
+    -> {"cmd": "stop"}          end the session, stay resident
+    -> {"cmd": "status"}        current status and latest vitals
+    -> {"cmd": "shutdown"}      exit the backend
+    <- {"ok": true, ...} or {"ok": false, "error": "..."}
+
+`ControlServer.serve()` runs as a task on the backend's event loop, so the
+handlers run there too and can change shared state directly. `send_command`
+is the blocking client used by the GUI:
+
+    python3 control_socket.py status
+
+The backend runs as root, so the socket is not open to every local user:
+it lives in a directory the backend creates (mode 0o750) and both are
+group-owned by CONTROL_GROUP (the GUI user's group) with the socket at
+0o660. Each connection's peer is also checked with SO_PEERCRED: only root,
+the backend's own user and members of CONTROL_GROUP get an answer.
+"""
+
+import asyncio
+import grp
+import json
+import os
+import pwd
+import socket
+import struct
+import sys
+
+CONTROL_SOCKET = os.environ.get("VSD_CONTROL_SOCKET", "/run/vsd/control.sock")
+CONTROL_GROUP = os.environ.get("VSD_CONTROL_GROUP", "raspberry")  # the GUI user's group
+MAX_LINE = 64 * 1024
+CLIENT_TIMEOUT = 5.0
+
+
+class BackendNotRunning(Exception):
+    pass
+
+
+class CommandFailed(Exception):
+    """The backend answered {"ok": false}: permission denied, or the handler failed"""
+
+
+def run_command(cmd, path=CONTROL_SOCKET, timeout=CLIENT_TIMEOUT, **args):
+    """send_command(), raising CommandFailed with the backend's error unless the reply is ok"""
+    reply = send_command(cmd, path, timeout, **args)
+    if not reply.get("ok"):
+        raise CommandFailed(reply.get("error", "unknown error"))
+    return reply
+
+
+def send_command(cmd, path=CONTROL_SOCKET, timeout=CLIENT_TIMEOUT, **args):
+    """Send one command and return the reply dict. Raises BackendNotRunning if nothing listens."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        try:
+            sock.connect(path)
+        except (FileNotFoundError, ConnectionRefusedError) as e:
+            raise BackendNotRunning(f"no backend on {path}") from e
+        sock.sendall(json.dumps(dict(args, cmd=cmd)).encode() + b"\n")
+        reply = b""
+        while not reply.endswith(b"\n"):
+            chunk = sock.recv(4096)
+            if not chunk:
+                break
+            reply += chunk
+    finally:
+        sock.close()
+    if not reply:
+        raise BackendNotRunning("backend closed the control connection")
+    return json.loads(reply)
+
+
+def _group_id(name):
+    try:
+        return grp.getgrnam(name).gr_gid
+    except KeyError:
+        return None
+
+
+def peer_credentials(sock):
+    """(pid, uid, gid) of the process at the other end of a Unix socket"""
+    creds = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    return struct.unpack("3i", creds)
+
+
+class ControlServer:
+    def __init__(self, handlers, path=CONTROL_SOCKET, group=CONTROL_GROUP, mode=0o660):
+        self.handlers = handlers   # name -> callable(**args) returning a dict (or a coroutine of one)
+        self.path = path
+        self.group = group
+        self.gid = _group_id(group)
+        self.mode = mode
+        self.commands = 0
+        self.rejected = 0          # connections from peers that may not control the backend
+
+    def claim_path(self):
+        """Create the socket directory and remove a stale socket. Call once, before serve()."""
+        if self.gid is None:
+            print(f"Control socket: no group {self.group!r}, only root and this user can connect")
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory, mode=0o750)
+            self._set_group(directory)
+        if not os.path.exists(self.path):
+            return
+        try:
+            send_command("status", self.path, timeout=1)
+        except (BackendNotRunning, OSError, ValueError):
+            os.unlink(self.path)  # left behind by a backend that died
+            return
+        raise RuntimeError(f"another backend is already listening on {self.path}")
+
+    def _set_group(self, path):
+        if self.gid is None:
+            return
+        try:
+            os.chown(path, -1, self.gid)
+        except PermissionError as e:
+            print(f"Control socket: can't give {path} to group {self.group!r}: {e}")
+
+    def peer_allowed(self, uid, gid):
+        if uid in (0, os.geteuid()) or (self.gid is not None and gid == self.gid):
+            return True
+        if self.gid is None:
+            return False
+        try:
+            return pwd.getpwuid(uid).pw_name in grp.getgrgid(self.gid).gr_mem
+        except KeyError:
+            return False
+
+    async def serve(self):
+        server = await asyncio.start_unix_server(self._handle, self.path, limit=MAX_LINE)
+        self._set_group(self.path)
+        os.chmod(self.path, self.mode)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+    async def _handle(self, reader, writer):
+        try:
+            _, uid, gid = peer_credentials(writer.get_extra_info("socket"))
+            if not self.peer_allowed(uid, gid):
+                self.rejected += 1
+                print(f"Control socket: rejected a connection from uid {uid}")
+                writer.write(json.dumps({"ok": False, "error": "permission denied"}).encode() + b"\n")
+                await writer.drain()
+                return
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                reply = await self._dispatch(line)
+                writer.write(json.dumps(reply).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        except asyncio.CancelledError:
+            pass  # backend shutting down; don't let asyncio log the connection task
+        finally:
+            writer.close()
+
+    async def _dispatch(self, line):
+        try:
+            request = json.loads(line)
+            args = dict(request)
+            handler = self.handlers[args.pop("cmd")]
+        except (ValueError, KeyError, TypeError):
+            return {"ok": False, "error": f"unknown command, expected one of {sorted(self.handlers)}"}
+        self.commands += 1
+        try:
+            result = handler(**args)
+            if asyncio.iscoroutine(result):
+                result = await result
+        except Exception as e:
+            print("Control command error:", e)
+            return {"ok": False, "error": str(e)}
+        return dict(result or {}, ok=True)
+
+
+def main(argv):
+    if len(argv) != 1:
+        print("usage: control_socket.py start|stop|status|shutdown")
+        return 2
+    try:
+        print(json.dumps(send_command(argv[0]), indent=2))
+    except BackendNotRunning as e:
+        print(e)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
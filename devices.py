@@ -0,0 +1,234 @@
+"""
+Device layer for the backend: real Pi peripherals or simulated ones.
+
+`open_devices("real")` opens the WS2812 strip, the APDS9960 gesture sensor, the
+BME280 and the BM502 radar. A peripheral that is missing or fails to open is
+reported and left out (the LED strip becomes a `NullStrip`), so the backend
+still starts.
+
+`open_devices("sim")` builds stand-ins that need no hardware and no Pi-only
+libraries:
+
+    SimVitalSign   speaks the mmWave `tlvRead`/`getHeader` interface and
+                   produces frames at the BM502's 20 fps times `speed`
+                   (speed=0: as fast as the consumer reads). HR/BR come
+                   from a seeded SyntheticNight (synthetic_vitals.py) or
+                   are replayed from a session CSV.
+    SimEnvSensor   slowly drifting temperature/humidity/pressure
+    SimGesture     replays a script of (seconds, "LEFT"/"RIGHT") swipes;
+                   by default it swipes LEFT once to start monitoring
+    NullStrip      counts show() calls
+
+This lets the whole pipeline (reader, logger, API, LEDs) run and be
+load-tested on any Linux box.
+
+With `radar_replay=<file.vsdr>` either backend parses a raw UART recording
+through the real mmWave parser instead (see radar_replay.py), and
+`radar_record=<file.vsdr>` tees the live port into a recording.
+"""
+
+import math
+import random
+import time
+from types import SimpleNamespace
+
+from led_renderer import NullStrip
+
+RADAR_PORT = "/dev/ttyUSB0"
+RADAR_BAUD = 921600
+RADAR_FPS = 20
+BME280_ADDRESS = 0x77
+SIM_SEED = 7
+SIM_GESTURES = ((1.0, "LEFT"),)
+
+GESTURE_LEFT = 0x03
+GESTURE_RIGHT = 0x04
+
+
+class Devices(SimpleNamespace):
+    """strip, gesture, env, radar_port, vts, backend. Absent devices are None."""
+
+
+# --- Real hardware ---
+
+class ApdsGesture:
+    def __init__(self):
+        import board
+        import busio
+        from adafruit_apds9960.apds9960 import APDS9960
+        self.apds = APDS9960(busio.I2C(board.SCL, board.SDA))
+        self.apds.enable_proximity = True
+        self.apds.enable_gesture = True
+
+    def read(self):
+        gesture = self.apds.gesture()
+        if gesture == GESTURE_LEFT:
+            return "LEFT"
+        elif gesture == GESTURE_RIGHT:
+            return "RIGHT"
+        return None
+
+
+class Bme280Sensor:
+    def __init__(self, address=BME280_ADDRESS):
+        import smbus2
+        import bme280
+        self._bme280 = bme280
+        self.bus = smbus2.SMBus(1)
+        self.address = address
+        self.params = bme280.load_calibration_params(self.bus, address)
+
+    def sample(self):
+        """Object with .temperature (°C), .pressure (hPa), .humidity (%)."""
+        return self._bme280.sample(self.bus, self.address, self.params)
+
+
+def open_strip(count, pin, freq_hz, dma, invert, brightness, channel):
+    from rpi_ws281x import Adafruit_NeoPixel
+    strip = Adafruit_NeoPixel(count, pin, freq_hz, dma, invert, brightness, channel)
+    strip.begin()
+    return strip
+
+
+def open_radar(port=RADAR_PORT, baud=RADAR_BAUD, record=None):
+    import serial
+    from mmWave import vitalsign
+    data_port = serial.Serial(port, baud)
+    if record:
+        from radar_replay import RecordingPort
+        data_port = RecordingPort(data_port, record)
+    return data_port, vitalsign.VitalSign(data_port)
+
+
+def open_radar_replay(path, speed=1.0):
+    from mmWave import vitalsign
+    from radar_replay import ReplayPort
+    data_port = ReplayPort(path, speed=speed, loop=True)
+    return data_port, vitalsign.VitalSign(data_port)
+
+
+# --- Simulation ---
+
+class SimVitalSign:
+    """Drop-in for mmWave.vitalsign.VitalSign fed by synthetic or recorded vitals."""
+
+    def __init__(self, speed=1.0, replay=None, seed=SIM_SEED, fps=RADAR_FPS):
+        self.speed = speed
+        self.interval = 1.0 / (fps * speed) if speed > 0 else 0.0
+        self.frame_number = 0
+        self.header = SimpleNamespace(frameNumber=0)
+        self.fps = fps
+        self._next = time.monotonic()
+        self._replay = self._load_replay(replay) if replay else None
+        self._night = None
+        self._block = (None, None)
+        if not self._replay:
+            from synthetic_vitals import SyntheticNight
+            self._night = SyntheticNight(seed, rate=fps)
+
+    @staticmethod
+    def _load_replay(path):
+        from session_binary import iter_csv_rows, BinarySession
+        if path.endswith(".vsdb"):
+            session = BinarySession(path)
+            return list(zip(session.column("hr").tolist(), session.column("br").tolist()))
+        return [(row[1], row[2]) for row in iter_csv_rows(path)]
+
+    def _vitals(self):
+        n = self.frame_number
+        if self._replay:
+            return self._replay[n % len(self._replay)]
+        from synthetic_vitals import BLOCK_ROWS
+        n %= self._night.rows
+        index, block = self._block
+        if index != n // BLOCK_ROWS:
+            index = n // BLOCK_ROWS
+            block = self._night.block(index)
+            block = (block["hr"].tolist(), block["br"].tolist())
+            self._block = (index, block)
+        return block[0][n % BLOCK_ROWS], block[1][n % BLOCK_ROWS]
+
+    def tlvRead(self, disp):
+        if self.interval:
+            self._next += self.interval
+            delay = self._next - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                self._next = time.monotonic()
+        self.frame_number += 1
+        self.header = SimpleNamespace(frameNumber=self.frame_number)
+        hr, br = self._vitals()
+        vd = SimpleNamespace(heartRateEst_FFT=hr, breathingRateEst_FFT=br)
+        return True, vd, []
+
+    def getHeader(self):
+        return self.header
+
+
+class SimEnvSensor:
+    def __init__(self, speed=1.0, seed=SIM_SEED):
+        self.speed = speed if speed > 0 else 1.0
+        self.rng = random.Random(seed)
+        self.start = time.monotonic()
+
+    def sample(self):
+        hours = (time.monotonic() - self.start) * self.speed / 3600
+        return SimpleNamespace(
+            temperature=23.0 - 1.5 * min(hours, 6) / 6 + self.rng.gauss(0, 0.05),
+            humidity=45.0 + 5 * math.sin(hours) + self.rng.gauss(0, 0.2),
+            pressure=1010.0 + 2 * math.sin(hours / 3) + self.rng.gauss(0, 0.1),
+        )
+
+
+class SimGesture:
+    def __init__(self, script=SIM_GESTURES, speed=1.0):
+        self.speed = speed if speed > 0 else 1.0
+        self.script = sorted(script)
+        self.start = time.monotonic()
+
+    def read(self):
+        if self.script and (time.monotonic() - self.start) * self.speed >= self.script[0][0]:
+            return self.script.pop(0)[1]
+        return None
+
+
+# --- Factory ---
+
+def open_devices(backend="real", led_config=None, speed=1.0, replay=None, radar_replay=None, radar_record=None):
+    """Open every peripheral for `backend` ("real" or "sim")."""
+    led_config = led_config or {}
+    count = led_config.get("count", 16)
+    if backend == "sim":
+        devices = Devices(backend="sim", strip=NullStrip(count), gesture=SimGesture(speed=speed),
+                          env=SimEnvSensor(speed), radar_port=None, vts=SimVitalSign(speed, replay))
+        if radar_replay:
+            devices.radar_port, devices.vts = open_radar_replay(radar_replay, speed)
+        return devices
+    if backend != "real":
+        raise ValueError(f"Unknown device backend: {backend!r}")
+
+    devices = Devices(backend="real", strip=None, gesture=None, env=None, radar_port=None, vts=None)
+    try:
+        devices.strip = open_strip(count, led_config.get("pin", 18), led_config.get("freq_hz", 800000),
+                                   led_config.get("dma", 10), led_config.get("invert", False),
+                                   led_config.get("brightness", 65), led_config.get("channel", 0))
+    except Exception as e:
+        print("❌ LED strip not available:", e)
+        devices.strip = NullStrip(count)
+    try:
+        devices.gesture = ApdsGesture()
+    except Exception as e:
+        print("❌ Gesture sensor not available:", e)
+    try:
+        devices.env = Bme280Sensor()
+    except Exception as e:
+        print("❌ BME280 not available:", e)
+    try:
+        if radar_replay:
+            devices.radar_port, devices.vts = open_radar_replay(radar_replay, speed)
+        else:
+            devices.radar_port, devices.vts = open_radar(record=radar_record)
+    except Exception as e:
+        print("❌ Radar not available:", e)
+    return devices
@@ -0,0 +1,91 @@
+"""
+Shape-preserving downsampling for chart-ready history responses.
+
+A phone or the 750x470 GUI draws a few hundred points, but a night at radar
+rate is tens of thousands of samples and a month of minute rollups is
+43 200 rows. Both functions return the *indices* of the samples to keep
+(sorted, first and last always included), so every column of a response
+can be cut with the same index array:
+
+  - `lttb`    largest-triangle-three-buckets: keeps the point of each bucket
+              that spans the largest triangle with the previously kept point
+              and the next bucket's average. Looks like the original line.
+  - `minmax`  the lowest and highest sample of each bucket: an envelope that
+              never hides a spike (an apnea or an artefact), at two points
+              per bucket.
+
+`select` applies either to several series that share one time axis (HR and
+BR, say) by giving each an equal share of the budget and merging the
+indices.
+
+Bucket sums are prefix-summed and minmax runs on a padded 2D view, so the
+only Python loop left is LTTB's walk over its n buckets (each step needs the
+point picked in the previous one); the work inside each step is NumPy.
+"""
+
+import numpy as np
+
+METHODS = ("lttb", "minmax")
+
+
+def lttb(x, y, n):
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    count = len(x)
+    if n >= count or count < 3:
+        return np.arange(count)
+    if n < 3:
+        return np.array([0, count - 1])
+    # n - 2 buckets over the inner points, plus the first and the last point
+    edges = np.linspace(1, count - 1, n - 1).astype(np.int64)
+    sum_x = np.r_[0.0, np.cumsum(x)]
+    sum_y = np.r_[0.0, np.cumsum(y)]
+    sizes = np.maximum(edges[1:] - edges[:-1], 1)
+    avg_x = np.r_[(sum_x[edges[1:]] - sum_x[edges[:-1]]) / sizes, x[-1]]
+    avg_y = np.r_[(sum_y[edges[1:]] - sum_y[edges[:-1]]) / sizes, y[-1]]
+
+    keep = np.empty(n, dtype=np.int64)
+    keep[0], keep[-1] = 0, count - 1
+    a = 0
+    for b in range(n - 2):
+        lo, hi = edges[b], max(edges[b + 1], edges[b] + 1)
+        ax, ay = x[a], y[a]
+        # Twice the triangle area; the constant factor doesn't change the argmax
+        area = np.abs((ax - avg_x[b + 1]) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (avg_y[b + 1] - ay))
+        a = lo + int(np.argmax(area))
+        keep[b + 1] = a
+    return keep
+
+
+def minmax(x, y, n):
+    y = np.asarray(y, dtype=np.float64)
+    count = len(y)
+    if n >= count or count < 3:
+        return np.arange(count)
+    buckets = max(1, (n - 2) // 2)
+    width = -(-count // buckets)
+    padded = np.full(buckets * width, np.nan)
+    padded[:count] = y
+    rows = padded.reshape(buckets, width)
+    offsets = np.arange(buckets) * width
+    lows = offsets + np.argmin(np.where(np.isnan(rows), np.inf, rows), axis=1)
+    highs = offsets + np.argmax(np.where(np.isnan(rows), -np.inf, rows), axis=1)
+    keep = np.unique(np.r_[0, lows, highs, count - 1])
+    return keep[keep < count]
+
+
+def select(x, series, n, method="lttb"):
+    """Indices to keep so that each of `series` (arrays sharing `x`) survives in at most `n` points."""
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {METHODS}")
+    count = len(x)
+    if n is None or n >= count:
+        return np.arange(count)
+    if n < 1:
+        raise ValueError("points must be at least 1")
+    fn = lttb if method == "lttb" else minmax
+    share = max(3, n // max(1, len(series)))
+    keep = np.unique(np.concatenate([fn(x, y, share) for y in series]))
+    if len(keep) > n:
+        keep = keep[np.linspace(0, len(keep) - 1, n).astype(np.int64)]
+    return keep
@@ -15,12 +15,51 @@ import numpy as np
 import csv
 import glob
 import socket
+from live_snapshot import LiveSnapshot, LIVE_SNAPSHOT_PATH
+from session_binary import BinarySession, COLUMNS as BINARY_COLUMNS
+from control_socket import send_command, run_command, BackendNotRunning
+from session_catalog import SessionCatalog
 
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("dark-blue")
 
 vitals_process = None
 monitoring = False
+BACKEND_SCRIPT = "/home/raspberry/Desktop/VSD_GUI/vsd_on_startup.py"
+BACKEND_START_TIMEOUT = 30  # seconds for a cold start (imports, LEDs, I2C, radar)
+DATA_DIR = "/home/raspberry/Desktop/VSD_GUI/Data_collected/"
+LIVE_SNAPSHOT_MAX_AGE = 5  # seconds; an older snapshot means the backend stopped publishing
+session_catalog = None
+
+
+def get_session_catalog():
+    """The Data_collected catalogue, opened on first use"""
+    global session_catalog
+    if session_catalog is None:
+        session_catalog = SessionCatalog(DATA_DIR)
+    return session_catalog
+
+
+def ensure_backend():
+    """Return the backend's status, starting the resident backend first if it isn't running"""
+    global vitals_process
+    try:
+        return send_command("status")
+    except BackendNotRunning:
+        pass
+    if vitals_process is None or vitals_process.poll() is not None:
+        # Output is not read, so don't pipe it (a full pipe would block the backend)
+        vitals_process = subprocess.Popen(["sudo", "python3", BACKEND_SCRIPT],
+                                          stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + BACKEND_START_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(0.2)
+        try:
+            return send_command("status")
+        except BackendNotRunning:
+            if vitals_process.poll() is not None:
+                raise RuntimeError(f"backend exited with code {vitals_process.returncode}")
+    raise RuntimeError("backend did not start in time")
 
 
 def get_local_ip():
@@ -132,6 +171,7 @@ class SleepDocApp(ctk.CTk):
         hostname = socket.gethostname()
         self.local_ip = get_local_ip()
         self.base_url = f"http://{self.local_ip}:5000"
+        self.live_vitals = LiveSnapshot(LIVE_SNAPSHOT_PATH)
         self.attributes("-fullscreen", True)
         self.config(cursor="none")
         self.bind_all("<Control-Alt-e>", self.secret_exit)  # ✅ Correct place
@@ -290,19 +330,30 @@ class SleepDocApp(ctk.CTk):
         """Start real-time data updates"""
         self.update_realtime_data()
 
+    def fetch_vitals(self):
+        """Latest (hr, br, temp, hum, press), from shared memory when the backend runs locally"""
+        snap = self.live_vitals.read()
+        if snap is not None and time.time() - snap.timestamp <= LIVE_SNAPSHOT_MAX_AGE:
+            return snap.hr, snap.br, snap.temp_c, snap.humidity, snap.pressure
+
+        url = f"http://{self.local_ip}:5000/vitals"
+        response = requests.get(url, timeout=2)
+        if response.status_code != 200:
+            print("Vitals fetch failed:", response.status_code)
+            return None
+        vitals = response.json()
+        return (float(vitals.get("heart_rate") or 0),
+                float(vitals.get("breathing_rate") or 0),
+                float(vitals.get("temperature") or 0),
+                float(vitals.get("humidity") or 0),
+                float(vitals.get("pressure") or 0))
+
     def update_realtime_data(self):
         try:
-            url = f"http://{self.local_ip}:5000/vitals"
-            response = requests.get(url, timeout=2)
+            vitals = self.fetch_vitals()
 
-            if response.status_code == 200:
-                vitals = response.json()
-
-                hr = float(vitals.get("heart_rate") or 0)
-                br = float(vitals.get("breathing_rate") or 0)
-                temp = float(vitals.get("temperature") or 0)
-                hum = float(vitals.get("humidity") or 0)
-                press = float(vitals.get("pressure") or 0)
+            if vitals is not None:
+                hr, br, temp, hum, press = vitals
 
                 # Only update GUI if values are non-zero
                 if hr > 0:
@@ -321,9 +372,6 @@ class SleepDocApp(ctk.CTk):
                     self.press = press
                     self.press_label.configure(text=f"Pressure: {self.press:.1f} hPa")
 
-            else:
-                print("Vitals fetch failed:", response.status_code)
-
         except Exception as e:
             print("Vitals update error:", e)
 
@@ -618,7 +666,7 @@ class SleepDocApp(ctk.CTk):
 • Available Space: {storage_info['free_space']} MB
 • Directory: /home/raspberry/Desktop/VSD_GUI/Data_collected/
         
-Data is automatically saved every 2 seconds during monitoring"""
+Samples are buffered and saved to disk every few seconds during monitoring"""
         
         ctk.CTkLabel(storage_frame, text=storage_text, font=self.ctk_font_small,justify="left").pack(pady=10, padx=20, fill="x")
         
@@ -849,26 +897,13 @@ Data is automatically saved every 2 seconds during monitoring"""
     def get_storage_info(self):
         """Get storage information"""
         try:
-            data_dir = "/home/raspberry/Desktop/VSD_GUI/Data_collected/"
-            if not os.path.exists(data_dir):
-                os.makedirs(data_dir, exist_ok=True)
-            
-            # Count files
-            csv_files = glob.glob(os.path.join(data_dir, "*.csv"))
-            total_files = len(csv_files)
-            
-            # Calculate used space
-            used_space = 0
-            for file_path in csv_files:
-                try:
-                    used_space += os.path.getsize(file_path)
-                except:
-                    pass
+            # Count files and used space (an index lookup; see session_catalog.py)
+            total_files, used_space = get_session_catalog().totals()
             used_space_mb = used_space / (1024 * 1024)
             
             # Get available space
             import shutil
-            total, used, free = shutil.disk_usage(data_dir)
+            total, used, free = shutil.disk_usage(DATA_DIR)
             free_space_mb = free / (1024 * 1024)
             
             return {
@@ -887,14 +922,9 @@ Data is automatically saved every 2 seconds during monitoring"""
             for widget in self.files_scroll_frame.winfo_children():
                 widget.destroy()
             
-            data_dir = "/home/raspberry/Desktop/VSD_GUI/Data_collected/"
-            if not os.path.exists(data_dir):
-                os.makedirs(data_dir, exist_ok=True)
-                
-            csv_files = glob.glob(os.path.join(data_dir, "*.csv"))
-            csv_files.sort(key=os.path.getmtime, reverse=True)  # Sort by modification time
+            sessions = get_session_catalog().sessions()  # newest first
             
-            if not csv_files:
+            if not sessions:
                 no_files_label = ctk.CTkLabel(self.files_scroll_frame, 
                                              text="No data files found", 
                                              font=self.ctk_font_medium, 
@@ -903,10 +933,11 @@ Data is automatically saved every 2 seconds during monitoring"""
                 return
             
             # Create file entries
-            for i, file_path in enumerate(csv_files):
-                file_name = os.path.basename(file_path)
-                file_size = os.path.getsize(file_path) / 1024  # Size in KB
-                file_date = datetime.fromtimestamp(os.path.getmtime(file_path))
+            for i, session in enumerate(sessions):
+                file_path = session["path"]
+                file_name = session["name"]
+                file_size = session["size"] / 1024  # Size in KB
+                file_date = datetime.fromtimestamp(session["mtime"] / 1e9)
                 
                 # File entry frame
                 file_frame = ctk.CTkFrame(self.files_scroll_frame, fg_color="#2d3748", corner_radius=10)
@@ -919,6 +950,9 @@ Data is automatically saved every 2 seconds during monitoring"""
                 
                 # File info
                 file_info = f"{file_name}\n{file_size:.1f} KB • {file_date.strftime('%Y-%m-%d %H:%M')}"
+                if session["samples"]:
+                    hours = (session["end"] - session["start"]) / 3600
+                    file_info += f" • {hours:.1f} h • HR {session['hr_mean']:.0f} • BR {session['br_mean']:.0f}"
                 file_info_label = ctk.CTkLabel(file_frame, text=file_info, 
                                               font=self.ctk_font_small, justify="left")
                 file_info_label.grid(row=0, column=1, padx=10, pady=10, sticky="w")
@@ -935,8 +969,7 @@ Data is automatically saved every 2 seconds during monitoring"""
                 delete_btn.grid(row=0, column=3, padx=5, pady=10)
             
             # Update storage info
-            storage_info = self.get_storage_info()
-            print(f"Files refreshed: {storage_info['total_files']} files found")
+            print(f"Files refreshed: {len(sessions)} files found")
             
         except Exception as e:
             print(f"Error refreshing file list: {e}")
@@ -945,8 +978,11 @@ Data is automatically saved every 2 seconds during monitoring"""
     def view_file(self, file_path):
         """View file contents"""
         try:
-            with open(file_path, 'r') as file:
-                content = file.read()
+            if file_path.endswith(".vsdb"):
+                content = self.format_binary_session(file_path)
+            else:
+                with open(file_path, 'r') as file:
+                    content = file.read()
                 
             # Clear and display content
             self.file_content_text.delete("1.0", "end")
@@ -963,6 +999,20 @@ Data is automatically saved every 2 seconds during monitoring"""
         except Exception as e:
             messagebox.showerror("Error", f"Failed to read file: {e}")
 
+    def format_binary_session(self, file_path, max_rows=48):
+        """Render the first rows of a .vsdb session as CSV text (memory-mapped, no parsing)"""
+        session = BinarySession(file_path)
+        lines = [",".join(BINARY_COLUMNS)]
+        for chunk in session.iter_chunks():
+            for i in range(min(len(chunk["timestamp"]), max_rows + 1 - len(lines))):
+                stamp = datetime.fromtimestamp(chunk["timestamp"][i]).strftime("%Y-%m-%d %H:%M:%S")
+                lines.append(stamp + "," + ",".join(f"{chunk[name][i]:.2f}" for name in BINARY_COLUMNS[1:]))
+            if len(lines) > max_rows:
+                break
+        if len(session) > max_rows:
+            lines.append(f"\n... (showing first {max_rows} rows of {len(session)} total rows)")
+        return "\n".join(lines)
+
     def delete_file(self, file_path):
         """Delete a specific file"""
         try:
@@ -978,7 +1028,7 @@ Data is automatically saved every 2 seconds during monitoring"""
         """Delete all data files"""
         try:
             data_dir = "/home/raspberry/Desktop/VSD_GUI/Data_collected/"
-            csv_files = glob.glob(os.path.join(data_dir, "*.csv"))
+            csv_files = glob.glob(os.path.join(data_dir, "*.csv")) + glob.glob(os.path.join(data_dir, "*.vsdb"))
             
             if not csv_files:
                 messagebox.showinfo("Info", "No files to delete!")
@@ -1343,67 +1393,65 @@ Overall Status:
     # Monitoring methods
     def toggle_monitoring(self):
         """Toggle monitoring state"""
-        global monitoring, vitals_process
+        global monitoring
         
         if not monitoring:
-            # Start monitoring
-            try:
-                # Remove stop file if exists
-                if os.path.exists("/tmp/stop_vitals"):
-                    os.remove("/tmp/stop_vitals")
-                
-                # Start the vitals script
-                vitals_process = subprocess.Popen(["sudo",
-                    "python3", "/home/raspberry/Desktop/VSD_GUI/vsd_on_startup.py"
-                ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                
-                monitoring = True
-                self.monitor_btn.configure(text="Stop Monitoring", fg_color="#dc3545", hover_color="#c82333")
-                messagebox.showinfo("Monitoring", "Vitals monitoring started!")
-                
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to start monitoring: {e}")
+            # Start monitoring; only the first start launches the backend, later ones are a socket command
+            self.monitor_btn.configure(state="disabled")
+
+            def start():
+                try:
+                    ensure_backend()
+                    run_command("start")
+                    self.after(0, self.on_monitoring_started)
+                except Exception as e:
+                    self.after(0, lambda e=e: self.on_monitoring_failed(e))
+
+            threading.Thread(target=start, daemon=True).start()
         else:
-            # Stop monitoring
+            # Stop monitoring; the backend stays resident with monitoring paused
             try:
-                # Create stop file
-                with open("/tmp/stop_vitals", "w") as f:
-                    f.write("stop")
-                
-                # Terminate process if running
-                if vitals_process and vitals_process.poll() is None:
-                    vitals_process.terminate()
-                    vitals_process.wait(timeout=5)
-                
-                monitoring = False
-                self.monitor_btn.configure(text="▶️ Start Monitoring", fg_color="#2d7dd2", hover_color="#1e5f99")
-                messagebox.showinfo("Monitoring", "Vitals monitoring stopped!")
-                
+                run_command("stop")
+            except BackendNotRunning:
+                pass
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to stop monitoring: {e}")
+                return
+            monitoring = False
+            self.monitor_btn.configure(text="▶️ Start Monitoring", fg_color="#2d7dd2", hover_color="#1e5f99")
+            messagebox.showinfo("Monitoring", "Vitals monitoring stopped!")
+
+    def on_monitoring_started(self):
+        global monitoring
+        monitoring = True
+        self.monitor_btn.configure(state="normal", text="Stop Monitoring", fg_color="#dc3545", hover_color="#c82333")
+        messagebox.showinfo("Monitoring", "Vitals monitoring started!")
+
+    def on_monitoring_failed(self, error):
+        self.monitor_btn.configure(state="normal")
+        messagebox.showerror("Error", f"Failed to start monitoring: {error}")
 
     def exit_app(self):
         """Clean exit of the application"""
-        global vitals_process
-        
         try:
-            # Stop monitoring if running
+            # End the session; the backend keeps running so the next start is instant
             if monitoring:
-                with open("/tmp/stop_vitals", "w") as f:
-                    f.write("stop")
-                
-                if vitals_process and vitals_process.poll() is None:
-                    vitals_process.terminate()
-                    vitals_process.wait(timeout=5)
-            
-            # Clean up temp files
-            temp_files = ["/tmp/stop_vitals", "/tmp/live_vitals.txt", "/tmp/vsd_selection.json"]
-            for temp_file in temp_files:
-                if os.path.exists(temp_file):
-                    os.remove(temp_file)
-                    
+                run_command("stop")
+        except BackendNotRunning:
+            pass
         except Exception as e:
-            print(f"Error during cleanup: {e}")
+            print(f"Error stopping monitoring: {e}")
+
+        try:
+            # Clean up temp files, unless the backend is still using them
+            send_command("status", timeout=1)
+        except (BackendNotRunning, OSError):
+            for temp_file in [LIVE_SNAPSHOT_PATH, "/tmp/vsd_selection.json"]:
+                try:
+                    if os.path.exists(temp_file):
+                        os.remove(temp_file)
+                except Exception as e:
+                    print(f"Error during cleanup: {e}")
         
         self.destroy()
 
@@ -0,0 +1,291 @@
+"""
+Hub service that collects vitals from many Sleep Doc units.
+
+Each unit runs a `HubUplink` (hub_client.py) that keeps one TCP connection to
+the hub open and pushes compressed sample batches over it (hub_protocol.py).
+The hub:
+
+  - keeps every (device, session) apart in one SQLite database (WAL mode),
+  - acks a batch only after it is committed, and tells a reconnecting unit
+    the last seq it has per session, so units resume without loss or
+    duplicates,
+  - applies backpressure: batches go through a bounded queue to a single
+    database writer, and a connection whose batch can't be queued stops
+    being read, so TCP flow control slows that unit down instead of the hub
+    buffering without limit,
+  - serves a combined live view and history over HTTP:
+
+        GET /live                               latest sample of every unit
+        GET /sessions?device=<id>               sessions per unit
+        GET /history?device=&session=&from=&to=&limit=
+        GET /history?...&points=500&method=lttb|minmax   chart-ready: at most
+                                                        500 rows per (device, session)
+
+    python3 hub.py --db hub.sqlite --port 5100 --http-port 5001
+    python3 hub_client.py sim --hub 127.0.0.1:5100 --units 20   # simulated units
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from flask import Flask, jsonify, request
+
+from api_server import serve_api
+from downsample import select
+from hub_protocol import (BATCH, HELLO, WELCOME, ProtocolError, decode_batch, encode_ack,
+                          encode_json, read_message)
+
+HUB_PORT = 5100
+HTTP_PORT = 5001
+QUEUE_SIZE = 64           # batches waiting for the database writer
+COMMIT_BATCHES = 32       # batches folded into one transaction when the writer is behind
+RESUME_SESSIONS = 32      # sessions per device reported in WELCOME
+HISTORY_LIMIT = 10000
+DOWNSAMPLE_SCAN_LIMIT = 2_000_000  # rows read to answer a points=N request (a month of one unit at 1 Hz is 2.6M)
+HISTORY_COLUMNS = ("device", "session", "timestamp", "hr", "br", "temp", "humidity", "pressure")
+LIVE_COLUMNS = ("timestamp", "hr", "br", "temp", "humidity", "pressure")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    device TEXT NOT NULL,
+    session TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    timestamp REAL NOT NULL,
+    hr REAL, br REAL, temp REAL, humidity REAL, pressure REAL,
+    PRIMARY KEY (device, session, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS samples_time ON samples (device, timestamp);
+CREATE TABLE IF NOT EXISTS sessions (
+    device TEXT NOT NULL,
+    session TEXT NOT NULL,
+    first_ts REAL,
+    last_ts REAL,
+    last_seq INTEGER NOT NULL DEFAULT 0,
+    rows INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (device, session)
+);
+"""
+
+
+def connect(path):
+    db = sqlite3.connect(path)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    return db
+
+
+class Hub:
+    def __init__(self, db_path, queue_size=QUEUE_SIZE):
+        self.db_path = db_path
+        self.queue_size = queue_size
+        self.latest = {}      # device -> {"session", "timestamp", "hr", ...}
+        self.connected = {}   # device -> peer address
+        self.batches = 0
+        self.rows = 0
+        self.duplicates = 0
+        self.protocol_errors = 0
+        self._queue = None
+        self._db = None
+        # One thread owns the write connection
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix="hub-db")
+
+    # --- database (hub-db thread only) ---
+
+    def _open_db(self):
+        self._db = connect(self.db_path)
+        self._db.executescript(SCHEMA)
+
+    def _acked(self, device):
+        cur = self._db.execute("SELECT session, last_seq FROM sessions WHERE device = ? "
+                               "ORDER BY last_ts DESC LIMIT ?", (device, RESUME_SESSIONS))
+        return dict(cur.fetchall())
+
+    def _store(self, batches):
+        """Commit [(device, session, first_seq, rows), ...]; returns rows actually inserted."""
+        inserted = 0
+        with self._db:
+            for device, session, first_seq, rows in batches:
+                before = self._db.total_changes
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO samples VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(device, session, first_seq + i) + tuple(row) for i, row in enumerate(rows)])
+                added = self._db.total_changes - before
+                inserted += added
+                self._db.execute(
+                    "INSERT INTO sessions VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (device, session) DO UPDATE SET "
+                    "first_ts = MIN(first_ts, excluded.first_ts), last_ts = MAX(last_ts, excluded.last_ts), "
+                    "last_seq = MAX(last_seq, excluded.last_seq), rows = rows + excluded.rows",
+                    (device, session, rows[0][0], rows[-1][0], first_seq + len(rows) - 1, added))
+        return inserted
+
+    # --- ingest ---
+
+    async def _db_call(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def serve(self, host="0.0.0.0", port=HUB_PORT):
+        self._queue = asyncio.Queue(self.queue_size)
+        await self._db_call(self._open_db)
+        server = await asyncio.start_server(self._handle, host, port)
+        print(f"Hub: ingest on {host}:{port}, database {self.db_path}")
+        async with server:
+            await asyncio.gather(server.serve_forever(), self._writer_loop())
+
+    async def _handle(self, reader, writer):
+        peer = writer.get_extra_info("peername")
+        device = None
+        try:
+            kind, payload = await read_message(reader)
+            if kind != HELLO:
+                raise ProtocolError("expected HELLO")
+            device = str(json.loads(payload)["device"])
+            self.connected[device] = peer
+            writer.write(encode_json(WELCOME, {"acked": await self._db_call(self._acked, device)}))
+            await writer.drain()
+            while True:
+                kind, payload = await read_message(reader)
+                if kind != BATCH:
+                    raise ProtocolError(f"unexpected message type {kind}")
+                session, first_seq, rows = decode_batch(payload)
+                if rows:
+                    # Blocks while the writer is behind: this unit's socket stops being read
+                    await self._queue.put((writer, device, session, first_seq, rows))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except (ProtocolError, ValueError, KeyError, struct.error) as e:
+            self.protocol_errors += 1
+            print(f"Hub: protocol error from {device or peer}:", e)
+        finally:
+            if device is not None and self.connected.get(device) == peer:
+                del self.connected[device]
+            writer.close()
+
+    async def _writer_loop(self):
+        while True:
+            items = [await self._queue.get()]
+            while len(items) < COMMIT_BATCHES and not self._queue.empty():
+                items.append(self._queue.get_nowait())
+            try:
+                inserted = await self._db_call(self._store, [item[1:] for item in items])
+            except sqlite3.Error as e:
+                # Nothing is acked, so the units resend these batches after reconnecting
+                print("Hub: database error:", e)
+                for writer, *_ in items:
+                    writer.close()
+                continue
+            total = sum(len(item[4]) for item in items)
+            self.batches += len(items)
+            self.rows += inserted
+            self.duplicates += total - inserted
+            for writer, device, session, first_seq, rows in items:
+                last = rows[-1]
+                self.latest[device] = dict(zip(LIVE_COLUMNS, last), session=session)
+                if not writer.is_closing():
+                    writer.write(encode_ack(session, first_seq + len(rows) - 1))
+
+    def stats(self):
+        return {"connected": len(self.connected), "queued": self._queue.qsize() if self._queue else 0,
+                "batches": self.batches, "rows": self.rows, "duplicates": self.duplicates,
+                "protocol_errors": self.protocol_errors}
+
+
+def create_app(hub):
+    app = Flask(__name__)
+
+    def fetch(sql, args):
+        # WAL lets every request read on its own connection while the hub writes
+        db = sqlite3.connect(f"file:{hub.db_path}?mode=ro", uri=True)
+        try:
+            cur = db.execute(sql, args)
+            return [d[0] for d in cur.description], cur.fetchall()
+        finally:
+            db.close()
+
+    def query(sql, args):
+        names, rows = fetch(sql, args)
+        return [dict(zip(names, row)) for row in rows]
+
+    @app.route("/live", methods=["GET"])
+    def live():
+        now = time.time()
+        devices = {device: dict(sample, connected=device in hub.connected, age=round(now - sample["timestamp"], 1))
+                   for device, sample in list(hub.latest.items())}
+        return jsonify({"devices": devices, "stats": hub.stats()})
+
+    @app.route("/sessions", methods=["GET"])
+    def sessions():
+        device = request.args.get("device")
+        sql = "SELECT * FROM sessions" + (" WHERE device = ?" if device else "") + " ORDER BY first_ts"
+        return jsonify(query(sql, (device,) if device else ()))
+
+    @app.route("/history", methods=["GET"])
+    def history():
+        try:
+            start = float(request.args.get("from", 0))
+            end = float(request.args.get("to", time.time()))
+            points = int(request.args["points"]) if request.args.get("points") else None
+            method = request.args.get("method", "lttb")
+            limit = DOWNSAMPLE_SCAN_LIMIT if points else min(int(request.args.get("limit", HISTORY_LIMIT)), HISTORY_LIMIT)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        where, args = ["timestamp >= ?", "timestamp <= ?"], [start, end]
+        for key in ("device", "session"):
+            if request.args.get(key):
+                where.append(f"{key} = ?")
+                args.append(request.args[key])
+        names, rows = fetch(f"SELECT {', '.join(HISTORY_COLUMNS)} FROM samples "
+                            f"WHERE {' AND '.join(where)} ORDER BY timestamp LIMIT ?", args + [limit])
+        truncated = len(rows) == limit
+        if points:
+            try:
+                rows = downsample_rows(rows, points, method)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+        return jsonify({"rows": [dict(zip(names, row)) for row in rows], "truncated": truncated})
+
+    return app
+
+
+def downsample_rows(rows, points, method="lttb"):
+    """Keep at most `points` of HISTORY_COLUMNS rows per (device, session), chosen on HR and BR."""
+    if not rows:
+        return rows
+    _, group = np.unique([f"{r[0]}\0{r[1]}" for r in rows], return_inverse=True)
+    values = np.array([r[2:5] for r in rows], dtype=np.float64)  # timestamp, hr, br; NULL -> nan
+    keep = []
+    for g in range(group.max() + 1):
+        idx = np.flatnonzero(group == g)
+        v = values[idx]
+        keep.append(idx[select(v[:, 0], [np.nan_to_num(v[:, 1]), np.nan_to_num(v[:, 2])], points, method)])
+    return [rows[i] for i in np.sort(np.concatenate(keep))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=os.environ.get("VSD_HUB_DB", "hub.sqlite"))
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=HUB_PORT)
+    parser.add_argument("--http-port", type=int, default=HTTP_PORT)
+    parser.add_argument("--api-server", default="auto", help="see api_server.py")
+    args = parser.parse_args()
+
+    hub = Hub(args.db)
+    threading.Thread(target=serve_api, args=(create_app(hub), args.api_server, args.host, args.http_port),
+                     daemon=True).start()
+    try:
+        asyncio.run(hub.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Uplink from a bedside unit to the hub (hub.py).
+
+`HubUplink.append(row)` buffers a sample and never blocks. `HubUplink.run()`
+is a coroutine (a task on the backend's runtime) that keeps one TCP
+connection to the hub and:
+
+  - sends rows in compressed batches of up to `batch_rows`, or whatever is
+    buffered every `batch_interval` seconds,
+  - keeps at most `window` batches unacknowledged, so a slow hub slows the
+    uplink down rather than the other way round,
+  - drops rows only once the hub has acked them; after a disconnect it
+    reconnects with exponential backoff, learns from WELCOME what the hub
+    already stored and resends the rest,
+  - holds at most `max_rows` rows while the hub is unreachable (~4 h of
+    samples at 1 Hz by default), dropping the oldest beyond that.
+
+Simulated units for testing a hub on localhost:
+
+    python3 hub_client.py sim --hub 127.0.0.1:5100 --units 20 --rate 5 --flaky 0.02
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import random
+import time
+from collections import deque
+
+from hub_protocol import (ACK, HELLO, VERSION, WELCOME, ProtocolError, decode_ack, encode_batch, encode_json,
+                          read_message)
+
+BATCH_ROWS = 256
+BATCH_INTERVAL = 2.0
+WINDOW = 4
+MAX_ROWS = 15000
+BACKOFF_START = 1.0
+BACKOFF_MAX = 60.0
+
+
+def parse_address(address, default_port=5100):
+    host, _, port = address.rpartition(":")
+    return (host, int(port)) if host else (address, default_port)
+
+
+class HubUplink:
+    def __init__(self, host, port, device, batch_rows=BATCH_ROWS, batch_interval=BATCH_INTERVAL,
+                 window=WINDOW, max_rows=MAX_ROWS):
+        self.host = host
+        self.port = port
+        self.device = device
+        self.batch_rows = batch_rows
+        self.batch_interval = batch_interval
+        self.window = window
+        self.max_rows = max_rows
+        self.session = None
+        self.connected = False
+        self.rows_sent = 0
+        self.rows_acked = 0
+        self.rows_dropped = 0
+        self.batches_sent = 0
+        self.reconnects = 0
+        self._pending = deque()   # (session, seq, row), oldest first, not yet acked
+        self._sent = 0            # leading entries of _pending already sent on this connection
+        self._inflight = 0
+        self._seq = 0
+        self._wake = None         # asyncio.Event, created in run() on the loop that awaits it
+
+    def start_session(self, session):
+        self.session = session
+        self._seq = 0
+
+    def append(self, row):
+        """Queue one (timestamp, hr, br, temp, humidity, pressure) row (event loop only)."""
+        if self.session is None:
+            return
+        self._seq += 1
+        self._pending.append((self.session, self._seq, row))
+        if len(self._pending) > self.max_rows:
+            self._pending.popleft()
+            self.rows_dropped += 1
+            self._sent = max(0, self._sent - 1)
+        if len(self._pending) - self._sent >= self.batch_rows and self._wake is not None:
+            self._wake.set()
+
+    # --- connection ---
+
+    async def run(self):
+        if self._wake is None:
+            self._wake = asyncio.Event()
+        backoff = BACKOFF_START
+        while True:
+            writer = None
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+                self.connected = True
+                backoff = BACKOFF_START
+                await self._serve(reader, writer)
+            except (OSError, asyncio.IncompleteReadError, ProtocolError) as e:
+                if self.connected:
+                    print(f"Hub uplink to {self.host}:{self.port} lost:", e)
+            finally:
+                self.connected = False
+                if writer is not None:
+                    writer.close()
+            self.reconnects += 1
+            await asyncio.sleep(backoff * random.uniform(0.5, 1.0))
+            backoff = min(backoff * 2, BACKOFF_MAX)
+
+    async def _serve(self, reader, writer):
+        writer.write(encode_json(HELLO, {"device": self.device, "version": VERSION}))
+        await writer.drain()
+        kind, payload = await read_message(reader)
+        if kind != WELCOME:
+            raise ProtocolError(f"expected WELCOME, got {kind}")
+        acked = json.loads(payload).get("acked", {})
+        self._pending = deque(entry for entry in self._pending if entry[1] > acked.get(entry[0], 0))
+        self._sent = 0
+        self._inflight = 0
+        acks = asyncio.create_task(self._read_acks(reader))
+        try:
+            await self._send_loop(writer, acks)
+        finally:
+            acks.cancel()
+
+    async def _read_acks(self, reader):
+        while True:
+            kind, payload = await read_message(reader)
+            if kind != ACK:
+                raise ProtocolError(f"unexpected message type {kind}")
+            session, last_seq = decode_ack(payload)
+            # Acks arrive in send order, so acked rows are at the front
+            while self._pending and self._pending[0][0] == session and self._pending[0][1] <= last_seq:
+                self._pending.popleft()
+                self._sent -= 1
+                self.rows_acked += 1
+            self._sent = max(0, self._sent)
+            self._inflight = max(0, self._inflight - 1)
+            self._wake.set()
+
+    async def _send_loop(self, writer, acks):
+        last_send = time.monotonic()
+        while not acks.done():
+            unsent = len(self._pending) - self._sent
+            due = unsent >= self.batch_rows or (unsent and time.monotonic() - last_send >= self.batch_interval)
+            if due and self._inflight < self.window:
+                entries = list(itertools.islice(self._pending, self._sent, self._sent + self.batch_rows))
+                session = entries[0][0]
+                entries = list(itertools.takewhile(lambda e: e[0] == session, entries))
+                writer.write(encode_batch(session, entries[0][1], [e[2] for e in entries]))
+                self._sent += len(entries)
+                self._inflight += 1
+                self.batches_sent += 1
+                self.rows_sent += len(entries)
+                last_send = time.monotonic()
+                await writer.drain()
+                continue
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.batch_interval)
+            except asyncio.TimeoutError:
+                pass
+        acks.result()  # re-raise why the connection ended
+
+    def stats(self):
+        return {"connected": self.connected, "pending": len(self._pending), "rows_sent": self.rows_sent,
+                "rows_acked": self.rows_acked, "rows_dropped": self.rows_dropped,
+                "batches_sent": self.batches_sent, "reconnects": self.reconnects}
+
+
+# --- Simulated units ---
+
+async def _sim_unit(uplink, rate, flaky, rng):
+    uplink.start_session(time.strftime("%Y-%m-%d_%H-%M-%S"))
+    task = asyncio.create_task(uplink.run())
+    t = 0.0
+    while True:
+        now = time.time()
+        hr = 62 + 6 * math.sin(t / 600) + rng.gauss(0, 1.5)
+        br = 14 + 2 * math.sin(t / 900) + rng.gauss(0, 0.5)
+        uplink.append((now, hr, br, 22.5 + rng.gauss(0, 0.05), 45 + rng.gauss(0, 0.2), 1010 + rng.gauss(0, 0.1)))
+        t += 1 / rate
+        if flaky and rng.random() < flaky / rate:
+            # Simulated network drop: kill the connection, the uplink has to resume
+            task.cancel()
+            task = asyncio.create_task(uplink.run())
+        await asyncio.sleep(1 / rate)
+
+
+async def _simulate(host, port, units, rate, duration, flaky):
+    uplinks = [HubUplink(host, port, f"sim-{i:02d}", batch_interval=1.0) for i in range(units)]
+    sims = [asyncio.create_task(_sim_unit(u, rate, flaky, random.Random(i))) for i, u in enumerate(uplinks)]
+    start = time.monotonic()
+    try:
+        while duration <= 0 or time.monotonic() - start < duration:
+            await asyncio.sleep(5)
+            totals = {key: sum(u.stats()[key] for u in uplinks) for key in ("pending", "rows_acked", "reconnects")}
+            connected = sum(u.connected for u in uplinks)
+            print(f"{time.monotonic() - start:6.0f}s  connected {connected}/{units}  acked {totals['rows_acked']}  "
+                  f"pending {totals['pending']}  reconnects {totals['reconnects']}")
+    finally:
+        for task in sims:
+            task.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["sim"])
+    parser.add_argument("--hub", default="127.0.0.1:5100")
+    parser.add_argument("--units", type=int, default=10)
+    parser.add_argument("--rate", type=float, default=1.0, help="samples per second per unit")
+    parser.add_argument("--duration", type=float, default=0, help="seconds, 0 = forever")
+    parser.add_argument("--flaky", type=float, default=0.0, help="connection drops per unit per second")
+    args = parser.parse_args()
+    host, port = parse_address(args.hub)
+    try:
+        asyncio.run(_simulate(host, port, args.units, args.rate, args.duration, args.flaky))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Wire format between bedside units (hub_client.py) and the hub (hub.py).
+
+Every message is a 5-byte header (u8 type, u32 payload length, little endian)
+followed by the payload:
+
+    HELLO    unit -> hub   JSON {"device": id, "version": 1}
+    WELCOME  hub -> unit   JSON {"acked": {session: last stored seq, ...}}
+    BATCH    unit -> hub   u16 session length, session (utf-8),
+                           u64 first seq, u32 row count,
+                           zlib(count x (f64 timestamp, f32 hr, br, temp,
+                                         humidity, pressure))
+    ACK      hub -> unit   u16 session length, session, u64 last stored seq
+
+Sequence numbers count rows per (device, session) from 1. The hub stores
+rows idempotently and acks a batch only once it is committed, so a unit that
+reconnects resends everything after the WELCOME's `acked` seq and nothing is
+lost or stored twice.
+"""
+
+import json
+import struct
+import zlib
+
+VERSION = 1
+MAX_PAYLOAD = 4 * 1024 * 1024
+
+HELLO = 1
+WELCOME = 2
+BATCH = 3
+ACK = 4
+
+_HEADER = struct.Struct("<BI")
+_U16 = struct.Struct("<H")
+_BATCH = struct.Struct("<QI")
+_ACK = struct.Struct("<Q")
+ROW = struct.Struct("<d5f")
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def encode(kind, payload):
+    return _HEADER.pack(kind, len(payload)) + payload
+
+
+def encode_json(kind, obj):
+    return encode(kind, json.dumps(obj).encode())
+
+
+async def read_message(reader):
+    """(type, payload) from an asyncio StreamReader; IncompleteReadError on EOF."""
+    kind, length = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+    if length > MAX_PAYLOAD:
+        raise ProtocolError(f"message of {length} bytes exceeds {MAX_PAYLOAD}")
+    return kind, await reader.readexactly(length)
+
+
+def _pack_session(session):
+    raw = session.encode()
+    return _U16.pack(len(raw)) + raw
+
+
+def _unpack_session(payload):
+    (length,) = _U16.unpack_from(payload)
+    end = _U16.size + length
+    return payload[_U16.size:end].decode(), end
+
+
+def encode_batch(session, first_seq, rows):
+    packed = b"".join(ROW.pack(*row) for row in rows)
+    return encode(BATCH, _pack_session(session) + _BATCH.pack(first_seq, len(rows)) + zlib.compress(packed))
+
+
+def decode_batch(payload):
+    """(session, first_seq, [(ts, hr, br, temp, humidity, pressure), ...])"""
+    session, pos = _unpack_session(payload)
+    first_seq, count = _BATCH.unpack_from(payload, pos)
+    try:
+        packed = zlib.decompress(payload[pos + _BATCH.size:])
+    except zlib.error as e:
+        raise ProtocolError(f"corrupt batch: {e}")
+    if len(packed) != count * ROW.size:
+        raise ProtocolError(f"batch says {count} rows but holds {len(packed)} bytes")
+    return session, first_seq, list(ROW.iter_unpack(packed))
+
+
+def encode_ack(session, last_seq):
+    return encode(ACK, _pack_session(session) + _ACK.pack(last_seq))
+
+
+def decode_ack(payload):
+    session, pos = _unpack_session(payload)
+    return session, _ACK.unpack_from(payload, pos)[0]
@@ -0,0 +1,164 @@
+"""
+Single owner of the WS2812 strip.
+
+Producers don't touch the strip. They set a layer's target instead:
+
+    renderer.set_layer("status", (255, 0, 0))                        # monitoring
+    renderer.set_layer("light", (50, 205, 50), brightness=65, fade=0.8)
+    renderer.set_layer("light", None)                                # back to status
+
+The highest-priority layer that has a target wins ("light" over "status"), so
+the status colour and the user's ambient light no longer overwrite each other.
+The render thread runs at `fps` while a fade or brightness ramp is in
+progress, and sleeps when nothing changes. A frame is only pushed with
+`show()` if some pixel actually differs from the last one shown.
+
+Brightness scaling and gamma correction come from a table precomputed per
+brightness level, so a frame costs a few list lookups per channel.
+"""
+
+import threading
+import time
+
+LAYERS = ("status", "light")  # lowest to highest priority
+FPS = 30
+GAMMA = 1.0  # 1.0 keeps the colours the backend always produced; ~2.2 for perceptual fades
+
+
+def build_luts(gamma=GAMMA):
+    """lut[brightness][value] -> output byte, for brightness and value in 0..255."""
+    gamma_lut = [round(255 * (v / 255) ** gamma) for v in range(256)]
+    return [bytes(gamma_lut[v * b // 255] for v in range(256)) for b in range(256)]
+
+
+def pack_color(r, g, b):
+    """Same packing as rpi_ws281x.Color()."""
+    return (r << 16) | (g << 8) | b
+
+
+class NullStrip:
+    """Stand-in for Adafruit_NeoPixel without hardware (benchmarks, simulation)."""
+
+    def __init__(self, count):
+        self.pixels = [0] * count
+        self.shows = 0
+
+    def begin(self):
+        pass
+
+    def numPixels(self):
+        return len(self.pixels)
+
+    def setPixelColor(self, i, color):
+        self.pixels[i] = color
+
+    def show(self):
+        self.shows += 1
+
+
+class LedRenderer(threading.Thread):
+    def __init__(self, strip, fps=FPS, gamma=GAMMA):
+        super().__init__(name="led-renderer", daemon=True)
+        self.strip = strip
+        self.fps = fps
+        self.count = strip.numPixels()
+        self.lut = build_luts(gamma)
+        self.frames_rendered = 0
+        self.frames_shown = 0
+        self.show_seconds = 0.0
+        self._layers = {name: None for name in LAYERS}
+        self._shown = [None] * self.count
+        # Current output in 0..255 rgb + brightness, and the fade in progress
+        self._current = (0.0, 0.0, 0.0, 0.0)
+        self._fade_from = self._current
+        self._fade_to = self._current
+        self._fade_start = 0.0
+        self._fade_len = 0.0
+        self._dirty = True
+        self._cond = threading.Condition()
+        self._stopping = False
+
+    # --- producers ---
+
+    def set_layer(self, layer, rgb, brightness=255, fade=0.0):
+        """Set (or clear with rgb=None) a layer's target. Cheap if nothing changed."""
+        target = None if rgb is None else (tuple(int(c) for c in rgb), max(0, min(255, int(brightness))), fade)
+        with self._cond:
+            if self._layers[layer] == target:
+                return
+            self._layers[layer] = target
+            self._retarget()
+
+    def off(self):
+        """Clear every layer and blank the strip right away (shutdown path)."""
+        with self._cond:
+            for name in self._layers:
+                self._layers[name] = None
+            self._current = self._fade_from = self._fade_to = (0.0, 0.0, 0.0, 0.0)
+            self._fade_len = 0.0
+            self._render_locked(time.monotonic())
+
+    def _retarget(self):
+        for name in reversed(LAYERS):
+            if self._layers[name] is not None:
+                (r, g, b), brightness, fade = self._layers[name]
+                break
+        else:
+            r = g = b = brightness = 0
+            fade = 0.0
+        self._fade_from = self._current
+        self._fade_to = (float(r), float(g), float(b), float(brightness))
+        self._fade_start = time.monotonic()
+        self._fade_len = fade
+        self._dirty = True
+        self._cond.notify()
+
+    # --- render loop ---
+
+    def _render_locked(self, now):
+        if self._fade_len > 0 and now - self._fade_start < self._fade_len:
+            t = (now - self._fade_start) / self._fade_len
+            self._current = tuple(a + (b - a) * t for a, b in zip(self._fade_from, self._fade_to))
+            fading = True
+        else:
+            self._current = self._fade_to
+            fading = False
+        r, g, b, brightness = (int(round(v)) for v in self._current)
+        scale = self.lut[brightness]
+        color = pack_color(scale[r], scale[g], scale[b])
+        self.frames_rendered += 1
+        changed = False
+        for i in range(self.count):
+            if self._shown[i] != color:
+                self.strip.setPixelColor(i, color)
+                self._shown[i] = color
+                changed = True
+        if changed:
+            start = time.perf_counter()
+            self.strip.show()
+            self.show_seconds += time.perf_counter() - start
+            self.frames_shown += 1
+        return fading
+
+    def run(self):
+        interval = 1.0 / self.fps
+        next_frame = time.monotonic()
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._dirty or self._stopping)
+                if self._stopping:
+                    break
+                now = time.monotonic()
+                fading = self._render_locked(now)
+                self._dirty = fading
+            if fading:
+                # Fixed cadence: schedule against the previous frame, not after it
+                next_frame = max(next_frame + interval, now)
+                time.sleep(max(0.0, next_frame - time.monotonic()))
+            else:
+                next_frame = time.monotonic()
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
@@ -0,0 +1,94 @@
+"""
+Shared-memory snapshot of the latest vitals.
+
+Replaces the old `/tmp/live_vitals.txt` round trip. The backend maps a small
+fixed-layout region once and overwrites it in place; the Flask handler and the
+GUI map the same file and unpack it directly, with no open/readlines/float
+parsing per poll.
+
+Layout (little endian, 64 bytes):
+    u64 seq        even = stable, odd = write in progress
+    f64 timestamp  unix time of the sample
+    f64 hr, br, temp_c, humidity, pressure
+    i64 frame      radar frameNumber (0 when using fallback vitals)
+
+Writers bump `seq` to odd, store the payload, then bump it to even again.
+Readers retry when `seq` is odd or changed underneath them (a seqlock), so a
+torn sample is never returned.
+"""
+
+import mmap
+import os
+import struct
+from collections import namedtuple
+
+LIVE_SNAPSHOT_PATH = "/dev/shm/vsd_live_vitals" if os.path.isdir("/dev/shm") else "/tmp/vsd_live_vitals"
+
+_SEQ = struct.Struct("<Q")
+_PAYLOAD = struct.Struct("<6dq")
+SNAPSHOT_SIZE = _SEQ.size + _PAYLOAD.size
+READ_RETRIES = 100
+
+LiveVitals = namedtuple("LiveVitals", ["timestamp", "hr", "br", "temp_c", "humidity", "pressure", "frame", "seq"])
+
+
+class LiveSnapshot:
+    """A mapped view of the snapshot file. Pass `writable=True` in the backend."""
+
+    def __init__(self, path=LIVE_SNAPSHOT_PATH, writable=False):
+        self.path = path
+        self.writable = writable
+        self._map = None
+        if writable:
+            self._open()
+
+    def _open(self):
+        if self.writable:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if os.fstat(fd).st_size < SNAPSHOT_SIZE:
+                    os.ftruncate(fd, SNAPSHOT_SIZE)
+                self._map = mmap.mmap(fd, SNAPSHOT_SIZE)
+            finally:
+                os.close(fd)
+        else:
+            fd = os.open(self.path, os.O_RDONLY)
+            try:
+                if os.fstat(fd).st_size < SNAPSHOT_SIZE:
+                    return False
+                self._map = mmap.mmap(fd, SNAPSHOT_SIZE, prot=mmap.PROT_READ)
+            finally:
+                os.close(fd)
+        return True
+
+    def write(self, timestamp, hr, br, temp_c, humidity, pressure, frame=0):
+        m = self._map
+        seq = _SEQ.unpack_from(m, 0)[0] | 1
+        _SEQ.pack_into(m, 0, seq)
+        _PAYLOAD.pack_into(m, _SEQ.size, timestamp, hr, br, temp_c, humidity, pressure, int(frame))
+        _SEQ.pack_into(m, 0, seq + 1)
+
+    def read(self):
+        """Latest LiveVitals, or None if the backend hasn't published yet."""
+        if self._map is None:
+            try:
+                if not self._open():
+                    return None
+            except OSError:
+                return None
+        m = self._map
+        for _ in range(READ_RETRIES):
+            before = _SEQ.unpack_from(m, 0)[0]
+            if before & 1:
+                continue
+            values = _PAYLOAD.unpack_from(m, _SEQ.size)
+            if _SEQ.unpack_from(m, 0)[0] == before:
+                if before == 0:
+                    return None
+                return LiveVitals(*values, before)
+        return None
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
@@ -0,0 +1,214 @@
+"""
+Minimal Prometheus-style metrics for the backend's /metrics endpoint.
+
+Two kinds of metric:
+
+  - `Counter`, `Gauge` and `Histogram` are updated on the hot path. An update
+    is one uncontended lock plus an add (a `bisect` for histograms), which is
+    cheap enough to leave on all night.
+  - `registry.callback(...)` metrics are read only when /metrics is scraped,
+    from counters the components already keep (RadarReader.frames_read,
+    LedRenderer.frames_shown, ...), so they cost nothing in between.
+
+`registry.render()` returns the Prometheus text exposition format (0.0.4).
+`instrument_app(app, registry)` adds per-route request latency to a Flask app.
+"""
+
+import bisect
+import threading
+import time
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+AGE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        """Child metric for one combination of label values (cache it on hot paths)."""
+        values = tuple(str(v) for v in values)
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _samples(self):
+        children = {(): self} if not self.labelnames else dict(self._children)
+        for values, child in sorted(children.items()):
+            yield from child._child_samples(self.name, self.labelnames, values)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self.value = 0
+
+    def _new_child(self):
+        return Counter(self.name, self.help)
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def _child_samples(self, name, labelnames, values):
+        yield name, _format_labels(labelnames, values), self.value
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def _new_child(self):
+        return Gauge(self.name, self.help)
+
+    def set(self, value):
+        self.value = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)   # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def _new_child(self):
+        return Histogram(self.name, self.help, buckets=self.buckets)
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self):
+        return _Timer(self)
+
+    def _child_samples(self, name, labelnames, values):
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        cumulative = 0
+        for bound, n in zip(self.buckets + (float("inf"),), counts):
+            cumulative += n
+            yield name + "_bucket", _format_labels(labelnames, values, [("le", _format_value(bound))]), cumulative
+        yield name + "_sum", _format_labels(labelnames, values), total
+        yield name + "_count", _format_labels(labelnames, values), count
+
+
+class _Timer:
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+class _Callback(_Metric):
+    """Value(s) computed at scrape time: `fn()` returns a number, or
+    {label values tuple: number} when the metric has labels."""
+
+    def __init__(self, name, help, kind, fn, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self.kind = kind
+        self.fn = fn
+
+    def _samples(self):
+        result = self.fn()
+        if not self.labelnames:
+            if result is not None:
+                yield self.name, "", result
+            return
+        for values, value in sorted(result.items()):
+            yield self.name, _format_labels(self.labelnames, values), value
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self.scrape_errors = 0
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self._add(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=()):
+        return self._add(Gauge(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def callback(self, name, help, kind, fn, labelnames=()):
+        """Register a counter/gauge read from `fn()` on every scrape."""
+        return self._add(_Callback(name, help, kind, fn, labelnames))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            try:
+                samples = list(metric._samples())
+            except Exception as e:
+                # One broken callback must not take the whole endpoint down
+                self.scrape_errors += 1
+                print(f"Metric {metric.name} error:", e)
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{name}{labels} {_format_value(value)}" for name, labels, value in samples)
+        return "\n".join(lines) + "\n"
+
+
+def instrument_app(app, registry, name="vsd_http_request_seconds"):
+    """Observe the latency of every Flask request, labelled by route and status."""
+    from flask import g, request
+    histogram = registry.histogram(name, "HTTP request latency (to the first byte for streams)",
+                                   ("route", "method", "status"))
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _observe(response):
+        start = getattr(g, "_metrics_start", None)
+        if start is not None:
+            route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+            histogram.labels(route, request.method, response.status_code).observe(time.perf_counter() - start)
+        return response
+
+    return histogram
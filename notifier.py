@@ -0,0 +1,149 @@
+"""
+Background Telegram notifications.
+
+`send_telegram_message` used to do a blocking `requests.post` inline, so a slow
+network stalled LED updates and radar reads for up to 2 s. `Notifier.notify()`
+only enqueues. A background thread then:
+
+  - coalesces bursts: a message with a `key` replaces an unsent message with
+    the same key (five light changes in a row send only the last one),
+  - batches whatever is pending into one message,
+  - rate-limits sends to one per `min_interval` seconds,
+  - retries failed sends with exponential backoff, up to `max_attempts`.
+
+The transport is any callable taking the text and raising on failure.
+`TelegramTransport` talks to the Bot API. `HttpTransport` posts JSON to a
+local URL, so notifications can be tested against a stand-in server.
+"""
+
+import json
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
+
+QUEUE_SIZE = 100
+MIN_INTERVAL = 3.0       # seconds between sends (Telegram allows ~1/s per chat)
+MAX_ATTEMPTS = 5
+BACKOFF_START = 2.0
+BACKOFF_MAX = 60.0
+MAX_MESSAGE_LEN = 4096   # Telegram's limit
+
+
+class TelegramTransport:
+    def __init__(self, token, chat_id, timeout=5):
+        self.url = f"https://api.telegram.org/bot{token}/sendMessage"
+        self.chat_id = chat_id
+        self.timeout = timeout
+
+    def __call__(self, text):
+        import requests
+        response = requests.post(self.url, data={"chat_id": self.chat_id, "text": text}, timeout=self.timeout)
+        response.raise_for_status()
+
+
+class HttpTransport:
+    """POSTs {"text": ...} as JSON to `url`."""
+
+    def __init__(self, url, timeout=5):
+        self.url = url
+        self.timeout = timeout
+
+    def __call__(self, text):
+        body = json.dumps({"text": text}).encode()
+        req = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(req, timeout=self.timeout) as response:
+            response.read()
+
+
+class Notifier(threading.Thread):
+    def __init__(self, transport, queue_size=QUEUE_SIZE, min_interval=MIN_INTERVAL,
+                 max_attempts=MAX_ATTEMPTS, backoff_start=BACKOFF_START, backoff_max=BACKOFF_MAX):
+        super().__init__(name="notifier", daemon=True)
+        self.transport = transport
+        self.queue_size = queue_size
+        self.min_interval = min_interval
+        self.max_attempts = max_attempts
+        self.backoff_start = backoff_start
+        self.backoff_max = backoff_max
+        self.sent = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.failures = 0
+        self._pending = OrderedDict()  # key -> message, insertion ordered
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._closing = False
+        self._last_send = 0.0
+
+    def notify(self, message, key=None):
+        """Queue `message`. Never blocks on the network."""
+        with self._cond:
+            if key is None:
+                self._seq += 1
+                key = ("msg", self._seq)
+            elif key in self._pending:
+                del self._pending[key]
+                self.coalesced += 1
+            if len(self._pending) >= self.queue_size:
+                self._pending.popitem(last=False)
+                self.dropped += 1
+            self._pending[key] = message
+            self._cond.notify()
+
+    def _take_batch(self):
+        parts, size = [], 0
+        while self._pending:
+            key, message = next(iter(self._pending.items()))
+            if parts and size + len(message) + 1 > MAX_MESSAGE_LEN:
+                break
+            del self._pending[key]
+            parts.append(message[:MAX_MESSAGE_LEN])
+            size += len(message) + 1
+        return "\n".join(parts)
+
+    def run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._closing)
+                if not self._pending:
+                    return
+                closing = self._closing
+            # Rate limit, letting more messages pile up (and coalesce) meanwhile
+            wait = self._last_send + self.min_interval - time.monotonic()
+            if wait > 0 and not closing:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._closing, wait)
+            with self._cond:
+                text = self._take_batch()
+            if text:
+                self._send(text)
+
+    def _send(self, text):
+        delay = self.backoff_start
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                self.transport(text)
+                self.sent += 1
+                self._last_send = time.monotonic()
+                return True
+            except Exception as e:
+                self.failures += 1
+                print(f"Telegram send error (attempt {attempt}/{self.max_attempts}):", e)
+                if attempt == self.max_attempts or self._closing:
+                    break
+                with self._cond:
+                    if self._cond.wait_for(lambda: self._closing, delay):
+                        break
+                delay = min(delay * 2, self.backoff_max)
+        self._last_send = time.monotonic()
+        self.dropped += 1
+        return False
+
+    def close(self, timeout=5):
+        """Send what is pending (one attempt each, no rate limit) and stop."""
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        if self.is_alive():
+            self.join(timeout)
@@ -0,0 +1,172 @@
+"""
+Continuous reader for the BM502 vital-sign stream.
+
+The radar pushes frames at 921600 baud whether or not anyone is listening, so
+this thread keeps the serial port drained and parks every parsed frame in a
+fixed-size ring buffer. Consumers (session logging, the live snapshot, the
+Flask API) read from the ring at their own rate instead of calling
+`tlvRead` themselves.
+
+With a `dsp` stage (see vital_dsp.py) the range profile is fed through it, and
+once its window is full the frames carry its HR/BR and their quality scores
+instead of the radar's own FFT estimates. Frames without a usable range
+profile (or that the stage fails on) reset it and keep the radar's estimates.
+"""
+
+import threading
+import time
+from collections import deque, namedtuple
+
+RING_SIZE = 256          # ~12 s of frames at the BM502's 20 fps
+RATE_CLAMP = 500         # same clamp the backend always applied to HR/BR
+ERROR_BACKOFF = 0.05     # pause after a failed tlvRead so a dead port can't spin
+
+RadarFrame = namedtuple("RadarFrame", ["frame_number", "hr", "br", "received_at", "hr_quality", "br_quality"],
+                        defaults=(None, None))
+
+
+class RadarReader(threading.Thread):
+    """Drains `vts.tlvRead` in a loop and keeps the last `ring_size` frames.
+
+    Every stored frame gets a sequence number (its index in the stream of
+    frames this reader has accepted), so a consumer can keep a cursor and ask
+    for everything newer with `read_since()`. Frames that fall off the end of
+    the ring before a consumer gets to them are simply gone; `latest()` is the
+    cheap path for callers that only care about the current value.
+
+    Counters:
+      frames_read         frames parsed successfully
+      frames_dropped      gaps in the radar's own `frameNumber` sequence
+      frames_out_of_order frames whose `frameNumber` did not increase
+      read_errors         exceptions raised by `tlvRead`/`getHeader`
+      frames_rejected     frames carrying a DSP estimate scored as noise (one per frame;
+                          each estimate covers `hop` frames, see dsp.rejected for estimates)
+    """
+
+    def __init__(self, vts, port=None, ring_size=RING_SIZE, dsp=None, read_timer=None):
+        super().__init__(name="radar-reader", daemon=True)
+        self.vts = vts
+        self.port = port
+        self.dsp = dsp
+        self.read_timer = read_timer  # optional histogram of tlvRead latency (see metrics.py)
+        self.ring_size = ring_size
+        self.frames = deque(maxlen=ring_size)
+        self.frames_read = 0
+        self.frames_dropped = 0
+        self.frames_out_of_order = 0
+        self.read_errors = 0
+        self.frames_rejected = 0
+        self.last_error = None
+        self._last_frame_number = None
+        self._cond = threading.Condition()
+        self._stopping = threading.Event()
+
+    # --- producer side ---
+
+    def read_frame(self):
+        """Read and store one frame. Returns the RadarFrame, or None."""
+        start = time.perf_counter()
+        try:
+            dck, vd, range_buf = self.vts.tlvRead(False)
+            header = self.vts.getHeader()
+        except Exception as e:
+            self.read_errors += 1
+            self.last_error = e
+            return None
+        if self.read_timer is not None:
+            self.read_timer.observe(time.perf_counter() - start)
+        if not dck:
+            return None
+        frame = RadarFrame(
+            header.frameNumber,
+            min(vd.heartRateEst_FFT, RATE_CLAMP),
+            min(vd.breathingRateEst_FFT, RATE_CLAMP),
+            time.time(),
+        )
+        if self.dsp is not None:
+            try:
+                self.dsp.push(range_buf)
+            except Exception as e:
+                self.read_errors += 1
+                self.last_error = e
+                self.dsp.reset()
+            est = self.dsp.latest
+            if est is not None:
+                frame = frame._replace(hr=est.hr, br=est.br, hr_quality=est.hr_quality, br_quality=est.br_quality)
+                if not self.dsp.is_good(est):
+                    self.frames_rejected += 1
+        self._push(frame)
+        return frame
+
+    def _push(self, frame):
+        last = self._last_frame_number
+        if last is not None:
+            if frame.frame_number > last + 1:
+                self.frames_dropped += frame.frame_number - last - 1
+            elif frame.frame_number <= last:
+                self.frames_out_of_order += 1
+        self._last_frame_number = frame.frame_number
+        with self._cond:
+            self.frames.append(frame)
+            self.frames_read += 1
+            self._cond.notify_all()
+
+    def run(self):
+        if self.port is not None:
+            try:
+                self.port.flushInput()
+            except Exception as e:
+                print("Radar flush error:", e)
+        while not self._stopping.is_set():
+            if self.read_frame() is None and self.last_error is not None:
+                self.last_error = None
+                time.sleep(ERROR_BACKOFF)
+
+    def stop(self):
+        self._stopping.set()
+
+    # --- consumer side ---
+
+    def latest(self):
+        """Most recent frame, or None if nothing has been read yet."""
+        try:
+            return self.frames[-1]
+        except IndexError:
+            return None
+
+    def read_since(self, cursor):
+        """Return (frames newer than `cursor`, new cursor).
+
+        Start with cursor 0. If the consumer fell more than `ring_size`
+        frames behind, the oldest ones are skipped.
+        """
+        with self._cond:
+            total = self.frames_read
+            oldest = total - len(self.frames)
+            start = max(cursor, oldest)
+            frames = list(self.frames)[start - oldest:]
+        return frames, total
+
+    def wait_since(self, cursor, timeout=None):
+        """Like `read_since`, but blocks up to `timeout` for a new frame."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.frames_read > cursor, timeout)
+        return self.read_since(cursor)
+
+    def is_trustworthy(self, frame):
+        """False if the DSP stage scored this frame's estimates as noise."""
+        return self.dsp is None or frame.hr_quality is None or self.dsp.is_good(frame)
+
+    def stats(self):
+        stats = {
+            "frames_read": self.frames_read,
+            "frames_dropped": self.frames_dropped,
+            "frames_out_of_order": self.frames_out_of_order,
+            "read_errors": self.read_errors,
+            "buffered": len(self.frames),
+        }
+        if self.dsp is not None:
+            stats["frames_rejected"] = self.frames_rejected
+            stats["dsp_estimates"] = self.dsp.estimates
+            stats["dsp_rejected_estimates"] = self.dsp.rejected
+        return stats
@@ -0,0 +1,191 @@
+"""
+Record and replay the raw BM502 UART stream.
+
+`RecordingPort` wraps the serial port handed to `vitalsign.VitalSign` and
+writes every byte the parser reads, with its receive time, to a .vsdr file.
+`ReplayPort` implements the small slice of the pyserial interface that
+VitalSign and RadarReader use, and feeds a recording back through the same
+`tlvRead`/`getHeader` path. It can replay at the recorded pace (speed=1), N
+times faster (speed=N), or as fast as the parser can go (speed=0).
+
+File layout (little endian):
+    4s magic "VSDR", u16 version (1), u16 reserved
+    repeated records:  f64 first-byte time, u32 length, bytes
+
+Records are cut every `RECORD_BYTES` bytes or `RECORD_SECONDS` seconds, so the
+stored timing is accurate to a few ms without a header per byte.
+
+    python3 radar_replay.py record session.vsdr --seconds 600
+    python3 radar_replay.py info session.vsdr
+"""
+
+import struct
+import sys
+import threading
+import time
+
+MAGIC = b"VSDR"
+VERSION = 1
+RECORD_BYTES = 4096
+RECORD_SECONDS = 0.02
+
+_FILE_HEADER = struct.Struct("<4sHH")
+_RECORD = struct.Struct("<dI")
+
+
+class RecordingPort:
+    """Serial port wrapper that tees everything read into a recording."""
+
+    def __init__(self, port, path):
+        self.port = port
+        self._f = open(path, "wb")
+        self._f.write(_FILE_HEADER.pack(MAGIC, VERSION, 0))
+        self._buf = bytearray()
+        self._buf_time = 0.0
+        self._lock = threading.Lock()
+        self.bytes_recorded = 0
+
+    def read(self, size=1):
+        data = self.port.read(size)
+        if data:
+            now = time.time()
+            with self._lock:
+                if not self._buf:
+                    self._buf_time = now
+                self._buf += data
+                if len(self._buf) >= RECORD_BYTES or now - self._buf_time >= RECORD_SECONDS:
+                    self._write_record()
+        return data
+
+    def _write_record(self):
+        self._f.write(_RECORD.pack(self._buf_time, len(self._buf)))
+        self._f.write(self._buf)
+        self.bytes_recorded += len(self._buf)
+        self._buf = bytearray()
+
+    def flushInput(self):
+        self.port.flushInput()
+
+    reset_input_buffer = flushInput
+
+    def __getattr__(self, name):
+        return getattr(self.port, name)
+
+    def close(self):
+        with self._lock:
+            if self._buf:
+                self._write_record()
+            self._f.close()
+        self.port.close()
+
+
+def read_recording(path):
+    """[(timestamp, bytes), ...] for every record in a .vsdr file."""
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, _ = _FILE_HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path}: not a version {VERSION} .vsdr recording")
+    records = []
+    pos = _FILE_HEADER.size
+    while pos + _RECORD.size <= len(data):
+        ts, length = _RECORD.unpack_from(data, pos)
+        pos += _RECORD.size
+        if pos + length > len(data):
+            break  # truncated last record (recorder killed mid-write)
+        records.append((ts, data[pos:pos + length]))
+        pos += length
+    return records
+
+
+class ReplayPort:
+    """Read-only stand-in for serial.Serial that plays back a .vsdr file.
+
+    At the end of the recording `read` raises EOFError, or starts over when
+    `loop=True`.
+    """
+
+    def __init__(self, path, speed=1.0, loop=False):
+        self.records = read_recording(path)
+        self.speed = speed
+        self.loop = loop
+        self.data = b"".join(chunk for _, chunk in self.records)
+        # Byte offset at which each record starts, with its recorded time
+        self._starts = []
+        offset = 0
+        for ts, chunk in self.records:
+            self._starts.append((offset, ts))
+            offset += len(chunk)
+        self.pos = 0
+        self._record = 0
+        self._t0 = self.records[0][0] if self.records else 0.0
+        self._wall0 = time.monotonic()
+
+    def _pace(self, end):
+        """Sleep until the record holding byte `end - 1` was received, scaled by speed."""
+        if not self.speed:
+            return
+        while self._record + 1 < len(self._starts) and self._starts[self._record + 1][0] < end:
+            self._record += 1
+        due = self._wall0 + (self._starts[self._record][1] - self._t0) / self.speed
+        delay = due - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def read(self, size=1):
+        if self.pos >= len(self.data):
+            if not self.loop or not self.data:
+                raise EOFError("end of radar recording")
+            self.pos = 0
+            self._record = 0
+            self._wall0 = time.monotonic()
+        end = min(self.pos + size, len(self.data))
+        self._pace(end)
+        chunk = self.data[self.pos:end]
+        self.pos = end
+        return chunk
+
+    def inWaiting(self):
+        return len(self.data) - self.pos
+
+    @property
+    def in_waiting(self):
+        return self.inWaiting()
+
+    def flushInput(self):
+        pass
+
+    reset_input_buffer = flushInput
+
+    def close(self):
+        pass
+
+
+def main(argv):
+    if len(argv) >= 2 and argv[0] == "record":
+        import serial
+        from devices import RADAR_PORT, RADAR_BAUD
+        seconds = float(argv[argv.index("--seconds") + 1]) if "--seconds" in argv else 600.0
+        port = RecordingPort(serial.Serial(RADAR_PORT, RADAR_BAUD, timeout=0.1), argv[1])
+        port.flushInput()
+        deadline = time.time() + seconds
+        try:
+            while time.time() < deadline:
+                port.read(4096)
+        except KeyboardInterrupt:
+            pass
+        port.close()
+        print(f"Recorded {port.bytes_recorded} bytes to {argv[1]}")
+    elif len(argv) == 2 and argv[0] == "info":
+        records = read_recording(argv[1])
+        total = sum(len(chunk) for _, chunk in records)
+        span = records[-1][0] - records[0][0] if records else 0.0
+        print(f"{argv[1]}: {len(records)} records, {total} bytes over {span:.1f} s")
+    else:
+        print("usage: radar_replay.py record <out.vsdr> [--seconds N] | info <file.vsdr>")
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,190 @@
+"""
+Event-loop runtime for the backend.
+
+The backend used to start one free-running thread per device (radar logging,
+gesture, LEDs, BME280), each with its own `time.sleep` cadence, plus a main
+loop that polled every 5 s, and they all shared state through unsynchronised
+attributes on `globalV`. Here every device gets an asyncio task on one event
+loop instead:
+
+  - `Runtime.add_task` registers a coroutine; a task that raises is logged and
+    restarted after `RESTART_DELAY`, like the old `while True: try` threads.
+  - `Runtime.blocking` runs a blocking call (I2C read, radar wait, file open)
+    on a small thread pool, so the loop itself never blocks.
+  - `Runtime.stop` (also wired to SIGINT/SIGTERM, callable from any thread)
+    cancels every task, waits for them to unwind and then runs the shutdown
+    hooks in order.
+
+`Runtime.sleep` is `asyncio.sleep` that also records how late the task woke
+up (`lag` / `max_lag` per task name), and a built-in probe task measures the
+lag of the loop itself every `LAG_PROBE_INTERVAL` seconds.
+
+Shared vitals live in a `VitalsState`: a frozen `Vitals` dataclass that the
+loop replaces as a whole on every update. Only the loop thread writes, and
+other threads (the API workers) read `state.current`, a single reference, so
+they always see a consistent sample without taking a lock.
+"""
+
+import asyncio
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+
+IO_WORKERS = 4          # concurrent blocking calls (radar wait, I2C, file opens)
+RESTART_DELAY = 1.0     # seconds before a crashed task is restarted
+LAG_PROBE_INTERVAL = 1.0
+
+
+@dataclass(frozen=True)
+class Vitals:
+    status: str = "pause"   # "start", "pause" or "off"
+    frame: int = 0
+    hr: float = 0.0
+    br: float = 0.0
+    temp_c: float = 0.0
+    temp_f: float = 0.0
+    humidity: float = 0.0
+    pressure: float = 0.0
+    updated_at: float = 0.0
+
+
+class VitalsState:
+    """Single-writer holder for the current Vitals; see the module docstring."""
+
+    def __init__(self, initial=None):
+        self.current = initial or Vitals()
+
+    def update(self, **changes):
+        self.current = replace(self.current, updated_at=time.time(), **changes)
+        return self.current
+
+
+class LoopEvent:
+    """asyncio.Event that can be created at import time.
+
+    Up to Python 3.9 (Raspberry Pi OS Bullseye) an asyncio.Event binds to the
+    loop that is current when it is constructed, which is not the one
+    asyncio.run() starts, so awaiting it fails. This builds the Event the first
+    time it is used on a running loop; a set() before that is remembered.
+    """
+
+    def __init__(self):
+        self._event = None
+        self._flag = False
+
+    def _get(self):
+        if self._event is None:
+            self._event = asyncio.Event()
+            if self._flag:
+                self._event.set()
+        return self._event
+
+    @staticmethod
+    def _on_loop():
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+        return True
+
+    def set(self):
+        self._flag = True
+        if self._on_loop():
+            self._get().set()
+
+    def clear(self):
+        self._flag = False
+        if self._event is not None:
+            self._event.clear()
+
+    def is_set(self):
+        return self._event.is_set() if self._event is not None else self._flag
+
+    async def wait(self):
+        return await self._get().wait()
+
+
+class Runtime:
+    def __init__(self, io_workers=IO_WORKERS):
+        self.executor = ThreadPoolExecutor(io_workers, thread_name_prefix="vsd-io")
+        self.loop = None
+        self.tasks = {}
+        self.restarts = 0
+        self.lag = {}       # task name -> last wake-up delay (s)
+        self.max_lag = {}
+        self._specs = [("loop-lag", self._lag_probe, ())]
+        self._shutdown_hooks = []
+        self._stopping = None
+
+    def add_task(self, name, coro_fn, *args):
+        """Run `coro_fn(*args)` as task `name` once the runtime starts."""
+        self._specs.append((name, coro_fn, args))
+
+    def on_shutdown(self, fn):
+        """Call `fn()` after all tasks are cancelled (hooks run in registration order)."""
+        self._shutdown_hooks.append(fn)
+
+    async def blocking(self, fn, *args):
+        return await self.loop.run_in_executor(self.executor, fn, *args)
+
+    async def sleep(self, seconds):
+        """asyncio.sleep that records the calling task's wake-up lag."""
+        due = self.loop.time() + seconds
+        await asyncio.sleep(seconds)
+        lag = max(0.0, self.loop.time() - due)
+        name = asyncio.current_task().get_name()
+        self.lag[name] = lag
+        if lag > self.max_lag.get(name, 0.0):
+            self.max_lag[name] = lag
+
+    async def _lag_probe(self):
+        while True:
+            await self.sleep(LAG_PROBE_INTERVAL)
+
+    def call_soon(self, fn, *args):
+        """Schedule `fn(*args)` on the loop; safe to call from any thread."""
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(fn, *args)
+
+    def stop(self):
+        self.call_soon(self._request_stop)
+
+    def _request_stop(self):
+        if self._stopping is not None:
+            self._stopping.set()
+
+    def run(self):
+        """Run until stop() or SIGINT/SIGTERM."""
+        asyncio.run(self._main())
+
+    async def _main(self):
+        self.loop = asyncio.get_running_loop()
+        self.loop.set_default_executor(self.executor)
+        self._stopping = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            self.loop.add_signal_handler(sig, self._stopping.set)
+        for name, coro_fn, args in self._specs:
+            self.tasks[name] = asyncio.create_task(self._supervise(name, coro_fn, args), name=name)
+        await self._stopping.wait()
+        for task in self.tasks.values():
+            task.cancel()
+        await asyncio.gather(*self.tasks.values(), return_exceptions=True)
+        for hook in self._shutdown_hooks:
+            try:
+                hook()
+            except Exception as e:
+                print("Shutdown hook error:", e)
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _supervise(self, name, coro_fn, args):
+        while True:
+            try:
+                await coro_fn(*args)
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.restarts += 1
+                print(f"{name} task error:", e)
+                await asyncio.sleep(RESTART_DELAY)
@@ -0,0 +1,145 @@
+"""
+Watches `/tmp/vsd_selection.json` and publishes the parsed settings.
+
+The LED thread, the gesture thread and the main loop used to open and parse
+the selection file on their own timers (1 s, on every gesture, 5 s). This
+watcher is the only reader: it sleeps on inotify until the GUI or `/control`
+finishes writing the file, parses it once, and publishes an immutable
+`Selections(version, data)`. Consumers read `watcher.current` or block in
+`wait_for_change()`.
+
+Where inotify isn't available (non-Linux dev boxes), it falls back to checking
+the file's mtime every `POLL_INTERVAL` seconds.
+"""
+
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import struct
+import threading
+from collections import namedtuple
+
+SELECTION_FILE = "/tmp/vsd_selection.json"
+POLL_INTERVAL = 1.0
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+_EVENT = struct.Struct("iIII")
+
+Selections = namedtuple("Selections", ["version", "data"])
+
+
+def _inotify_fd(directory):
+    """inotify descriptor watching `directory`, or None if unsupported."""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            return None
+        if libc.inotify_add_watch(fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO | IN_DELETE) < 0:
+            os.close(fd)
+            return None
+        return fd
+    except (OSError, AttributeError, TypeError):
+        return None
+
+
+class SelectionWatcher(threading.Thread):
+    def __init__(self, path=SELECTION_FILE):
+        super().__init__(name="selection-watcher", daemon=True)
+        self.path = path
+        self.name_bytes = os.fsencode(os.path.basename(path))
+        self.current = Selections(0, {})
+        self.parse_errors = 0
+        self._cond = threading.Condition()
+        self._callbacks = []
+        self._stopping = threading.Event()
+        self._fd = _inotify_fd(os.path.dirname(path) or ".")
+        self.reload()
+
+    # --- publishing ---
+
+    def publish(self, data):
+        """Install new settings (from the file or directly from /control)."""
+        with self._cond:
+            if data == self.current.data:
+                return self.current
+            self.current = Selections(self.current.version + 1, data)
+            self._cond.notify_all()
+            selections = self.current
+        for callback in list(self._callbacks):
+            try:
+                callback(selections)
+            except Exception as e:
+                print("Selection callback error:", e)
+        return selections
+
+    def reload(self):
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = {}
+        except (OSError, ValueError) as e:
+            # Keep the last good settings if the file is mid-write or corrupt
+            self.parse_errors += 1
+            print("Selection file parse error:", e)
+            return self.current
+        return self.publish(data if isinstance(data, dict) else {})
+
+    # --- consuming ---
+
+    def subscribe(self, callback):
+        """Call `callback(selections)` on every change (from the watcher thread)."""
+        self._callbacks.append(callback)
+
+    def wait_for_change(self, version, timeout=None):
+        """Block until the settings are newer than `version`; returns the current Selections."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.current.version != version, timeout)
+            return self.current
+
+    # --- watching ---
+
+    def run(self):
+        if self._fd is None:
+            self._poll_loop()
+        else:
+            self._inotify_loop()
+
+    def _inotify_loop(self):
+        while not self._stopping.is_set():
+            ready, _, _ = select.select([self._fd], [], [], POLL_INTERVAL)
+            if not ready:
+                continue
+            try:
+                buf = os.read(self._fd, 4096)
+            except BlockingIOError:
+                continue
+            changed = False
+            pos = 0
+            while pos + _EVENT.size <= len(buf):
+                _wd, _mask, _cookie, length = _EVENT.unpack_from(buf, pos)
+                name = buf[pos + _EVENT.size:pos + _EVENT.size + length].rstrip(b"\0")
+                pos += _EVENT.size + length
+                if name == self.name_bytes:
+                    changed = True
+            if changed:
+                self.reload()
+
+    def _poll_loop(self):
+        last = None
+        while not self._stopping.wait(POLL_INTERVAL):
+            try:
+                stamp = os.stat(self.path).st_mtime_ns
+            except FileNotFoundError:
+                stamp = None
+            if stamp != last:
+                last = stamp
+                self.reload()
+
+    def stop(self):
+        self._stopping.set()
@@ -0,0 +1,254 @@
+"""
+Columnar binary session format (.vsdb), written alongside the CSV.
+
+A night at radar frame rate is hundreds of thousands of CSV rows; parsing
+them back costs far more than the data is worth. A .vsdb file stores the same
+six columns as typed arrays in fixed-size chunks so readers can memory-map the
+file and use the columns in place.
+
+Layout (little endian):
+
+    file header, 32 bytes
+        4s  magic "VSDB"
+        u16 version (1)
+        u16 column count (6)
+        u32 rows per chunk (C)
+        20 bytes reserved
+
+    chunk, 104 + 28*C bytes, repeated
+        u32 row count (== C except possibly the last chunk)
+        u32 reserved
+        f64 min[6], f64 max[6]    per column, in COLUMNS order
+        f64 timestamp[C]          unix seconds
+        f32 hr[C], br[C], temp[C], humidity[C], pressure[C]
+
+Every chunk has the same size, so chunk i starts at 32 + i * chunk_bytes and
+numpy can view the whole file as one structured array. The min/max header
+lets range queries skip chunks without touching their data.
+
+Full chunks are written as soon as they fill; the partial last chunk is
+written on flush/close and rewritten in place as it grows. A crash therefore
+loses at most the rows since the last flush, same as the CSV.
+
+    python3 session_binary.py convert vitals_2025-06-25_22-10-00.csv [out.vsdb]
+    python3 session_binary.py info vitals_2025-06-25_22-10-00.vsdb
+"""
+
+import csv
+import os
+import struct
+import sys
+from array import array
+from datetime import datetime
+
+MAGIC = b"VSDB"
+VERSION = 1
+COLUMNS = ("timestamp", "hr", "br", "temp", "humidity", "pressure")
+CHUNK_ROWS = 1024
+
+_FILE_HEADER = struct.Struct("<4sHHI20x")
+_CHUNK_HEADER = struct.Struct("<II6d6d")
+FILE_HEADER_SIZE = _FILE_HEADER.size
+
+
+def chunk_bytes(chunk_rows):
+    return _CHUNK_HEADER.size + chunk_rows * (8 + 4 * (len(COLUMNS) - 1))
+
+
+class BinarySessionWriter:
+    """Appends (epoch, hr, br, temp, humidity, pressure) rows to a .vsdb file.
+
+    Has the same `append_rows` / `flush` / `close` shape as the other
+    SessionWriter sinks, so it can be passed in `SessionWriter(extra_sinks=...)`.
+    """
+
+    def __init__(self, path, chunk_rows=CHUNK_ROWS):
+        self.path = path
+        self.chunk_rows = chunk_rows
+        self._chunk_bytes = chunk_bytes(chunk_rows)
+        self._columns = [array("d")] + [array("f") for _ in COLUMNS[1:]]
+        exists = os.path.exists(path) and os.path.getsize(path) >= FILE_HEADER_SIZE
+        self._f = open(path, "r+b" if exists else "w+b")
+        if exists:
+            self._resume()
+        else:
+            self._f.write(_FILE_HEADER.pack(MAGIC, VERSION, len(COLUMNS), chunk_rows))
+            self._full_chunks = 0
+
+    def _resume(self):
+        magic, version, ncols, chunk_rows = _FILE_HEADER.unpack(self._f.read(FILE_HEADER_SIZE))
+        if magic != MAGIC or version != VERSION or ncols != len(COLUMNS):
+            raise ValueError(f"{self.path}: not a version {VERSION} .vsdb file")
+        self.chunk_rows = chunk_rows
+        self._chunk_bytes = chunk_bytes(chunk_rows)
+        self._columns = [array("d")] + [array("f") for _ in COLUMNS[1:]]
+        size = os.path.getsize(self.path)
+        n_chunks = (size - FILE_HEADER_SIZE) // self._chunk_bytes
+        self._full_chunks = n_chunks
+        if n_chunks:
+            # Pull a partial last chunk back into memory so it keeps growing
+            offset = FILE_HEADER_SIZE + (n_chunks - 1) * self._chunk_bytes
+            self._f.seek(offset)
+            raw = self._f.read(self._chunk_bytes)
+            count = _CHUNK_HEADER.unpack_from(raw)[0]
+            if count < chunk_rows:
+                self._full_chunks -= 1
+                pos = _CHUNK_HEADER.size
+                for col in self._columns:
+                    width = col.itemsize * chunk_rows
+                    col.frombytes(raw[pos:pos + col.itemsize * count])
+                    pos += width
+        self._f.truncate(FILE_HEADER_SIZE + self._full_chunks * self._chunk_bytes)
+
+    def append_rows(self, rows):
+        cols = self._columns
+        for row in rows:
+            for col, value in zip(cols, row):
+                col.append(value)
+            if len(cols[0]) == self.chunk_rows:
+                self._write_chunk()
+                self._full_chunks += 1
+                for col in cols:
+                    del col[:]
+
+    def _write_chunk(self):
+        cols = self._columns
+        count = len(cols[0])
+        mins = [min(c) if count else 0.0 for c in cols]
+        maxs = [max(c) if count else 0.0 for c in cols]
+        parts = [_CHUNK_HEADER.pack(count, 0, *mins, *maxs)]
+        for col in cols:
+            parts.append(col.tobytes())
+            parts.append(bytes(col.itemsize * (self.chunk_rows - count)))
+        self._f.seek(FILE_HEADER_SIZE + self._full_chunks * self._chunk_bytes)
+        self._f.write(b"".join(parts))
+
+    def flush(self):
+        if len(self._columns[0]):
+            self._write_chunk()
+        self._f.flush()
+
+    def fileno(self):
+        return self._f.fileno()
+
+    def close(self):
+        self.flush()
+        self._f.close()
+
+
+class BinarySession:
+    """Memory-mapped, read-only view of a .vsdb file (needs numpy)."""
+
+    def __init__(self, path):
+        import numpy as np
+        self.path = path
+        with open(path, "rb") as f:
+            magic, version, ncols, chunk_rows = _FILE_HEADER.unpack(f.read(FILE_HEADER_SIZE))
+        if magic != MAGIC or version != VERSION or ncols != len(COLUMNS):
+            raise ValueError(f"{path}: not a version {VERSION} .vsdb file")
+        self.chunk_rows = chunk_rows
+        self.dtype = np.dtype([("count", "<u4"), ("_reserved", "<u4"),
+                               ("min", "<f8", (len(COLUMNS),)), ("max", "<f8", (len(COLUMNS),)),
+                               ("timestamp", "<f8", (chunk_rows,))]
+                              + [(name, "<f4", (chunk_rows,)) for name in COLUMNS[1:]])
+        n_chunks = (os.path.getsize(path) - FILE_HEADER_SIZE) // self.dtype.itemsize
+        if n_chunks:
+            self.chunks = np.memmap(path, dtype=self.dtype, mode="r", offset=FILE_HEADER_SIZE, shape=(n_chunks,))
+        else:
+            self.chunks = np.zeros(0, dtype=self.dtype)
+        self.counts = np.asarray(self.chunks["count"], dtype=np.int64)
+
+    def __len__(self):
+        return int(self.counts.sum())
+
+    def iter_chunks(self, start=None, end=None):
+        """Yield {column: array} per chunk, zero-copy views into the mapping.
+
+        With `start`/`end` (unix seconds), chunks whose timestamp min/max
+        header falls outside the range are skipped without reading them.
+        """
+        for i, chunk in enumerate(self.chunks):
+            if start is not None and chunk["max"][0] < start:
+                continue
+            if end is not None and chunk["min"][0] > end:
+                continue
+            n = self.counts[i]
+            yield {name: chunk[name][:n] for name in COLUMNS}
+
+    def column(self, name):
+        """The whole column as one array. Zero-copy for single-chunk files."""
+        import numpy as np
+        parts = [c[name] for c in self.iter_chunks()]
+        if len(parts) == 1:
+            return parts[0]
+        if not parts:
+            return np.zeros(0, dtype=self.dtype[name].base)
+        return np.concatenate(parts)
+
+    def columns(self):
+        return {name: self.column(name) for name in COLUMNS}
+
+    def summary(self):
+        """Per-column min/max and the row count, from the chunk headers only."""
+        if not len(self.chunks):
+            return {"count": 0}
+        mins = self.chunks["min"][self.counts > 0].min(axis=0)
+        maxs = self.chunks["max"][self.counts > 0].max(axis=0)
+        out = {"count": len(self)}
+        for i, name in enumerate(COLUMNS):
+            out[name] = (float(mins[i]), float(maxs[i]))
+        return out
+
+
+def iter_csv_rows(path):
+    """(epoch, hr, br, temp, humidity, pressure) tuples from a session CSV."""
+    with open(path, "r") as f:
+        for row in csv.reader(f):
+            if len(row) < 6 or row[0].lower() == "timestamp":
+                continue
+            try:
+                ts = datetime.strptime(row[0], "%Y-%m-%d %H:%M:%S").timestamp()
+                yield (ts,) + tuple(float(v) for v in row[1:6])
+            except ValueError:
+                continue
+
+
+def convert_csv(csv_path, out_path=None, chunk_rows=CHUNK_ROWS):
+    """Convert a session CSV to .vsdb. Returns the output path."""
+    out_path = out_path or os.path.splitext(csv_path)[0] + ".vsdb"
+    if os.path.exists(out_path):
+        os.remove(out_path)
+    writer = BinarySessionWriter(out_path, chunk_rows)
+    batch = []
+    for row in iter_csv_rows(csv_path):
+        batch.append(row)
+        if len(batch) >= chunk_rows:
+            writer.append_rows(batch)
+            batch = []
+    writer.append_rows(batch)
+    writer.close()
+    return out_path
+
+
+def main(argv):
+    if len(argv) >= 2 and argv[0] == "convert":
+        out = convert_csv(argv[1], argv[2] if len(argv) > 2 else None)
+        print(f"Wrote {out} ({os.path.getsize(out) / 1024:.1f} KB, was {os.path.getsize(argv[1]) / 1024:.1f} KB)")
+    elif len(argv) == 2 and argv[0] == "info":
+        session = BinarySession(argv[1])
+        summary = session.summary()
+        print(f"{argv[1]}: {summary['count']} rows in {len(session.chunks)} chunks of {session.chunk_rows}")
+        for name in COLUMNS:
+            if name in summary:
+                lo, hi = summary[name]
+                if name == "timestamp":
+                    lo, hi = datetime.fromtimestamp(lo), datetime.fromtimestamp(hi)
+                print(f"  {name:<10} {lo} .. {hi}")
+    else:
+        print("usage: session_binary.py convert <in.csv> [out.vsdb] | info <file.vsdb>")
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
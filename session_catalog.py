@@ -0,0 +1,177 @@
+"""
+Catalogue of the session files in Data_collected.
+
+The GUI's file list globbed and stat'ed every file on every refresh, and
+learning anything about a night (how long, how many samples, the HR range,
+what the analysis says) meant parsing the whole file again. The catalogue
+keeps one row per session file in a small SQLite database next to them:
+
+    name, size, mtime                          what the row was built from
+    start, end, samples                        first/last timestamp, row count
+    hr_/br_/temp_ min, max, mean               column summaries
+    digest                                     analysis.py counts as JSON
+
+The backend records a session when it closes it (`record`). `refresh()`
+stats every file (one scandir, no reads) and re-summarises only the ones
+whose size or mtime changed, so the live session, appended in place, stays
+current while untouched nights cost nothing. A file that can't be summarised
+is noted in `failures` with the same size/mtime key and is only tried again
+once it changes.
+
+    python3 session_catalog.py Data_collected             # list, building as needed
+    python3 session_catalog.py Data_collected --rebuild
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import struct
+import sys
+import time
+
+CATALOG_NAME = "catalog.sqlite"
+SESSION_EXTENSIONS = (".csv", ".vsdb")
+SUMMARY_METRICS = ("hr", "br", "temp")
+DIGEST_KEYS = ("asleep", "awake", "uncertain", "br_low", "br_high", "temp_good", "temp_cold", "temp_hot")
+
+_FIELDS = (["name", "size", "mtime", "start", "end", "samples"]
+           + [f"{m}_{s}" for m in SUMMARY_METRICS for s in ("min", "max", "mean")] + ["digest"])
+SCHEMA = ("CREATE TABLE IF NOT EXISTS sessions (name TEXT PRIMARY KEY, size INTEGER, mtime INTEGER, "
+          "start REAL, end REAL, samples INTEGER, "
+          + ", ".join(f"{m}_{s} REAL" for m in SUMMARY_METRICS for s in ("min", "max", "mean"))
+          + ", digest TEXT);"
+          "CREATE TABLE IF NOT EXISTS failures (name TEXT PRIMARY KEY, size INTEGER, mtime INTEGER, error TEXT)")
+
+
+def analysis_digest(stats):
+    """The counts of an analysis.py stats dict, plus the estimated sleep minutes."""
+    if not stats:
+        return None
+    digest = {key: stats[key] for key in DIGEST_KEYS}
+    asleep = stats["asleep_timestamps"]
+    digest["sleep_minutes"] = round((asleep[-1] - asleep[0]).total_seconds() / 60, 1) if asleep else 0.0
+    return digest
+
+
+def summarise(path):
+    """A catalogue row (dict) for one session file; parses it once."""
+    from analysis import load_columns, analyse_columns
+    st = os.stat(path)
+    columns = load_columns(path)
+    entry = {"name": os.path.basename(path), "size": st.st_size, "mtime": st.st_mtime_ns,
+             "samples": len(columns["timestamp"]), "start": None, "end": None}
+    for m in SUMMARY_METRICS:
+        values = columns[m]
+        entry.update({f"{m}_min": float(values.min()) if len(values) else None,
+                      f"{m}_max": float(values.max()) if len(values) else None,
+                      f"{m}_mean": float(values.mean()) if len(values) else None})
+    if entry["samples"]:
+        # Local wall-clock datetime64 -> epoch seconds
+        entry["start"], entry["end"] = (columns["timestamp"][i].item().timestamp() for i in (0, -1))
+    digest = analysis_digest(analyse_columns(columns)) if entry["samples"] else None
+    entry["digest"] = json.dumps(digest) if digest else None
+    return entry
+
+
+class SessionCatalog:
+    def __init__(self, data_dir, path=None):
+        self.data_dir = data_dir
+        self.path = path or os.path.join(data_dir, CATALOG_NAME)
+        self.summarised = 0   # files (re)parsed by this instance
+        os.makedirs(data_dir, exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")  # the GUI reads while the backend records
+        self._db.executescript(SCHEMA)
+        try:
+            os.chmod(self.path, 0o666)  # the backend runs as root, the GUI does not
+        except PermissionError:
+            pass
+
+    def record(self, path):
+        """(Re)summarise one session file, e.g. when the logger closes it."""
+        if os.path.dirname(os.path.abspath(path)) != os.path.abspath(self.data_dir):
+            return None
+        try:
+            st = os.stat(path)
+            entry = summarise(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, struct.error) as e:
+            print(f"Catalogue: can't summarise {path}: {e}")
+            with self._db:
+                self._db.execute("INSERT OR REPLACE INTO failures VALUES (?, ?, ?, ?)",
+                                 (os.path.basename(path), st.st_size, st.st_mtime_ns, str(e)))
+            return None
+        with self._db:
+            self._db.execute(f"INSERT OR REPLACE INTO sessions ({', '.join(_FIELDS)}) "
+                             f"VALUES ({', '.join('?' * len(_FIELDS))})", [entry[f] for f in _FIELDS])
+            self._db.execute("DELETE FROM failures WHERE name = ?", (entry["name"],))
+        self.summarised += 1
+        return entry
+
+    def refresh(self, force=False):
+        """Bring the catalogue in line with the directory, re-summarising only new or changed files."""
+        known = {name: (size, mtime) for name, size, mtime in self._db.execute("SELECT name, size, mtime FROM sessions")}
+        failed = {name: (size, mtime) for name, size, mtime in self._db.execute("SELECT name, size, mtime FROM failures")}
+        present = set()
+        with os.scandir(self.data_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith(SESSION_EXTENSIONS) or not entry.is_file():
+                    continue
+                present.add(entry.name)
+                st = entry.stat()
+                key = (st.st_size, st.st_mtime_ns)
+                if force or (known.get(entry.name) != key and failed.get(entry.name) != key):
+                    self.record(entry.path)
+        with self._db:
+            self._db.executemany("DELETE FROM sessions WHERE name = ?", [(n,) for n in known.keys() - present])
+            self._db.executemany("DELETE FROM failures WHERE name = ?", [(n,) for n in failed.keys() - present])
+
+    def sessions(self, refresh=True):
+        """Catalogue rows as dicts, newest first; `digest` is decoded."""
+        if refresh:
+            self.refresh()
+        cur = self._db.execute(f"SELECT {', '.join(_FIELDS)} FROM sessions ORDER BY mtime DESC")
+        out = []
+        for row in cur.fetchall():
+            entry = dict(zip(_FIELDS, row))
+            entry["path"] = os.path.join(self.data_dir, entry["name"])
+            entry["digest"] = json.loads(entry["digest"]) if entry["digest"] else None
+            out.append(entry)
+        return out
+
+    def totals(self, refresh=True):
+        """(file count, total bytes) of the catalogued sessions."""
+        if refresh:
+            self.refresh()
+        count, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM sessions").fetchone()
+        return count, size
+
+    def close(self):
+        self._db.close()
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("data_dir")
+    parser.add_argument("--rebuild", action="store_true", help="re-summarise every file")
+    args = parser.parse_args(argv)
+
+    catalog = SessionCatalog(args.data_dir)
+    t = time.perf_counter()
+    catalog.refresh(force=args.rebuild)
+    sessions = catalog.sessions(refresh=False)
+    elapsed = time.perf_counter() - t
+    for s in sessions:
+        hours = (s["end"] - s["start"]) / 3600 if s["samples"] else 0
+        hr = f"HR {s['hr_mean']:.1f} ({s['hr_min']:.0f}-{s['hr_max']:.0f})" if s["samples"] else "empty"
+        sleep = f", slept {s['digest']['sleep_minutes']:.0f} min" if s["digest"] else ""
+        print(f"{s['name']}: {s['samples']} samples, {hours:.1f} h, {hr}{sleep}")
+    print(f"{len(sessions)} sessions, {catalog.summarised} summarised, in {elapsed * 1e3:.1f} ms")
+    catalog.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,217 @@
+"""
+Buffered, crash-safe CSV writer for monitoring sessions.
+
+`write_row()` only appends to an in-memory queue, so the radar path never
+waits on the SD card. A background thread batches rows and writes them when
+`flush_rows` are pending or `flush_interval` seconds have passed, one
+`write()` per file per batch. How often the data is forced to the card is a
+policy:
+
+    "always"    fsync after every batch
+    "interval"  fsync at most every `fsync_interval` seconds (default)
+    "never"     leave it to the kernel's writeback
+
+`extra_sinks` receive the same raw rows through `append_rows(rows)`,
+`flush()` and `close()` (see session_binary.BinarySessionWriter); sinks
+that also have `fileno()` are fsynced with the CSV files.
+
+On open, a file whose last line was cut off by a power loss is truncated back
+to its last complete line, so the next row doesn't get glued onto garbage.
+Every session goes to a new file, though, so the backend also runs
+`repair_session_files()` over Data_collected at startup to fix the file the
+power cut actually hit; readers (analysis.py) ignore an unterminated last line.
+
+A batch that fails on one file or sink is still written to the others;
+`rows_failed` counts the rows that missed at least one of them.
+"""
+
+import csv
+import glob
+import io
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+CSV_HEADER = ("timestamp", "heart_rate", "breathing_rate", "temperature", "humidity", "pressure")
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+FLUSH_ROWS = 200
+FLUSH_INTERVAL = 10.0
+FSYNC_POLICY = "interval"
+FSYNC_INTERVAL = 30.0
+MAX_PENDING = 20000  # rows held in memory if the card stalls; oldest dropped beyond this
+
+
+def recover_partial_line(path):
+    """Truncate `path` after its last newline. Returns bytes removed."""
+    try:
+        with open(path, "rb+") as f:
+            size = f.seek(0, os.SEEK_END)
+            if size == 0:
+                return 0
+            f.seek(size - 1)
+            if f.read(1) == b"\n":
+                return 0
+            # Walk back in blocks until the previous newline
+            pos = size
+            while pos > 0:
+                step = min(4096, pos)
+                pos -= step
+                f.seek(pos)
+                nl = f.read(step).rfind(b"\n")
+                if nl != -1:
+                    keep = pos + nl + 1
+                    break
+            else:
+                keep = 0
+            f.truncate(keep)
+            return size - keep
+    except FileNotFoundError:
+        return 0
+
+
+def repair_session_files(directory, pattern="vitals_*.csv"):
+    """recover_partial_line() on every session file in `directory`. Returns [(path, bytes removed)] of the repaired ones."""
+    repaired = []
+    for path in sorted(glob.glob(os.path.join(directory, pattern))):
+        try:
+            removed = recover_partial_line(path)
+        except OSError as e:
+            print(f"Can't repair {path}: {e}")
+            continue
+        if removed:
+            repaired.append((path, removed))
+    return repaired
+
+
+class VitalsRowFormatter:
+    """(epoch, hr, br, temp, humidity, pressure) -> CSV fields in the analysis.py format."""
+
+    def __init__(self):
+        self._second = None
+        self._stamp = ""
+
+    def __call__(self, row):
+        ts = int(row[0])
+        if ts != self._second:
+            self._second = ts
+            self._stamp = datetime.fromtimestamp(ts).strftime(TIMESTAMP_FORMAT)
+        return [self._stamp] + [f"{v:.2f}" for v in row[1:]]
+
+
+class SessionWriter(threading.Thread):
+    """Background writer appending the same rows to one or more CSV files."""
+
+    def __init__(self, paths, header=CSV_HEADER, formatter=None, flush_rows=FLUSH_ROWS,
+                 flush_interval=FLUSH_INTERVAL, fsync=FSYNC_POLICY, fsync_interval=FSYNC_INTERVAL,
+                 extra_sinks=()):
+        super().__init__(name="session-writer", daemon=True)
+        if fsync not in ("always", "interval", "never"):
+            raise ValueError(f"Unknown fsync policy: {fsync!r}")
+        self.paths = [paths] if isinstance(paths, str) else list(paths)
+        self.formatter = formatter or VitalsRowFormatter()
+        self.extra_sinks = list(extra_sinks)
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.rows_written = 0
+        self.rows_dropped = 0
+        self.rows_failed = 0   # rows that could not be written to every file and sink
+        self.write_errors = 0
+        self.batches = 0
+        self.recovered_bytes = 0
+        self._pending = deque(maxlen=MAX_PENDING)
+        self._cond = threading.Condition()
+        self._closing = False
+        self._last_fsync = time.monotonic()
+        self._files = []
+        for path in self.paths:
+            self.recovered_bytes += recover_partial_line(path)
+            f = open(path, "a", newline="")
+            if header and f.tell() == 0:
+                csv.writer(f).writerow(header)
+                f.flush()
+            self._files.append(f)
+        self.start()
+
+    def write_row(self, row):
+        """Queue one row. Never blocks on I/O."""
+        with self._cond:
+            if len(self._pending) == self._pending.maxlen:
+                self.rows_dropped += 1
+            self._pending.append(row)
+            if len(self._pending) >= self.flush_rows:
+                self._cond.notify()
+
+    def run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._closing or len(self._pending) >= self.flush_rows,
+                                    self.flush_interval)
+                rows = list(self._pending)
+                self._pending.clear()
+                closing = self._closing
+            if rows:
+                try:
+                    self._write_batch(rows)
+                except Exception as e:
+                    print("Session write error:", e)
+            if closing:
+                break
+
+    def _write_batch(self, rows):
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        fmt = self.formatter
+        writer.writerows(fmt(row) for row in rows)
+        data = buf.getvalue()
+        now = time.monotonic()
+        sync = self.fsync == "always" or (self.fsync == "interval" and now - self._last_fsync >= self.fsync_interval)
+        failed = False
+        for f in self._files:
+            try:
+                f.write(data)
+                f.flush()
+                if sync:
+                    os.fsync(f.fileno())
+            except (OSError, ValueError) as e:
+                failed = self._write_failed(f.name, e)
+        for sink in self.extra_sinks:
+            try:
+                sink.append_rows(rows)
+                sink.flush()
+                if sync and hasattr(sink, "fileno"):
+                    os.fsync(sink.fileno())
+            except Exception as e:
+                failed = self._write_failed(getattr(sink, "path", type(sink).__name__), e)
+        if sync:
+            self._last_fsync = now
+        if failed:
+            self.rows_failed += len(rows)
+        else:
+            self.rows_written += len(rows)
+        self.batches += 1
+
+    def _write_failed(self, target, error):
+        self.write_errors += 1
+        print(f"Session write error ({target}):", error)
+        return True
+
+    def close(self):
+        """Flush what is pending, fsync and close the files."""
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+        self.join()
+        for f in self._files:
+            try:
+                f.flush()
+                if self.fsync != "never":
+                    os.fsync(f.fileno())
+            finally:
+                f.close()
+        for sink in self.extra_sinks:
+            sink.close()
@@ -0,0 +1,231 @@
+"""
+Seeded synthetic overnight vitals for load tests and analysis checks.
+
+`generate_fake_vitals()` used to return uniform random HR 40-90 / BR 12-20,
+which no sleep logic can do anything sensible with. `SyntheticNight` models
+a night instead:
+
+  - a hypnogram in 30 s epochs: sleep onset after 10-25 min awake, ~90 min
+    cycles of light -> deep -> light -> REM (deep sleep early in the night,
+    longer REM late), and a few brief awakenings,
+  - HR/BR levels per stage, smoothed across stage changes, with respiratory
+    sinus arrhythmia and per-sample noise,
+  - apnea-like events in light/REM sleep: breathing nearly stops for
+    10-40 s, then an arousal raises HR and BR for a few breaths,
+  - movement artefacts (mostly while awake or in light sleep): a few
+    seconds of the garbage a radar reports when the subject moves,
+  - room temperature slowly falling overnight, humidity and pressure
+    drifting.
+
+The plan (hypnogram and events) is drawn once from the seed. Samples are
+generated in fixed blocks of `BLOCK_ROWS`, each with noise from its own
+seed, so the same (seed, hours, rate) always produces the same samples,
+however they are read. Any rate works, from 1 Hz up to thousands of
+samples per second.
+
+    python3 synthetic_vitals.py night.csv --hours 8 --rate 1 --seed 7
+    python3 synthetic_vitals.py load.vsdb --hours 8 --rate 1000
+"""
+
+import argparse
+import sys
+import time
+from collections import namedtuple
+
+import numpy as np
+
+EPOCH_SECONDS = 30
+BLOCK_ROWS = 65536
+COLUMNS = ("timestamp", "hr", "br", "temp", "humidity", "pressure")
+
+WAKE, LIGHT, DEEP, REM = 0, 1, 2, 3
+STAGE_NAMES = ("wake", "light", "deep", "rem")
+# Per stage: mean HR, HR noise, mean BR, BR noise
+STAGE_HR = np.array([72.0, 62.0, 56.0, 66.0])
+STAGE_HR_NOISE = np.array([3.0, 1.5, 1.0, 3.0])
+STAGE_BR = np.array([16.0, 14.0, 12.5, 15.5])
+STAGE_BR_NOISE = np.array([1.2, 0.6, 0.4, 1.2])
+
+APNEA_PER_HOUR = 4.0
+MOVEMENTS_PER_HOUR = {WAKE: 12.0, LIGHT: 3.0, DEEP: 0.3, REM: 0.5}
+
+Event = namedtuple("Event", ["kind", "start", "duration"])  # kind: "apnea" or "movement"; seconds from start
+
+
+class SyntheticNight:
+    def __init__(self, seed=0, hours=8.0, rate=1.0, start=None):
+        self.seed = seed
+        self.hours = hours
+        self.rate = rate
+        self.start = time.time() if start is None else start
+        self.duration = hours * 3600
+        self.rows = int(self.duration * rate)
+        rng = np.random.default_rng([seed, 0])
+        self.hypnogram = self._hypnogram(rng)
+        self.events = self._events(rng)
+        self._plan(rng)
+
+    # --- plan (drawn once per seed) ---
+
+    def _hypnogram(self, rng):
+        epochs = int(np.ceil(self.duration / EPOCH_SECONDS))
+        stages = []
+        stages += [WAKE] * int(rng.uniform(10, 25) * 60 / EPOCH_SECONDS)
+        cycle = 0
+        while len(stages) < epochs:
+            night_frac = len(stages) / epochs
+            minutes = {
+                LIGHT: rng.uniform(15, 30),
+                DEEP: max(0.0, rng.uniform(20, 40) * (1 - 1.4 * night_frac)),
+                REM: rng.uniform(5, 12) + 25 * night_frac,
+            }
+            for stage in (LIGHT, DEEP, LIGHT, REM):
+                length = minutes[stage] / (2 if stage == LIGHT else 1)
+                stages += [stage] * int(length * 60 / EPOCH_SECONDS)
+            if cycle and rng.random() < 0.5:
+                stages += [WAKE] * int(rng.uniform(1, 5) * 60 / EPOCH_SECONDS)
+            cycle += 1
+        return np.array(stages[:epochs], dtype=np.int8)
+
+    def _events(self, rng):
+        events = []
+        stage_at = lambda t: self.hypnogram[min(int(t // EPOCH_SECONDS), len(self.hypnogram) - 1)]
+        # Apneas: Poisson over the night, kept only in light/REM sleep
+        t = rng.exponential(3600 / APNEA_PER_HOUR)
+        while t < self.duration:
+            if stage_at(t) in (LIGHT, REM):
+                events.append(Event("apnea", t, rng.uniform(10, 40)))
+            t += rng.exponential(3600 / APNEA_PER_HOUR)
+        # Movements: thinned Poisson with the highest per-stage rate
+        top = max(MOVEMENTS_PER_HOUR.values())
+        t = rng.exponential(3600 / top)
+        while t < self.duration:
+            if rng.random() < MOVEMENTS_PER_HOUR[int(stage_at(t))] / top:
+                events.append(Event("movement", t, rng.uniform(2, 10)))
+            t += rng.exponential(3600 / top)
+        return sorted(events, key=lambda e: e.start)
+
+    def _plan(self, rng):
+        # Stage levels at epoch resolution, smoothed over ~2.5 min so transitions ramp
+        kernel = np.ones(5) / 5
+        pad = len(kernel) // 2
+        stages = np.pad(self.hypnogram, pad, mode="edge")
+        self._epoch_t = (np.arange(len(self.hypnogram)) + 0.5) * EPOCH_SECONDS
+        self._epoch_hr = np.convolve(STAGE_HR[stages], kernel, "valid") + rng.normal(0, 1.0, len(self.hypnogram))
+        self._epoch_br = np.convolve(STAGE_BR[stages], kernel, "valid") + rng.normal(0, 0.3, len(self.hypnogram))
+        self._temp0 = rng.uniform(21.5, 24.0)
+        self._humidity0 = rng.uniform(40, 55)
+        self._pressure0 = rng.uniform(1000, 1020)
+        self._phase = rng.uniform(0, 2 * np.pi, 3)
+
+    # --- samples ---
+
+    def block(self, index):
+        """Columns (dict of arrays) for rows [index * BLOCK_ROWS, ...)."""
+        first = index * BLOCK_ROWS
+        n = max(0, min(BLOCK_ROWS, self.rows - first))
+        return self._columns(np.arange(first, first + n) / self.rate, np.random.default_rng([self.seed, 1, index]))
+
+    def _columns(self, t, rng):
+        n = len(t)
+        epoch = np.minimum((t // EPOCH_SECONDS).astype(np.int64), len(self.hypnogram) - 1)
+        stage = self.hypnogram[epoch]
+        br = np.interp(t, self._epoch_t, self._epoch_br) + rng.normal(0, 1, n) * STAGE_BR_NOISE[stage]
+        hr = np.interp(t, self._epoch_t, self._epoch_hr) + rng.normal(0, 1, n) * STAGE_HR_NOISE[stage]
+        # Respiratory sinus arrhythmia: HR follows the breathing cycle
+        hr += 1.5 * np.sin(2 * np.pi * t * br / 60)
+
+        for event in self._events_between(t[0] if n else 0, t[-1] if n else 0):
+            mask = (t >= event.start) & (t < event.start + event.duration)
+            if event.kind == "apnea":
+                br[mask] = rng.uniform(0, 3, mask.sum())
+                hr[mask] -= 4
+                # Arousal at the end of the event
+                after = (t >= event.start + event.duration) & (t < event.start + event.duration + 15)
+                hr[after] += 10
+                br[after] += 4
+            else:
+                hr[mask] = rng.uniform(0, 200, mask.sum())
+                br[mask] = rng.uniform(0, 40, mask.sum())
+
+        hours = t / 3600
+        temp = self._temp0 - 1.5 * np.minimum(hours, 6) / 6 + 0.2 * np.sin(hours + self._phase[0]) + rng.normal(0, 0.03, n)
+        humidity = self._humidity0 + 4 * np.sin(hours / 2 + self._phase[1]) + rng.normal(0, 0.2, n)
+        pressure = self._pressure0 + 1.5 * np.sin(hours / 3 + self._phase[2]) + rng.normal(0, 0.05, n)
+        return {"timestamp": self.start + t, "hr": np.clip(hr, 0, None), "br": np.clip(br, 0, None),
+                "temp": temp, "humidity": humidity, "pressure": pressure, "stage": stage}
+
+    def _events_between(self, t0, t1):
+        return [e for e in self.events if e.start <= t1 + 15 and e.start + e.duration + 15 >= t0]
+
+    def iter_blocks(self):
+        for index in range((self.rows + BLOCK_ROWS - 1) // BLOCK_ROWS):
+            yield self.block(index)
+
+    def columns(self):
+        """Every column for the whole night (mind the memory at high rates)."""
+        blocks = list(self.iter_blocks())
+        return {name: np.concatenate([b[name] for b in blocks]) for name in COLUMNS + ("stage",)}
+
+    def iter_rows(self):
+        """(timestamp, hr, br, temp, humidity, pressure) tuples, as the session writers take them."""
+        for b in self.iter_blocks():
+            yield from zip(*(b[name].tolist() for name in COLUMNS))
+
+    def at(self, seconds):
+        """(hr, br, temp, humidity, pressure) at `seconds` into the night (wraps around)."""
+        t = np.array([seconds % self.duration])
+        c = self._columns(t, np.random.default_rng([self.seed, 2, int(seconds * self.rate)]))
+        return tuple(float(c[name][0]) for name in COLUMNS[1:])
+
+    def stage_at(self, seconds):
+        return STAGE_NAMES[self.hypnogram[min(int(seconds // EPOCH_SECONDS), len(self.hypnogram) - 1)]]
+
+
+# --- Writing session files ---
+
+def write_csv(night, path):
+    import csv
+    from session_writer import CSV_HEADER, VitalsRowFormatter
+    fmt = VitalsRowFormatter()
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_HEADER)
+        for row in night.iter_rows():
+            writer.writerow(fmt(row))
+    return night.rows
+
+
+def write_vsdb(night, path):
+    from session_binary import BinarySessionWriter
+    writer = BinarySessionWriter(path)
+    try:
+        writer.append_rows(night.iter_rows())
+    finally:
+        writer.close()
+    return night.rows
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("out", help="session file to write (.csv or .vsdb)")
+    parser.add_argument("--hours", type=float, default=8.0)
+    parser.add_argument("--rate", type=float, default=1.0, help="samples per second")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--start", type=float, default=None, help="epoch of the first sample (default: now)")
+    args = parser.parse_args(argv)
+
+    night = SyntheticNight(args.seed, args.hours, args.rate, args.start)
+    t = time.perf_counter()
+    rows = (write_vsdb if args.out.endswith(".vsdb") else write_csv)(night, args.out)
+    elapsed = time.perf_counter() - t
+    counts = np.bincount(night.hypnogram, minlength=4) * EPOCH_SECONDS / 60
+    print(f"{args.out}: {rows} rows in {elapsed:.1f} s ({rows / elapsed:.0f} rows/s)")
+    print("  stages (min): " + ", ".join(f"{name} {m:.0f}" for name, m in zip(STAGE_NAMES, counts)))
+    print(f"  events: {sum(e.kind == 'apnea' for e in night.events)} apneas, "
+          f"{sum(e.kind == 'movement' for e in night.events)} movements")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,263 @@
+"""
+Local time-series store of logged vitals with min/max/mean rollups.
+
+The API could only return the latest sample. `TimeSeriesStore` keeps
+rollup tiers in one SQLite database (WAL mode, so API reads never wait for
+the logger):
+
+    1s    per second       kept RETENTION["1s"] (a week)
+    30s   per 30 s epoch   kept RETENTION["30s"] (three months)
+    1m    per minute       kept forever
+    1h    per hour         kept forever; a month is ~720 buckets, which
+                           is what keeps month-long queries in milliseconds
+
+Each bucket row holds the sample count and, per metric, min/max/sum, keyed
+by the bucket's start time (an INTEGER PRIMARY KEY, so a range query is a
+rowid range scan). Rows arrive in SessionWriter batches through `sink()`.
+A batch is reduced per tier with NumPy and upserted: a bucket that spans
+two batches merges (MIN/MAX/+), so rollups stay exact without holding
+open buckets in memory.
+
+`history(start, end, resolution=None)` picks the finest tier that answers
+the range in at most MAX_POINTS buckets unless a resolution is given.
+`points=N` cuts the answer down for a chart: "minmax" merges neighbouring
+buckets into N (so min, max and mean stay exact), "lttb" keeps the N
+buckets whose means best preserve the line (see downsample.py).
+
+    python3 timeseries.py import Data_collected/*.csv     # backfill old sessions
+    python3 timeseries.py query --hours 8
+"""
+
+import argparse
+import math
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+import numpy as np
+
+from downsample import METHODS, select
+
+TIERS = {"1s": 1, "30s": 30, "1m": 60, "1h": 3600}
+TIER_ALIASES = {"second": "1s", "epoch": "30s", "minute": "1m", "hour": "1h"}
+METRICS = ("hr", "br", "temp", "humidity", "pressure")
+RETENTION = {"1s": 7 * 86400, "30s": 90 * 86400, "1m": None, "1h": None}
+MAX_POINTS = 2000
+IMPORT_BATCH = 50000
+
+_STAT_COLUMNS = [f"{m}_{s}" for m in METRICS for s in ("min", "max", "sum")]
+
+
+def _schema(tier):
+    cols = ", ".join(f"{c} REAL" for c in _STAT_COLUMNS)
+    return f"CREATE TABLE IF NOT EXISTS rollup_{tier} (bucket INTEGER PRIMARY KEY, n INTEGER NOT NULL, {cols})"
+
+
+def _upsert_sql(tier):
+    merge = ", ".join(
+        f"{m}_min = MIN({m}_min, excluded.{m}_min), {m}_max = MAX({m}_max, excluded.{m}_max), "
+        f"{m}_sum = {m}_sum + excluded.{m}_sum" for m in METRICS)
+    placeholders = ", ".join("?" * (2 + len(_STAT_COLUMNS)))
+    return (f"INSERT INTO rollup_{tier} VALUES ({placeholders}) "
+            f"ON CONFLICT (bucket) DO UPDATE SET n = n + excluded.n, {merge}")
+
+
+def reduce_rows(values, width):
+    """Aggregate an (N, 6) array of (ts, hr, br, temp, humidity, pressure) into `width`-second buckets.
+
+    Returns a list of (bucket, n, hr_min, hr_max, hr_sum, br_min, ...) tuples.
+    """
+    buckets = (values[:, 0] // width).astype(np.int64) * width
+    order = np.argsort(buckets, kind="stable")
+    buckets, data = buckets[order], values[order, 1:]
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    counts = np.diff(np.r_[starts, len(buckets)])
+    stats = np.empty((len(starts), 3 * len(METRICS)))
+    stats[:, 0::3] = np.minimum.reduceat(data, starts)
+    stats[:, 1::3] = np.maximum.reduceat(data, starts)
+    stats[:, 2::3] = np.add.reduceat(data, starts)
+    return [(int(b), int(n), *s) for b, n, s in zip(buckets[starts].tolist(), counts.tolist(), stats.tolist())]
+
+
+class TimeSeriesStore:
+    def __init__(self, path):
+        self.path = path
+        self.rows_added = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # Written from whichever thread the current SessionWriter runs on, hence the lock
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        with self._db:
+            for tier in TIERS:
+                self._db.execute(_schema(tier))
+
+    # --- writing ---
+
+    def add_rows(self, rows):
+        values = np.asarray(rows, dtype=np.float64).reshape(-1, 1 + len(METRICS))
+        if not len(values):
+            return
+        reduced = {tier: reduce_rows(values, width) for tier, width in TIERS.items()}
+        with self._lock, self._db:
+            for tier, buckets in reduced.items():
+                self._db.executemany(_upsert_sql(tier), buckets)
+        self.rows_added += len(values)
+
+    def prune(self, now=None):
+        now = time.time() if now is None else now
+        with self._lock, self._db:
+            for tier, keep in RETENTION.items():
+                if keep:
+                    self._db.execute(f"DELETE FROM rollup_{tier} WHERE bucket < ?", (int(now - keep),))
+
+    def sink(self):
+        """Adapter for SessionWriter(extra_sinks=...); closing it ends the session, not the store."""
+        return _StoreSink(self)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    # --- reading ---
+
+    def _reader(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        return db
+
+    @staticmethod
+    def pick_resolution(start, end, max_points=MAX_POINTS):
+        for tier, width in TIERS.items():
+            if (end - start) / width <= max_points:
+                return tier
+        return list(TIERS)[-1]
+
+    def history(self, start, end, resolution=None, metrics=METRICS, points=None, method="minmax"):
+        """Columnar rollups for [start, end): {"resolution", "t", "n", metric: {"min", "max", "mean"}}."""
+        if not (math.isfinite(start) and math.isfinite(end)):
+            raise ValueError("from and to must be finite epoch seconds")
+        if resolution is None:
+            resolution = self.pick_resolution(start, end)
+        resolution = TIER_ALIASES.get(resolution, resolution)
+        if resolution not in TIERS:
+            raise ValueError(f"resolution must be one of {sorted(TIERS)} or {sorted(TIER_ALIASES)}")
+        unknown = set(metrics) - set(METRICS)
+        if unknown:
+            raise ValueError(f"unknown metrics: {sorted(unknown)}")
+        if method not in METHODS:
+            raise ValueError(f"method must be one of {METHODS}")
+        if points is not None and points < 1:
+            raise ValueError("points must be at least 1")
+        width = TIERS[resolution]
+        cols = ", ".join(f"{m}_min, {m}_max, {m}_sum" for m in metrics)
+        rows = self._reader().execute(
+            f"SELECT bucket, n, {cols} FROM rollup_{resolution} WHERE bucket >= ? AND bucket < ? ORDER BY bucket",
+            (int(start // width * width), int(end))).fetchall()
+        result = {"resolution": resolution, "from": start, "to": end}
+        if not rows:
+            result.update(t=[], n=[], **{m: {"min": [], "max": [], "mean": []} for m in metrics})
+            return result
+        data = np.array(rows, dtype=np.float64)
+        if points is not None and len(data) > points:
+            data = _downsample(data, len(metrics), points, method)
+            result.update(points=points, method=method)
+        n = data[:, 1]
+        result["t"] = data[:, 0].astype(np.int64).tolist()
+        result["n"] = n.astype(np.int64).tolist()
+        for i, m in enumerate(metrics):
+            base = 2 + 3 * i
+            result[m] = {"min": np.round(data[:, base], 2).tolist(), "max": np.round(data[:, base + 1], 2).tolist(),
+                         "mean": np.round(data[:, base + 2] / n, 2).tolist()}
+        return result
+
+
+def _downsample(data, metric_count, points, method):
+    """Cut (bucket, n, min, max, sum, min, max, sum, ...) rows to at most `points` rows."""
+    if method == "lttb":
+        means = [data[:, 4 + 3 * i] / data[:, 1] for i in range(metric_count)]
+        return data[select(data[:, 0], means, points, "lttb")]
+    # Merge runs of neighbouring buckets; each merged row starts at its first bucket
+    starts = np.unique(np.linspace(0, len(data), points, endpoint=False).astype(np.int64))
+    merged = np.add.reduceat(data, starts)
+    merged[:, 0] = data[starts, 0]
+    merged[:, 2::3] = np.minimum.reduceat(data[:, 2::3], starts)
+    merged[:, 3::3] = np.maximum.reduceat(data[:, 3::3], starts)
+    return merged
+
+
+class _StoreSink:
+    def __init__(self, store):
+        self.store = store
+
+    def append_rows(self, rows):
+        self.store.add_rows(rows)
+
+    def flush(self):
+        pass  # every append is already committed
+
+    def close(self):
+        self.store.prune()
+
+
+def import_sessions(store, paths):
+    from session_binary import iter_csv_rows, BinarySession
+    total = 0
+    for path in paths:
+        if path.endswith(".vsdb"):
+            session = BinarySession(path)
+            cols = session.columns()
+            rows = np.column_stack([cols[name] for name in ("timestamp",) + METRICS])
+            for i in range(0, len(rows), IMPORT_BATCH):
+                store.add_rows(rows[i:i + IMPORT_BATCH])
+            count = len(rows)
+        else:
+            batch, count = [], 0
+            for row in iter_csv_rows(path):
+                batch.append(row)
+                if len(batch) == IMPORT_BATCH:
+                    store.add_rows(batch)
+                    count += len(batch)
+                    batch = []
+            if batch:
+                store.add_rows(batch)
+                count += len(batch)
+        print(f"{path}: {count} rows")
+        total += count
+    return total
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=os.environ.get("VSD_TIMESERIES_DB", "vitals.sqlite"))
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import", help="add session .csv/.vsdb files to the rollups")
+    imp.add_argument("paths", nargs="+")
+    query = sub.add_parser("query", help="print a summary of recent history")
+    query.add_argument("--hours", type=float, default=8.0)
+    query.add_argument("--resolution", default=None)
+    args = parser.parse_args(argv)
+
+    store = TimeSeriesStore(args.db)
+    if args.command == "import":
+        t = time.perf_counter()
+        total = import_sessions(store, args.paths)
+        print(f"{total} rows in {time.perf_counter() - t:.1f} s")
+    else:
+        end = time.time()
+        t = time.perf_counter()
+        result = store.history(end - args.hours * 3600, end, args.resolution)
+        elapsed = time.perf_counter() - t
+        print(f"{len(result['t'])} buckets at {result['resolution']} in {elapsed * 1e3:.1f} ms")
+        if result["t"]:
+            print(f"  HR mean {np.mean(result['hr']['mean']):.1f}  BR mean {np.mean(result['br']['mean']):.1f}")
+    store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,150 @@
+"""
+Optional NumPy vital-sign stage over the radar's range profile.
+
+The backend used to throw `rangeBuf` away and trust the radar's own
+`heartRateEst_FFT` / `breathingRateEst_FFT`, only clamping them at 500.
+`VitalSignDSP` keeps a sliding window of chest-displacement phase and
+estimates HR and BR itself, each with a quality score, so the pipeline can
+drop estimates that are noise instead of logging and displaying them.
+
+Per frame (`push`):
+  - the range profile becomes a complex array (complex input as-is, a real
+    even-length buffer as interleaved I/Q pairs),
+  - the strongest reflector is tracked with a smoothed magnitude profile,
+  - its phase is unwrapped against the previous frame and written into a
+    preallocated ring.
+
+A frame without a usable range profile resets the window and clears
+`latest`: the phase track is broken, and callers should fall back to the
+radar's own estimates until the window has filled again.
+
+Every `hop` frames, once the ring is full (`estimate`):
+  - the window is linearly detrended and Hann-weighted,
+  - one real FFT gives the power spectrum,
+  - HR and BR are the interpolated peaks inside their bands,
+  - quality = power near the peak / total power in the band (0..1).
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+FPS = 20
+WINDOW = 512            # 25.6 s at 20 fps -> 0.04 Hz (2.3 bpm) resolution
+HOP = 20                # one estimate per second
+HR_BAND = (0.8, 3.0)    # 48-180 bpm
+BR_BAND = (0.1, 0.6)    # 6-36 breaths/min
+MIN_QUALITY = 0.25
+PROFILE_SMOOTHING = 0.05
+
+DspEstimate = namedtuple("DspEstimate", ["hr", "hr_quality", "br", "br_quality"])
+
+
+def as_complex(range_buf):
+    """Range profile as a complex array (empty if there is nothing usable)."""
+    z = np.asarray(range_buf)
+    if np.iscomplexobj(z):
+        return z.ravel()
+    z = z.astype(np.float64, copy=False).ravel()
+    if z.size >= 2 and z.size % 2 == 0:
+        return z[0::2] + 1j * z[1::2]
+    return z.astype(np.complex128)
+
+
+class VitalSignDSP:
+    def __init__(self, fps=FPS, window=WINDOW, hop=HOP, hr_band=HR_BAND, br_band=BR_BAND,
+                 min_quality=MIN_QUALITY):
+        self.fps = fps
+        self.window = window
+        self.hop = hop
+        self.min_quality = min_quality
+        self.ring = np.zeros(window)
+        self.pos = 0
+        self.count = 0
+        self.latest = None
+        self.estimates = 0
+        self.rejected = 0
+        self._taper = np.hanning(window)
+        # Linear detrend as a projection onto [1, t], precomputed
+        t = np.linspace(-1.0, 1.0, window)
+        self._t = t
+        self._t_norm = t @ t
+        self._freqs = np.fft.rfftfreq(window, 1.0 / fps)
+        self._hr_bins = self._band(hr_band)
+        self._br_bins = self._band(br_band)
+        self._profile = None
+        self._prev_phase = None
+        self._unwrapped = 0.0
+
+    def _band(self, band):
+        idx = np.nonzero((self._freqs >= band[0]) & (self._freqs <= band[1]))[0]
+        return slice(idx[0], idx[-1] + 1)
+
+    def reset(self):
+        """Forget the window and the latest estimate (the counters are kept)."""
+        self.ring[:] = 0.0
+        self.pos = 0
+        self.count = 0
+        self.latest = None
+        self._profile = None
+        self._prev_phase = None
+        self._unwrapped = 0.0
+
+    def push(self, range_buf):
+        """Add one frame's range profile. Returns a DspEstimate every `hop` frames."""
+        z = as_complex(range_buf)
+        if z.size == 0:
+            self.reset()
+            return None
+        mag = np.abs(z)
+        if self._profile is None or self._profile.shape != mag.shape:
+            self._profile = mag.copy()
+        else:
+            self._profile += PROFILE_SMOOTHING * (mag - self._profile)
+        return self.push_phase(float(np.angle(z[int(np.argmax(self._profile))])))
+
+    def push_phase(self, phase):
+        """Add one wrapped phase sample (radians)."""
+        if self._prev_phase is not None:
+            step = (phase - self._prev_phase + np.pi) % (2 * np.pi) - np.pi
+            self._unwrapped += step
+        self._prev_phase = phase
+        self.ring[self.pos] = self._unwrapped
+        self.pos = (self.pos + 1) % self.window
+        self.count += 1
+        if self.count >= self.window and self.count % self.hop == 0:
+            return self.estimate()
+        return None
+
+    def estimate(self):
+        x = np.concatenate((self.ring[self.pos:], self.ring[:self.pos]))
+        x -= x.mean()
+        x -= self._t * ((x @ self._t) / self._t_norm)
+        power = np.abs(np.fft.rfft(x * self._taper)) ** 2
+        hr, hr_q = self._peak(power, self._hr_bins)
+        br, br_q = self._peak(power, self._br_bins)
+        self.latest = DspEstimate(hr, hr_q, br, br_q)
+        self.estimates += 1
+        if not self.is_good(self.latest):
+            self.rejected += 1
+        return self.latest
+
+    def _peak(self, power, bins):
+        band = power[bins]
+        total = band.sum()
+        if total <= 0:
+            return 0.0, 0.0
+        k = int(np.argmax(band))
+        # Parabolic interpolation between neighbouring bins
+        offset = 0.0
+        if 0 < k < band.size - 1:
+            a, b, c = band[k - 1], band[k], band[k + 1]
+            denom = a - 2 * b + c
+            if denom:
+                offset = 0.5 * (a - c) / denom
+        freq = self._freqs[bins.start + k] + offset * (self._freqs[1] - self._freqs[0])
+        quality = band[max(0, k - 1):k + 2].sum() / total
+        return float(freq * 60), float(quality)
+
+    def is_good(self, est):
+        return est.hr_quality >= self.min_quality and est.br_quality >= self.min_quality
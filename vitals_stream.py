@@ -0,0 +1,96 @@
+"""
+Fan-out of live samples to `/vitals/stream` subscribers.
+
+One producer (the backend) calls `publish()` whenever the radar or BME280
+produces a sample; every connected client gets its own bounded queue. A slow
+phone only ever holds the newest `QUEUE_SIZE` events, older ones are dropped
+for that client alone and the producer never blocks.
+
+Samples are encoded to a Server-Sent Events frame once per publish, not once
+per subscriber.
+"""
+
+import json
+import threading
+from collections import deque
+
+QUEUE_SIZE = 32
+MAX_SUBSCRIBERS = 16
+KEEPALIVE_INTERVAL = 15  # seconds between SSE comments on an idle stream
+
+
+class TooManySubscribers(Exception):
+    pass
+
+
+def encode_event(sample):
+    return f"data: {json.dumps(sample)}\n\n"
+
+
+class Subscription:
+    def __init__(self, maxlen=QUEUE_SIZE):
+        self.queue = deque(maxlen=maxlen)
+        self.dropped = 0
+        self._cond = threading.Condition()
+
+    def put(self, event):
+        with self._cond:
+            if len(self.queue) == self.queue.maxlen:
+                self.dropped += 1
+            self.queue.append(event)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Return every queued event (possibly none after `timeout`)."""
+        with self._cond:
+            if not self.queue:
+                self._cond.wait(timeout)
+            events = list(self.queue)
+            self.queue.clear()
+        return events
+
+
+class VitalsBroadcaster:
+    def __init__(self, max_subscribers=MAX_SUBSCRIBERS, queue_size=QUEUE_SIZE):
+        self.max_subscribers = max_subscribers
+        self.queue_size = queue_size
+        self.latest = None
+        self.published = 0
+        self._subscribers = ()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise TooManySubscribers(f"{self.max_subscribers} stream clients already connected")
+            sub = Subscription(self.queue_size)
+            if self.latest is not None:
+                sub.put(self.latest)
+            self._subscribers = self._subscribers + (sub,)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers = tuple(s for s in self._subscribers if s is not sub)
+
+    def publish(self, sample):
+        event = encode_event(sample)
+        self.latest = event
+        self.published += 1
+        for sub in self._subscribers:
+            sub.put(event)
+
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def stream(self, sub):
+        """Generator of SSE text for one subscriber; unsubscribes on exit."""
+        try:
+            while True:
+                events = sub.get(timeout=KEEPALIVE_INTERVAL)
+                if not events:
+                    yield ": keepalive\n\n"
+                    continue
+                yield "".join(events)
+        finally:
+            self.unsubscribe(sub)
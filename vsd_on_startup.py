@@ -17,7 +17,8 @@ and RGB LED lighting (WS2812) to monitor and visualize vital signs such as:
 
 The system is split into two components:
 1. Backend (`vsd_on_startup.py`) — handles sensors, LED control, data logging, 
-   Flask API server, and communication with Telegram and GUI.
+   Flask API server, and communication with Telegram and GUI. Each device runs
+   as a task on one asyncio event loop (see `runtime.py`).
 2. Frontend (`gui2.py`) — a customtkinter GUI interface for visualizing live 
    vitals, selecting lighting/audio modes, and switching between views.
 
@@ -30,13 +31,14 @@ Features:
 - Telegram integration for startup/shutdown alerts
 - Flask REST API for mobile app integration (QR-based IP discovery)
 - GUI-based selection of modes and visualization (customtkinter)
-- Mobile Flutter app (via `/vitals` and `/control` API)
+- Mobile Flutter app (via `/vitals`, `/vitals/stream` (SSE) and `/control` API)
 
 Usage:
 ------
 - Run `vsd_on_startup.py` to start all backend services , 
   swipe LEFT(to start) and RIGHT(to stop) in front of gensture sensor
-- Run `gui3.py` to launch the visual dashboard and click Start monitoring button to start vsd_on_startup.py script
+- Run `gui3.py` to launch the visual dashboard and click Start monitoring button; it starts
+  the backend once if it is not already running and then only sends it start/stop commands
 - Use the Flutter app or GUI to select light modes and view vitals
 
 Requirements:
@@ -54,11 +56,18 @@ Requirements:
 
 Paths Used:
 -----------
-- `/tmp/live_vitals.txt` — real-time vitals for GUI/mobile
+- `/dev/shm/vsd_live_vitals` — shared-memory snapshot of real-time vitals for GUI/mobile
 - `/tmp/vsd_selection.json` — user-selected light/audio settings
-- `/tmp/stop_vitals` — triggers backend shutdown
-- `/home/raspberry/Desktop/VSD_GUI/` — GUI assets and QR code
-- `/home/raspberry/Desktop/Data_collected/` — saved vitals logs
+- `/run/vsd/control.sock` — start/stop/status/shutdown commands (`control_socket.py`; group `VSD_CONTROL_GROUP`, mode 0660, peers checked with SO_PEERCRED)
+- `/home/raspberry/Desktop/VSD_GUI/` — GUI assets and QR code (`VSD_GUI_DIR`)
+- `/home/raspberry/Desktop/VSD_GUI/Data_collected/` — saved vitals logs
+
+Running without hardware:
+-------------------------
+`VSD_DEVICES=sim VSD_SIM_SPEED=10 VSD_GUI_DIR=/tmp/vsd python3 vsd_on_startup.py`
+runs the full pipeline on simulated radar/BME280/gesture/LED devices (see
+`devices.py`); peripherals missing on a real Pi are skipped instead of
+aborting startup.
 
 Developed By:
 -------------
@@ -70,36 +79,74 @@ Version: 1.0 (2025)
 
 
 
+import asyncio
 import time
-import serial
 from threading import Thread
-from mmWave import vitalsign
-import board
-import busio
-from adafruit_apds9960.apds9960 import APDS9960
-from rpi_ws281x import *
-import smbus2
-import bme280
 from datetime import datetime
-import requests
-import csv
 import os
-import signal
+import sys
 import json
 import subprocess
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 import socket
 import qrcode
 from PIL import Image
-import random
+from radar_reader import RadarReader
+from vital_dsp import VitalSignDSP
+from live_snapshot import LiveSnapshot, LIVE_SNAPSHOT_PATH
+from vitals_stream import VitalsBroadcaster, TooManySubscribers
+from api_server import serve_api
+from session_writer import SessionWriter, repair_session_files
+from session_binary import BinarySessionWriter
+from selection_watcher import SelectionWatcher, SELECTION_FILE
+from led_renderer import LedRenderer
+from notifier import Notifier, TelegramTransport, HttpTransport
+from devices import open_devices, SIM_SEED
+from synthetic_vitals import SyntheticNight
+from runtime import LoopEvent, Runtime, VitalsState
+from hub_client import HubUplink, parse_address
+from metrics import Registry, instrument_app, CONTENT_TYPE, AGE_BUCKETS
+from control_socket import ControlServer
+from timeseries import TimeSeriesStore, METRICS as TIMESERIES_METRICS
+from session_catalog import SessionCatalog
 
 # Telegram
 TELEGRAM_BOT_TOKEN = "Your-bot-token"
 TELEGRAM_CHAT_ID = "chat-id"
+TELEGRAM_STANDIN_URL = os.environ.get("VSD_NOTIFY_URL")  # e.g. a local HTTP server for testing
+
+notifier = Notifier(HttpTransport(TELEGRAM_STANDIN_URL) if TELEGRAM_STANDIN_URL
+                    else TelegramTransport(TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID))
+
+# Devices: "real" on the Pi, "sim" to run the whole pipeline without hardware
+DEVICE_BACKEND = os.environ.get("VSD_DEVICES", "real")
+SIM_SPEED = float(os.environ.get("VSD_SIM_SPEED", "1"))  # 1 = real time, 10 = 10x, 0 = as fast as possible
+SIM_REPLAY = os.environ.get("VSD_SIM_REPLAY")  # optional session .csv/.vsdb to replay HR/BR from
+RADAR_RECORD = os.environ.get("VSD_RADAR_RECORD")  # tee the raw radar UART stream into a .vsdr file
+RADAR_REPLAY = os.environ.get("VSD_RADAR_REPLAY")  # parse a .vsdr recording instead of the serial port
+
+# Paths
+VSD_GUI_DIR = os.environ.get("VSD_GUI_DIR", "/home/raspberry/Desktop/VSD_GUI")
+DATA_DIR = os.path.join(VSD_GUI_DIR, "Data_collected")
+TIMESERIES_DB = os.environ.get("VSD_TIMESERIES_DB", os.path.join(DATA_DIR, "vitals.sqlite"))
 
 # Logging
-log_file = None
+session_log = None
+session_name = None
+SESSION_FSYNC = os.environ.get("VSD_SESSION_FSYNC", "interval")  # "always", "interval" or "never"
+SESSION_BINARY = os.environ.get("VSD_SESSION_BINARY", "0") == "1"  # also write a columnar .vsdb copy
 radar_available = False
+RADAR_STALE_AFTER = 5  # seconds without a frame before falling back to fake vitals
+VITAL_DSP = os.environ.get("VSD_DSP", "0") == "1"  # estimate HR/BR from rangeBuf and drop low-quality ones
+
+# API server: "auto", "waitress", "pool" or "dev" (see api_server.py)
+API_SERVER_MODE = os.environ.get("VSD_API_SERVER", "auto")
+API_PORT = 5000
+API_WORKERS = int(os.environ.get("VSD_API_WORKERS", "16"))
+
+# Multi-unit hub (see hub.py): push every logged sample to it when set
+HUB_ADDRESS = os.environ.get("VSD_HUB")  # "host:port"
+DEVICE_ID = os.environ.get("VSD_DEVICE_ID", socket.gethostname())
 
 # LED Setup
 LED_COUNT = 16
@@ -110,8 +157,15 @@ LED_BRIGHTNESS = 65
 LED_INVERT = False
 LED_CHANNEL = 0
 
-strip = Adafruit_NeoPixel(LED_COUNT, LED_PIN, LED_FREQ_HZ, LED_DMA, LED_INVERT, LED_BRIGHTNESS, LED_CHANNEL)
-strip.begin()
+devices = open_devices(DEVICE_BACKEND, speed=SIM_SPEED, replay=SIM_REPLAY,
+                       radar_replay=RADAR_REPLAY, radar_record=RADAR_RECORD, led_config={
+    "count": LED_COUNT, "pin": LED_PIN, "freq_hz": LED_FREQ_HZ, "dma": LED_DMA,
+    "invert": LED_INVERT, "brightness": LED_BRIGHTNESS, "channel": LED_CHANNEL})
+strip = devices.strip
+LED_FADE_SECONDS = 0.8  # cross-fade when the ambient light changes
+
+# The renderer owns the strip; everything else sets "status" / "light" layer targets
+led_renderer = LedRenderer(strip)
 
 # Light Colors Configuration
 light_colors = {
@@ -124,10 +178,14 @@ light_colors = {
 
 # Helper Functions
 
+# Stand-in vitals while the radar is missing or stale: a seeded synthetic night, not uniform noise
+fake_night = SyntheticNight(seed=SIM_SEED)
+
 def generate_fake_vitals():
+    hr, br, *_ = fake_night.at(time.time() - fake_night.start)
     return {
-        "hr": round(random.uniform(40, 90), 2),
-        "br": round(random.uniform(12, 20), 2)
+        "hr": round(hr, 2),
+        "br": round(br, 2)
     }
 
 def map_light_name_to_code(name):
@@ -155,221 +213,366 @@ def get_local_ip():
 def generate_ip_qr():
     ip = get_local_ip()
     qr_data = f"http://{ip}:5000"
-    qr = qrcode.make(qr_data)
-    qr.save("/home/raspberry/Desktop/VSD_GUI/ip_qr.png")
-
-def send_telegram_message(message):
     try:
-        url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-        data = {"chat_id": TELEGRAM_CHAT_ID, "text": message}
-        requests.post(url, data=data, timeout=2)
+        qr = qrcode.make(qr_data)
+        qr.save(os.path.join(VSD_GUI_DIR, "ip_qr.png"))
     except Exception as e:
-        print("Telegram send error:", e)
+        print("QR code generation error:", e)
 
-def set_color(color):
-    for i in range(strip.numPixels()):
-        strip.setPixelColor(i, color)
-    strip.show()
+def send_telegram_message(message, key=None):
+    # Only enqueues; messages sharing a key replace each other until sent
+    notifier.notify(message, key)
+
+def set_status_color(r, g, b):
+    led_renderer.set_layer("status", (r, g, b))
 
 def set_custom_color(r, g, b, brightness=None):
-    if brightness is not None:
-        r = int(r * brightness / 255)
-        g = int(g * brightness / 255)
-        b = int(b * brightness / 255)
-    color = Color(r, g, b)
-    set_color(color)
+    if brightness is None:
+        brightness = 255
+    led_renderer.set_layer("light", (r, g, b), brightness, fade=LED_FADE_SECONDS)
+
+def clear_custom_color():
+    led_renderer.set_layer("light", None)
 
 def set_ambient_light(light_code):
     try:
         if light_code in light_colors:
             color_config = light_colors[light_code]
             set_custom_color(color_config["r"], color_config["g"], color_config["b"], brightness=LED_BRIGHTNESS)
-            send_telegram_message(f"Ambient light set to: {color_config['name']}")
+            send_telegram_message(f"Ambient light set to: {color_config['name']}", key="ambient_light")
             print(f"Light set to: {color_config['name']}")
     except Exception as e:
         print(f"Error setting ambient light: {e}")
 
+# Single reader of the GUI/app selection file; everyone else uses selection_watcher.current
+selection_watcher = SelectionWatcher(SELECTION_FILE)
+
 def load_gui_selections():
     try:
-        if os.path.exists("/tmp/vsd_selection.json"):
-            with open("/tmp/vsd_selection.json", "r") as f:
-                selections = json.load(f)
-            if selections.get("light_on") and selections.get("light_mode"):
-                set_ambient_light(selections["light_mode"])
-            return selections
+        selections = selection_watcher.current.data
+        if selections.get("light_on") and selections.get("light_mode"):
+            set_ambient_light(selections["light_mode"])
+        return selections
     except Exception as e:
         print(f"Error loading GUI selections: {e}")
     return {}
 
 def turn_off_all_leds():
-    set_color(Color(0, 0, 0))
+    led_renderer.off()
 
 # Gesture Sensor
 
-i2c = busio.I2C(board.SCL, board.SDA)
-apds = APDS9960(i2c)
-apds.enable_proximity = True
-apds.enable_gesture = True
-
 def detect_gesture():
-    gesture = apds.gesture()
-    if gesture == 0x03:
-        return "LEFT"
-    elif gesture == 0x04:
-        return "RIGHT"
-    return None
-
-# Global Variables
-class globalV:
-    count = 0
-    hr = 0.0
-    br = 0.0
-    temp_c = 0.0
-    temp_f = 0.0
-    pressure = 0.0
-    humidity = 0.0
-    status = "pause"
-
-gv = globalV()
+    if devices.gesture is None:
+        return None
+    return devices.gesture.read()
+
+# Shared state: written only on the runtime's event loop, read lock-free by the API workers
+runtime = Runtime()
+state = VitalsState()
+led_wake = LoopEvent()            # selections or monitoring status changed
+monitoring_started = LoopEvent()  # set while status == "start"
+live_vitals = LiveSnapshot(LIVE_SNAPSHOT_PATH, writable=True)
+vitals_stream = VitalsBroadcaster(max_subscribers=max(1, API_WORKERS // 2))  # leave workers for /vitals polls
+os.makedirs(os.path.dirname(TIMESERIES_DB) or ".", exist_ok=True)
+history_store = TimeSeriesStore(TIMESERIES_DB)  # rollups of every logged sample, for /history
+# Each session gets a new file, so a line cut off by a power cut is only ever in an old one
+for path, removed in repair_session_files(DATA_DIR):
+    print(f"Repaired {path}: dropped {removed} bytes of a partial last line")
+session_catalog = SessionCatalog(DATA_DIR)  # per-session summaries for the GUI's file list
+
+GESTURE_INTERVAL = 0.1
+BME280_INTERVAL = 2
+STATUS_COLORS = {"start": (255, 0, 0), "pause": (255, 255, 0)}
+
+# Metrics (served on /metrics)
+registry = Registry()
+radar_read_seconds = registry.histogram("vsd_radar_tlvread_seconds", "Time per successful tlvRead, including the wait for bytes")
+sample_age_seconds = registry.histogram("vsd_api_sample_age_seconds", "Age of the sample served by /vitals", buckets=AGE_BUCKETS)
+sensor_errors = registry.counter("vsd_sensor_errors_total", "Failed sensor reads", ("sensor",))
+bme280_errors = sensor_errors.labels("bme280")
+gesture_errors = sensor_errors.labels("gesture")
+
+hub_uplink = HubUplink(*parse_address(HUB_ADDRESS), DEVICE_ID) if HUB_ADDRESS else None
 
 # Serial and Radar
-try:
-    data_port = serial.Serial("/dev/ttyUSB0", 921600)
-    vts = vitalsign.VitalSign(data_port)
-    radar_available = True
-except Exception as e:
-    print("❌ Radar not available:", e)
-    vts = None
-    radar_available = False
-
-# Threads
-
-def gestureThread():
-    while True:
-        gesture = detect_gesture()
-        if gesture == "LEFT" and gv.status == "pause":
-            gv.status = "start"
-            load_gui_selections()
-        elif gesture == "RIGHT" and gv.status == "start":
-            gv.status = "pause"
-        time.sleep(0.1)
-
-def led_control_thread():
-    last_light = None
-    while True:
+data_port = devices.radar_port
+vts = devices.vts
+radar_available = vts is not None
+radar = RadarReader(vts, data_port, dsp=VitalSignDSP() if VITAL_DSP else None,
+                    read_timer=radar_read_seconds) if radar_available else None
+
+def set_monitoring(status):
+    """Switch between "start" and "pause" (event loop only)"""
+    if state.current.status == status:
+        return
+    state.update(status=status)
+    if status == "start":
+        monitoring_started.set()
+    else:
+        monitoring_started.clear()
+    led_wake.set()
+
+def apply_light_selection(selections):
+    if not selections:
+        return
+    light_mode = map_light_name_to_code(selections.get("light_mode", ""))
+    brightness = selections.get("brightness", LED_BRIGHTNESS)
+    if selections.get("light_on", False) and light_mode and light_mode in light_colors:
+        color_config = light_colors[light_mode.upper()]
+        set_custom_color(color_config["r"], color_config["g"], color_config["b"], brightness)
+    else:
+        clear_custom_color()
+
+def publish_vitals(vitals):
+    """Push a Vitals sample to the live snapshot and /vitals/stream clients"""
+    now = time.time()
+    try:
+        live_vitals.write(now, vitals.hr, vitals.br, vitals.temp_c, vitals.humidity, vitals.pressure, vitals.frame)
+    except Exception as e:
+        print("Live snapshot write error:", e)
+    vitals_stream.publish({
+        "timestamp": round(now, 3),
+        "heart_rate": round(vitals.hr, 2),
+        "breathing_rate": round(vitals.br, 2),
+        "temperature": round(vitals.temp_c, 2),
+        "humidity": round(vitals.humidity, 2),
+        "pressure": round(vitals.pressure, 2)
+    })
+    return now
+
+def open_session_log(boot_time_str):
+    os.makedirs(DATA_DIR, exist_ok=True)
+    log_file_path = os.path.join(DATA_DIR, f"vitals_{boot_time_str}.csv")
+    log_file_path2 = os.path.join(VSD_GUI_DIR, "data_live.csv")
+    open(log_file_path2, "w").close()
+    sinks = [BinarySessionWriter(log_file_path[:-4] + ".vsdb")] if SESSION_BINARY else []
+    sinks.append(history_store.sink())
+    return SessionWriter([log_file_path, log_file_path2], fsync=SESSION_FSYNC, extra_sinks=sinks)
+
+def close_session_log(log):
+    log.close()
+    # data_live.csv is outside DATA_DIR, so the catalogue skips it
+    for path in log.paths + [sink.path for sink in log.extra_sinks if hasattr(sink, "path")]:
+        session_catalog.record(path)
+
+# Tasks
+
+async def gesture_task():
+    while devices.gesture is not None:
         try:
-            if os.path.exists("/tmp/vsd_selection.json"):
-                with open("/tmp/vsd_selection.json", "r") as f:
-                    selections = json.load(f)
-                raw_light = selections.get("light_mode", "")
-                light_mode = map_light_name_to_code(raw_light)
-                brightness = selections.get("brightness", LED_BRIGHTNESS)
-                light_enabled = selections.get("light_on", False)
-                if light_enabled and light_mode and light_mode in light_colors:
-                    color_config = light_colors[light_mode.upper()]
-                    set_custom_color(color_config["r"], color_config["g"], color_config["b"], brightness)
-                    last_light = light_mode
-                else:
-                    turn_off_all_leds()
-                    last_light = None
-            if not last_light:
-                if gv.status == "start":
-                    set_color(Color(255, 0, 0))
-                elif gv.status == "pause":
-                    set_color(Color(255, 255, 0))
-                else:
-                    turn_off_all_leds()
+            gesture = await runtime.blocking(detect_gesture)
         except Exception as e:
-            print(f"LED control error: {e}")
-        time.sleep(1)
+            gesture_errors.inc()
+            print("Gesture read error:", e)
+            gesture = None
+        status = state.current.status
+        if gesture == "LEFT" and status == "pause":
+            set_monitoring("start")
+            load_gui_selections()
+        elif gesture == "RIGHT" and status == "start":
+            set_monitoring("pause")
+        await runtime.sleep(GESTURE_INTERVAL)
 
-def uartThread():
-    global log_file
-    if radar_available:
-        data_port.flushInput()
+async def led_control_task():
+    version = None
     while True:
-        if os.path.exists("/tmp/stop_vitals"):
-            break
-        if gv.status == "start":
-            if log_file is None:
-                try:
-                    boot_time_str = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-                    log_file_path = f"/home/raspberry/Desktop/VSD_GUI/Data_collected/vitals_{boot_time_str}.csv"
-                    log_file_path2 = f"/home/raspberry/Desktop/VSD_GUI/data_live.csv"
-                    open(log_file_path2, "w").close()
-                    log_file = open(log_file_path, "a", newline='')
-                    csv_writer = csv.writer(log_file)
-                    log_file2 = open(log_file_path2, "a", newline='')
-                    csv_writer2 = csv.writer(log_file2)
-                    send_telegram_message("Starting new vitals monitoring session")
-                except Exception as e:
-                    print("Failed to open log file:", e)
-                    continue
-            try:
-                if radar_available:
-                    (dck, vd, rangeBuf) = vts.tlvRead(False)
-                    vs = vts.getHeader()
-                    if dck:
-                        gv.br = min(vd.breathingRateEst_FFT, 500)
-                        gv.hr = min(vd.heartRateEst_FFT, 500)
-                        gv.count = vs.frameNumber
-                else:
-                    raise Exception("Radar not available")
-            except Exception:
-                fallback = generate_fake_vitals()
-                gv.hr = fallback["hr"]
-                gv.br = fallback["br"]
+        # Woken by selection_watcher (GUI/app) and set_monitoring, nothing else
+        led_wake.clear()
+        current = selection_watcher.current
+        if current.version != version:
+            version = current.version
+            apply_light_selection(current.data)
+        # Shown whenever no ambient light is selected
+        set_status_color(*STATUS_COLORS.get(state.current.status, (0, 0, 0)))
+        await led_wake.wait()
+
+async def radar_task():
+    global session_log, session_name
+    radar_cursor = 0
+    while True:
+        await monitoring_started.wait()
+        if session_log is None:
             try:
-                with open("/tmp/live_vitals.txt", "w") as f:
-                    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    f.write(f"{timestamp},{gv.hr:.2f},{gv.br:.2f},{gv.temp_c:.2f},{gv.humidity:.2f},{gv.pressure:.2f}\n")
+                boot_time_str = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+                session_log = await runtime.blocking(open_session_log, boot_time_str)
+                session_name = boot_time_str
+                if hub_uplink:
+                    hub_uplink.start_session(boot_time_str)
+                send_telegram_message("Starting new vitals monitoring session")
             except Exception as e:
-                print("Live update file error:", e)
-        time.sleep(2)
-
-def read_bme280_thread():
+                print("Failed to open log file:", e)
+                await asyncio.sleep(2)
+                continue
+        frame = None
+        if radar_available:
+            # Wake as soon as the reader parks a new frame, or after 2 s
+            _, radar_cursor = await runtime.blocking(radar.wait_since, radar_cursor, 2)
+            frame = radar.latest()
+        if frame is not None and time.time() - frame.received_at <= RADAR_STALE_AFTER:
+            if not radar.is_trustworthy(frame):
+                continue  # DSP scored this estimate as noise: don't display or log it
+            hr, br, count = frame.hr, frame.br, frame.frame_number
+        else:
+            fallback = generate_fake_vitals()
+            hr, br, count = fallback["hr"], fallback["br"], state.current.frame
+            if not radar_available:
+                await asyncio.sleep(2)
+        if state.current.status != "start" or session_log is None:
+            continue  # paused or stopped while waiting for the frame
+        vitals = state.update(hr=hr, br=br, frame=count)
+        now = publish_vitals(vitals)
+        row = (now, vitals.hr, vitals.br, vitals.temp_c, vitals.humidity, vitals.pressure)
+        session_log.write_row(row)
+        if hub_uplink:
+            hub_uplink.append(row)
+
+async def bme280_task():
     def celsius_to_fahrenheit(c):
         return (c * 9 / 5) + 32
-    while True:
+    while devices.env is not None:
         try:
-            data = bme280.sample(bme280_bus, bme280_address, bme280_params)
-            gv.temp_c = data.temperature
-            gv.temp_f = celsius_to_fahrenheit(data.temperature)
-            gv.pressure = data.pressure
-            gv.humidity = data.humidity
-        except:
-            pass
-        time.sleep(2)
+            data = await runtime.blocking(devices.env.sample)
+            vitals = state.update(temp_c=data.temperature, temp_f=celsius_to_fahrenheit(data.temperature),
+                                  pressure=data.pressure, humidity=data.humidity)
+            if vitals.status == "start":
+                publish_vitals(vitals)
+        except Exception:
+            bme280_errors.inc()
+        await runtime.sleep(BME280_INTERVAL)
+
+# Control socket commands (run on the event loop)
+
+async def end_session():
+    global session_log, session_name
+    log, session_log, session_name = session_log, None, None
+    if log is not None:
+        await runtime.blocking(close_session_log, log)
+        send_telegram_message("Vitals monitoring session ended")
+
+def control_status():
+    vitals = state.current
+    return {"status": vitals.status, "session": session_name, "heart_rate": round(vitals.hr, 2),
+            "breathing_rate": round(vitals.br, 2), "frame": vitals.frame, "updated_at": vitals.updated_at,
+            "radar": radar_available, "uptime": round(time.monotonic() - started_at, 1)}
+
+def control_start():
+    if state.current.status != "start":
+        set_monitoring("start")
+        load_gui_selections()
+    return control_status()
+
+async def control_stop():
+    set_monitoring("pause")
+    await end_session()
+    return control_status()
+
+def control_shutdown():
+    runtime.stop()
+    return {"status": "shutting down"}
+
+started_at = time.monotonic()
+control_server = ControlServer({"start": control_start, "stop": control_stop,
+                                "status": control_status, "shutdown": control_shutdown})
+
+def register_metrics():
+    """Scrape-time metrics read from the counters each component already keeps"""
+    def reader_stat(name):
+        return lambda: radar.stats().get(name) if radar_available else None
+    registry.callback("vsd_radar_frames_read_total", "Radar frames parsed", "counter", reader_stat("frames_read"))
+    registry.callback("vsd_radar_frames_dropped_total", "Gaps in the radar frame numbers", "counter",
+                      reader_stat("frames_dropped"))
+    registry.callback("vsd_radar_frames_out_of_order_total", "Radar frames whose number did not increase", "counter",
+                      reader_stat("frames_out_of_order"))
+    registry.callback("vsd_radar_read_errors_total", "Exceptions from tlvRead", "counter", reader_stat("read_errors"))
+    registry.callback("vsd_radar_frames_rejected_total", "Radar frames not displayed or logged: DSP estimate was noise",
+                      "counter", reader_stat("frames_rejected"))
+    registry.callback("vsd_radar_dsp_rejected_estimates_total", "DSP estimates scored below the quality threshold",
+                      "counter", reader_stat("dsp_rejected_estimates"))
+
+    def sample_age():
+        snap = live_vitals.read()
+        return time.time() - snap.timestamp if snap is not None and snap.timestamp else None
+    registry.callback("vsd_sample_age_seconds", "Age of the newest published sample", "gauge", sample_age)
+    registry.callback("vsd_led_shows_total", "LED strip show() calls", "counter", lambda: led_renderer.frames_shown)
+    registry.callback("vsd_led_show_seconds_total", "Time spent in LED strip show()", "counter",
+                      lambda: led_renderer.show_seconds)
+    registry.callback("vsd_task_lag_seconds", "Last wake-up delay of each runtime task", "gauge",
+                      lambda: {(name,): lag for name, lag in runtime.lag.items()}, ("task",))
+    registry.callback("vsd_task_lag_max_seconds", "Largest wake-up delay of each runtime task", "gauge",
+                      lambda: {(name,): lag for name, lag in runtime.max_lag.items()}, ("task",))
+    registry.callback("vsd_task_restarts_total", "Runtime tasks restarted after an error", "counter",
+                      lambda: runtime.restarts)
+    registry.callback("vsd_session_rows_written_total", "Rows written to the session CSV", "counter",
+                      lambda: session_log.rows_written if session_log else 0)
+    registry.callback("vsd_session_rows_dropped_total", "Rows dropped by the session writer", "counter",
+                      lambda: session_log.rows_dropped if session_log else 0)
+    registry.callback("vsd_session_rows_failed_total", "Rows the session writer could not write to every file and sink",
+                      "counter", lambda: session_log.rows_failed if session_log else 0)
+    registry.callback("vsd_notifications_total", "Telegram notifications by outcome", "counter",
+                      lambda: {("sent",): notifier.sent, ("coalesced",): notifier.coalesced,
+                               ("dropped",): notifier.dropped, ("failed_attempt",): notifier.failures},
+                      ("result",))
+    registry.callback("vsd_stream_subscribers", "Open /vitals/stream connections", "gauge",
+                      lambda: vitals_stream.subscriber_count())
+
+register_metrics()
 
 # Flask API
 flask_app = Flask(__name__)
+instrument_app(flask_app, registry)
 
 @flask_app.route("/vitals", methods=["GET"])
 def get_vitals():
-    vitals_file = '/tmp/live_vitals.txt'
     try:
-        if os.path.exists(vitals_file):
-            with open(vitals_file, 'r') as f:
-                last_line = f.readlines()[-1].strip()
-                parts = last_line.split(',')
-                if len(parts) >= 6:
-                    return jsonify({
-                        "heart_rate": float(parts[1]),
-                        "breathing_rate": float(parts[2]),
-                        "temperature": float(parts[3]),
-                        "humidity": float(parts[4]),
-                        "pressure": float(parts[5])
-                    })
+        snap = live_vitals.read()
+        if snap is not None:
+            sample_age_seconds.observe(time.time() - snap.timestamp)
+            return jsonify({
+                "heart_rate": round(snap.hr, 2),
+                "breathing_rate": round(snap.br, 2),
+                "temperature": round(snap.temp_c, 2),
+                "humidity": round(snap.humidity, 2),
+                "pressure": round(snap.pressure, 2)
+            })
     except Exception as e:
         print("Vitals read error:", e)
     return jsonify({"heart_rate": None, "breathing_rate": None, "temperature": None, "humidity": None, "pressure": None})
 
+@flask_app.route("/vitals/stream", methods=["GET"])
+def stream_vitals():
+    try:
+        sub = vitals_stream.subscribe()
+    except TooManySubscribers as e:
+        return jsonify({"error": str(e)}), 503
+    return Response(vitals_stream.stream(sub), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@flask_app.route("/history", methods=["GET"])
+def get_history():
+    try:
+        end = float(request.args.get("to", time.time()))
+        start = float(request.args.get("from", end - 3600))
+        metrics = request.args.get("metrics")
+        points = request.args.get("points")
+        result = history_store.history(start, end, request.args.get("resolution"),
+                                       metrics.split(",") if metrics else TIMESERIES_METRICS,
+                                       int(points) if points else None, request.args.get("method", "minmax"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(result)
+
+@flask_app.route("/metrics", methods=["GET"])
+def get_metrics():
+    return Response(registry.render(), content_type=CONTENT_TYPE)
+
 @flask_app.route("/control", methods=["POST"])
 def receive_control_settings():
     try:
         data = request.get_json()
-        with open("/tmp/vsd_selection.json", "w") as f:
+        with open(SELECTION_FILE, "w") as f:
             json.dump(data, f)
+        selection_watcher.publish(data)
         raw_light = data.get("light_mode", "")
         light_mode = map_light_name_to_code(raw_light)
         brightness = int(data.get("brightness", LED_BRIGHTNESS))
@@ -377,73 +580,55 @@ def receive_control_settings():
             color = light_colors[light_mode.upper()]
             set_custom_color(color["r"], color["g"], color["b"], brightness)
         else:
-            turn_off_all_leds()
+            clear_custom_color()
         return jsonify({"status": "received", "data": data})
     except Exception as e:
         print(f"Error in /control: {e}")
         return jsonify({"error": str(e)})
 
-# Initialization
-bme280_address = 0x77
-bme280_bus = smbus2.SMBus(1)
-bme280_params = bme280.load_calibration_params(bme280_bus, bme280_address)
-signal.signal(signal.SIGINT, lambda signum, frame: cleanup())
-signal.signal(signal.SIGTERM, lambda signum, frame: cleanup())
+# Shutdown (runs after every task has been cancelled)
 
 def cleanup():
     print("Cleaning up...")
-    gv.status = "off"
+    state.update(status="off")
     turn_off_all_leds()
-    if log_file:
-        log_file.close()
+    if radar_available:
+        radar.stop()
+    if session_log:
+        close_session_log(session_log)
+    history_store.close()
+    session_catalog.close()
+    if RADAR_RECORD and data_port is not None:
+        data_port.close()
     send_telegram_message("VSD System shutdown complete.")
-    exit(0)
+    notifier.close(timeout=3)
 
 # Main
 if __name__ == '__main__':
     print("VSD System Starting (No Sound Version)...")
+    try:
+        control_server.claim_path()
+    except RuntimeError as e:
+        print(e)
+        sys.exit(1)
+    notifier.start()
     send_telegram_message("VSD System with Ambient Lighting is starting up!")
     generate_ip_qr()
+    led_renderer.start()
+    selection_watcher.start()
+    selection_watcher.subscribe(lambda _: runtime.call_soon(led_wake.set))
     load_gui_selections()
 
-    Thread(target=lambda: flask_app.run(host='0.0.0.0', port=5000, debug=True, use_reloader=False), daemon=True).start()
-    Thread(target=uartThread, daemon=True).start()
-    Thread(target=gestureThread, daemon=True).start()
-    Thread(target=led_control_thread, daemon=True).start()
-    Thread(target=read_bme280_thread, daemon=True).start()
-
-    last_light = None  # define at start of main loop
-
-    try:
-        while not os.path.exists("/tmp/stop_vitals"):
-            if gv.status == "start":
-                try:
-                    if os.path.exists("/tmp/vsd_selection.json"):
-                        with open("/tmp/vsd_selection.json", "r") as f:
-                            selections = json.load(f)
-
-                        if selections.get("light_on") and selections.get("light_mode"):
-                            raw_light = selections.get("light_mode", "")
-                            light_mode = map_light_name_to_code(raw_light)
-                            if light_mode and light_mode.upper() in light_colors:
-                                color = light_colors[light_mode.upper()]
-                                brightness = int(selections.get("brightness", LED_BRIGHTNESS))
-                                set_custom_color(color["r"], color["g"], color["b"], brightness)
-                                last_light = light_mode
-                except Exception as e:
-                    print("Error polling GUI control file:", e)
-
-            # Prevent fallback red if light is set
-            if not last_light:
-                if gv.status == "start":
-                    set_color(Color(255, 0, 0))  # Red
-                elif gv.status == "pause":
-                    set_color(Color(255, 255, 0))  # Yellow
-                else:
-                    turn_off_all_leds()
-
-            time.sleep(5)
-    except KeyboardInterrupt:
-        print("Keyboard interrupt received. Cleaning up...")
-
-    cleanup()
+    if radar_available:
+        radar.start()
+    # The WSGI server keeps its own worker threads; handlers only read `state`/`live_vitals`
+    Thread(target=serve_api, args=(flask_app, API_SERVER_MODE, '0.0.0.0', API_PORT, API_WORKERS), daemon=True).start()
+    runtime.add_task("radar", radar_task)
+    runtime.add_task("gesture", gesture_task)
+    runtime.add_task("led-control", led_control_task)
+    runtime.add_task("bme280", bme280_task)
+    runtime.add_task("control", control_server.serve)
+    if hub_uplink:
+        runtime.add_task("hub-uplink", hub_uplink.run)
+    runtime.on_shutdown(cleanup)
+    runtime.run()  # resident until SIGINT/SIGTERM or the "shutdown" command; starts paused